@@ -1,5 +1,9 @@
 # app.py 完整修改版
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import Response, stream_with_context
+from sqlalchemy.exc import IntegrityError
+from flask.cli import AppGroup
+import click
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
@@ -8,19 +12,74 @@ import os
 import threading
 import time
 import json
+import csv
+import hashlib
+from functools import wraps
 
 # 创建Flask应用
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'campus-pulse-secret-key-2024'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///campus.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///campus.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# 推荐预计算：结果有效期（秒）与后台重算间隔（秒，0 表示不启动后台线程）
+app.config['RECOMMEND_PRECOMPUTE_MAX_AGE'] = 6 * 3600
+app.config['RECOMMEND_PRECOMPUTE_INTERVAL'] = int(os.environ.get('RECOMMEND_PRECOMPUTE_INTERVAL', 0))
+# 渐进式仪表盘：先返回页面骨架，各面板再通过JSON接口并行加载（可用 ?progressive=1/0 覆盖）
+app.config['DASHBOARD_PROGRESSIVE'] = os.environ.get('DASHBOARD_PROGRESSIVE') == '1'
+
+# AI聊天页面每次加载的消息条数
+CHAT_HISTORY_PAGE_SIZE = 50
+
+# 紧急任务排序参数（见 task_scheduler.UrgencyPolicy），为空时使用默认值
+app.config['TASK_URGENCY'] = {}
+
+# 任务页面每次加载的任务数；计时器任务选择器最多列出的待完成任务数
+TASK_PAGE_SIZE = 20
+TASK_SELECTOR_LIMIT = 100
+
+# 任务导入：可以为其他用户导入任务的用户名（逗号分隔）；导入结果中最多列出的错误行数
+app.config['TASK_IMPORT_COORDINATORS'] = {
+    name.strip() for name in os.environ.get('TASK_IMPORT_COORDINATORS', '').split(',') if name.strip()
+}
+TASK_IMPORT_MAX_ERRORS = 100
 
 # 从 models.py 导入所有模型
 from models import db, User, Task, MoodLog, LearningResource, ChatMessage, StudySession
+from resource_index import match_resources, backfill_resource_tokens
+from resource_scoring import resource_scorer
+from resource_popularity import resource_popularity, hot_resources
+from resource_similarity import resource_similarity
+from request_loader import load_user_tasks, load_latest_mood
+from study_stats import study_statistics
+from study_rollup import backfill_study_rollup, ensure_study_rollup
+from pagination import keyset_page
+from data_export import EXPORT_COLUMNS, EXPORT_FORMATS, export_rows
+from study_events import study_events
+from data_versions import data_versions
+from study_analytics import study_analytics, RANGES, GRANULARITIES
+from study_sync import sync_sessions, MAX_BATCH
+from task_batch import complete_tasks, delete_tasks
+from task_list import TASK_FIELDS, parse_fields, task_filters, task_page, task_json, task_counts
+from task_search import search_tasks
+from task_scheduler import task_scheduler
+from task_import import IMPORT_FORMATS, detect_format, import_tasks
+from user_counters import user_counters
+from migrations import upgrade as upgrade_schema, current_version as current_schema_version, MIGRATIONS
+from recommend_cache import recommend_cache, cached_recommendations
+from recommend_precompute import (
+    precompute_recommendations, load_precomputed_recommendations, start_precompute_worker
+)
 
 # 初始化数据库
 db.init_app(app)
 
+# 相似资源MinHash签名保存在 instance 目录
+if resource_similarity is not None:
+    resource_similarity.storage_path = os.path.join(app.instance_path, 'resource_minhash.npz')
+
+# 紧急任务排序参数
+task_scheduler.configure(**app.config['TASK_URGENCY'])
+
 # 初始化登录管理
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -58,66 +117,47 @@ except Exception as e:
     your_ai_client = None
 
 # ========== 智能推荐函数 ==========
+@cached_recommendations('basic')
 def recommend_learning_resources(user_id):
     """推荐学习资源"""
     try:
-        user_tasks = Task.query.filter_by(user_id=user_id).all()
+        # 优先使用离线预计算结果，缺失或过期时再实时计算
+        precomputed = load_precomputed_recommendations(
+            user_id, app.config['RECOMMEND_PRECOMPUTE_MAX_AGE']
+        )
+        if precomputed is not None:
+            return precomputed
+        
+        user_tasks = load_user_tasks(user_id)
         
         if not user_tasks:
             # 如果没有任务，返回热门资源
-            return LearningResource.query.order_by(
-                LearningResource.views.desc()
-            ).limit(6).all()
+            return hot_resources(6)
         
         # 提取任务关键词
         task_text = ' '.join([t.title + ' ' + (t.description or '') for t in user_tasks]).lower()
         
-        # 获取所有资源
-        resources = LearningResource.query.all()
-        
-        if not resources:
-            return []
-        
-        # 计算匹配度
-        scored_resources = []
-        
-        for resource in resources:
-            score = 0
-            
-            # 1. 标题匹配
-            if resource.title:
-                title_lower = resource.title.lower()
-                for word in title_lower.split():
-                    if len(word) > 3 and word in task_text:
-                        score += 2
-            
-            # 2. 关键词匹配
-            if resource.keywords:
-                keywords = [k.strip().lower() for k in resource.keywords.split(',')]
-                for keyword in keywords:
-                    if keyword and keyword in task_text:
-                        score += 3
-            
-            # 3. 类型匹配
-            if resource.resource_type:
-                type_lower = resource.resource_type.lower()
-                if type_lower in task_text:
-                    score += 4
-            
-            if score > 0:
-                scored_resources.append((score, resource))
+        # BM25向量化评分；缺少 numpy/scipy 时退回倒排索引的词元权重匹配
+        if resource_scorer is not None:
+            scored = resource_scorer.score(task_text, limit=6)
+        else:
+            scored = match_resources(task_text, limit=6)
         
-        # 按匹配度排序
-        scored_resources.sort(key=lambda x: x[0], reverse=True)
+        # 按匹配度排序的前6个资源ID
+        top_ids = [resource_id for _, resource_id in scored]
+        resources_by_id = {
+            r.id: r for r in LearningResource.query.filter(LearningResource.id.in_(top_ids)).all()
+        } if top_ids else {}
         
         # 获取匹配的资源
-        matched_resources = [resource for _, resource in scored_resources[:6]]
+        matched_resources = [resources_by_id[i] for i in top_ids if i in resources_by_id]
         
         # 如果匹配资源不足，补充热门资源
         if len(matched_resources) < 3:
-            additional = LearningResource.query.order_by(
-                LearningResource.views.desc()
-            ).limit(6 - len(matched_resources)).all()
+            additional = hot_resources(
+                6 - len(matched_resources),
+                exclude=[r.id for r in matched_resources]
+            )
             matched_resources.extend(additional)
         
         return matched_resources[:6]
@@ -126,8 +166,8 @@ def recommend_learning_resources(user_id):
         print(f"资源推荐错误: {e}")
         return LearningResource.query.limit(6).all()
 
-def recommend_health_tips(mood_score):
-    """推荐健康建议"""
+def recommend_health_tips(mood_score, rng=None):
+    """推荐健康建议（rng 可传入固定种子的随机数生成器，使结果可复现）"""
     tips = {
         1: ["深呼吸放松5分钟", "听一首舒缓的音乐", "与朋友聊聊天", "进行10分钟轻度运动"],
         2: ["喝一杯温水", "短暂休息5分钟", "写下你的感受", "看看窗外的风景"],
@@ -136,21 +176,109 @@ def recommend_health_tips(mood_score):
         5: ["传播正能量", "设定更高目标", "庆祝你的成就", "帮助他人提升"]
     }
     
-    return random.sample(tips.get(mood_score, tips[3]), 2)
+    return (rng or random).sample(tips.get(mood_score, tips[3]), 2)
 
-def recommend_task_priority(user_id):
-    """智能任务优先级建议"""
-    try:
-        tasks = Task.query.filter_by(user_id=user_id, status='pending').all()
-        
-        if not tasks:
-            return []
-        
-        # 返回最近的任务
-        return sorted(tasks, key=lambda x: x.created_at, reverse=True)[:3]
-    except:
-        return []
+def dashboard_summary(user_id):
+    """仪表盘统计、紧急任务与健康建议（页面与 /api/dashboard/summary 共用）"""
+    # 任务数来自用户计数表（一次主键查询）
+    counters = user_counters(user_id)
+    total_tasks = counters['total_tasks']
+    completed_tasks = counters['completed_tasks']
+    recent_mood = load_latest_mood(user_id)
+    mood_score = recent_mood.mood_score if recent_mood else 3
+    
+    # 健康建议按 用户+日期+心情 固定随机种子，同一天内结果稳定，便于接口返回ETag
+    rng = random.Random(f"{user_id}:{datetime.utcnow().date()}:{mood_score}")
+    
+    return {
+        'total_tasks': total_tasks,
+        'completed_tasks': completed_tasks,
+        'pending_tasks': total_tasks - completed_tasks,
+        'completion_rate': round((completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 1),
+        'urgent_tasks': task_scheduler.urgent_tasks(user_id),
+        'recent_mood': recent_mood,
+        'health_tips': recommend_health_tips(mood_score, rng)
+    }
+
+def format_recommendation(rec):
+    """推荐结果（资源对象或AI虚拟推荐）转换为JSON字典"""
+    if isinstance(rec, dict) and rec.get('is_virtual'):
+        return {
+            'title': rec['title'],
+            'description': rec['description'],
+            'url': rec['url'],
+            'type': rec['resource_type'],
+            'ai_recommended': True,
+            'reason': rec.get('reason', '智谱AI智能推荐')
+        }
+    return {
+        'title': rec.title,
+        'description': rec.description,
+        'url': rec.url,
+        'type': rec.resource_type,
+        'ai_recommended': False,
+        'views': rec.views or 0
+    }
+
+def etag_json_response(payload, etag=None):
+    """返回带ETag的JSON响应，客户端 If-None-Match 命中时返回304
+
+    未指定 etag 时按响应内容计算。响应只允许浏览器私有缓存，且每次使用前需重新验证。
+    """
+    response = jsonify(payload)
+    if etag:
+        response.set_etag(etag)
+    else:
+        response.add_etag()
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+def not_modified(etag):
+    """请求的 If-None-Match 与 etag 相同时返回304响应，否则返回None（用于跳过昂贵计算）"""
+    if etag in request.if_none_match:
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return None
+
+def conditional_get(user=True, catalog=False, views=False, window=None):
+    """按数据版本号做条件GET的装饰器（放在 login_required 之后）
+
+    ETag 由用户数据版本号（user=True）、资源库版本号（catalog=True）、资源访问量版本号
+    （views=True，只有返回访问量统计的接口需要）和请求路径参数组成；
+    版本号保存在数据库中，多个工作进程之间一致。window 秒数用于结果随时间变化的接口
+    （如“今日”“最近7天”），每个时间段内ETag不变，因此应不超过结果变化的周期。
+    客户端 If-None-Match 命中时直接返回304，不执行视图函数。
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user_version, catalog_version, views_version = data_versions.token(current_user.id)
+            parts = [
+                view.__name__, current_user.id,
+                user_version if user else '-',
+                catalog_version if catalog else '-',
+                views_version if views else '-',
+                int(time.time() // window) if window else '-',
+                hashlib.md5(request.full_path.encode('utf-8')).hexdigest()[:8]
+            ]
+            etag = '-'.join(str(part) for part in parts)
+            
+            cached = not_modified(etag)
+            if cached is not None:
+                return cached
+            
+            response = app.make_response(view(*args, **kwargs))
+            # 只缓存成功的结果
+            if response.status_code == 200 and (response.get_json(silent=True) or {}).get('success', True):
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
 
+@cached_recommendations('ai')
 def ai_enhanced_recommendations(user_id):
     """使用智谱AI增强资源推荐"""
     if not your_ai_client:
@@ -160,10 +288,8 @@ def ai_enhanced_recommendations(user_id):
     try:
         # 获取用户信息
         user = User.query.get(user_id)
-        user_tasks = Task.query.filter_by(user_id=user_id).all()
-        recent_mood = MoodLog.query.filter_by(user_id=user_id)\
-                                  .order_by(MoodLog.created_at.desc())\
-                                  .first()
+        user_tasks = load_user_tasks(user_id)
+        recent_mood = load_latest_mood(user_id)
         
         # 准备请求数据
         ai_request_data = {
@@ -244,7 +370,7 @@ def ai_analyze_learning(user_id):
     
     try:
         # 收集学习数据
-        user_tasks = Task.query.filter_by(user_id=user_id).all()
+        user_tasks = load_user_tasks(user_id)
         completed_tasks = [t for t in user_tasks if t.status == 'completed']
         completion_rate = len(completed_tasks) / len(user_tasks) if user_tasks else 0
         
@@ -311,6 +437,40 @@ def ai_chat_response(user_id, message):
         return "智汇通智能体暂时无法响应，请稍后重试。"
 
 # ========== 学习计时器相关函数 ==========
+def active_session_payload(session):
+    """活跃学习会话的JSON数据（/api/study/active 与事件推送共用）"""
+    duration = int((datetime.utcnow() - session.start_time).total_seconds() / 60)
+    
+    # 获取任务信息
+    task_name = "自由学习"
+    if session.task_id:
+        task = Task.query.get(session.task_id)
+        if task:
+            task_name = task.title
+    elif session.notes:
+        task_name = session.notes
+    
+    return {
+        'session_id': session.id,
+        'start_time': session.start_time.isoformat(),
+        'duration': duration,
+        'task_id': session.task_id,
+        'task_name': task_name
+    }
+
+def publish_study_event(user_id, event, data, with_stats=False):
+    """向用户打开的页面推送计时器事件；没有页面在监听时不做任何查询
+
+    data 可以是返回事件数据的函数，只在有页面监听时才调用。
+    """
+    if not study_events.has_subscribers(user_id):
+        return
+    if callable(data):
+        data = data()
+    if with_stats:
+        data = dict(data, stats=study_statistics(user_id))
+    study_events.publish(user_id, event, data)
+
 @app.route('/api/study/start', methods=['POST'])
 @login_required
 def start_study_session():
@@ -363,6 +523,8 @@ def start_study_session():
         db.session.add(new_session)
         db.session.commit()
         
+        publish_study_event(current_user.id, 'session_started', lambda: active_session_payload(new_session))
+        
         return jsonify({
             'success': True,
             'session_id': new_session.id,
@@ -421,6 +583,11 @@ def end_study_session():
         
         db.session.commit()
         
+        publish_study_event(current_user.id, 'session_ended', lambda: {
+            'session_id': session.id,
+            'duration': duration
+        }, with_stats=True)
+        
         return jsonify({
             'success': True,
             'duration': duration,
@@ -433,6 +600,45 @@ def end_study_session():
         print(f"结束学习计时错误: {e}")
         return jsonify({'success': False, 'message': str(e)})
 
+@app.route('/api/study/sync', methods=['POST'])
+@login_required
+def sync_study_sessions():
+    """批量同步客户端离线记录的学习会话
+
+    请求体：{"sessions": [{"client_id", "start_time", "end_time", "task_id", "focus_score", "notes"}, ...]}
+    client_id 由客户端生成，重复提交不会重复写入；与已有记录时间重叠的会话被拒绝。
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        items = data.get('sessions')
+        if not isinstance(items, list) or not items:
+            return jsonify({'success': False, 'message': 'sessions 必须是非空数组'}), 400
+        if len(items) > MAX_BATCH:
+            return jsonify({'success': False, 'message': f'每次最多同步 {MAX_BATCH} 条记录'}), 400
+        
+        results = sync_sessions(current_user.id, items)
+        db.session.commit()
+        
+        created = sum(1 for r in results if r['status'] == 'created')
+        if created:
+            # 通知打开的页面（数据版本已由 sync_sessions 在事务内递增）
+            publish_study_event(current_user.id, 'sessions_synced', {'created': created}, with_stats=True)
+        
+        return jsonify({
+            'success': True,
+            'created': created,
+            'results': results
+        })
+        
+    except IntegrityError:
+        # 同一批会话被并发提交，client_id 主键冲突
+        db.session.rollback()
+        return jsonify({'success': False, 'message': '同步冲突，请重试'}), 409
+    except Exception as e:
+        db.session.rollback()
+        print(f"同步学习会话错误: {e}")
+        return jsonify({'success': False, 'message': str(e)})
+
 @app.route('/api/study/active')
 @login_required
 def get_active_study_session():
@@ -444,26 +650,7 @@ def get_active_study_session():
         ).first()
         
         if session:
-            duration = int((datetime.utcnow() - session.start_time).total_seconds() / 60)
-            
-            # 获取任务信息
-            task_name = "自由学习"
-            if session.task_id:
-                task = Task.query.get(session.task_id)
-                if task:
-                    task_name = task.title
-            elif session.notes:
-                task_name = session.notes
-            
-            return jsonify({
-                'success': True,
-                'active': True,
-                'session_id': session.id,
-                'start_time': session.start_time.isoformat(),
-                'duration': duration,
-                'task_id': session.task_id,
-                'task_name': task_name
-            })
+            return jsonify(dict(active_session_payload(session), success=True, active=True))
         else:
             return jsonify({
                 'success': True,
@@ -476,176 +663,12 @@ def get_active_study_session():
 
 @app.route('/api/study/stats')
 @login_required
+@conditional_get(window=300)
 def get_study_statistics():
     """获取学习统计数据和饼状图数据 - 修复版"""
     try:
-        # 获取所有学习数据（不限时间）
-        sessions = StudySession.query.filter(
-            StudySession.user_id == current_user.id,
-            StudySession.end_time.isnot(None)
-        ).all()
-        
-        if not sessions:
-            return jsonify({
-                'success': True,
-                'stats': {
-                    'total_study': 0,
-                    'week_study': 0,
-                    'today_study': 0,
-                    'avg_focus': 0,
-                    'session_count': 0,
-                    'task_count': 0
-                },
-                'pie_chart': {
-                    'labels': ['暂无学习数据'],
-                    'datasets': [{
-                        'data': [100],
-                        'backgroundColor': ['#e2e8f0'],
-                        'borderColor': '#fff',
-                        'borderWidth': 2
-                    }]
-                },
-                'trend_data': [],
-                'task_details': [],
-                'message': '暂无学习数据，开始学习后这里会显示统计信息'
-            })
-        
-        # 按任务统计时长
-        task_stats = {}
-        for session in sessions:
-            # 获取任务名
-            if session.task_id:
-                task = Task.query.get(session.task_id)
-                if task:
-                    task_name = task.title
-                else:
-                    task_name = "已删除的任务"
-            else:
-                # 如果没有关联任务，使用备注或默认名称
-                if session.notes and session.notes.strip():
-                    task_name = session.notes.strip()
-                    if len(task_name) > 30:
-                        task_name = task_name[:27] + "..."
-                else:
-                    task_name = "自由学习"
-            
-            # 确保任务名不为空
-            if not task_name or task_name.strip() == "":
-                task_name = "未命名学习"
-            
-            # 添加时长
-            duration = session.duration_minutes or 0
-            if duration > 0:
-                if task_name not in task_stats:
-                    task_stats[task_name] = 0
-                task_stats[task_name] += duration
-        
-        # 如果没有有效数据
-        if not task_stats:
-            return jsonify({
-                'success': True,
-                'stats': {
-                    'total_study': 0,
-                    'week_study': 0,
-                    'today_study': 0,
-                    'avg_focus': 0,
-                    'session_count': len(sessions),
-                    'task_count': 0
-                },
-                'pie_chart': {
-                    'labels': ['暂无有效学习时长'],
-                    'datasets': [{
-                        'data': [100],
-                        'backgroundColor': ['#e2e8f0'],
-                        'borderColor': '#fff',
-                        'borderWidth': 2
-                    }]
-                },
-                'trend_data': [],
-                'task_details': []
-            })
-        
-        # 转换为饼状图数据
-        sorted_tasks = sorted(task_stats.items(), key=lambda x: x[1], reverse=True)
-        
-        # 只显示前8个任务，其他的归为"其他"
-        if len(sorted_tasks) > 8:
-            main_tasks = sorted_tasks[:7]
-            other_time = sum(time for _, time in sorted_tasks[7:])
-            main_tasks.append(("其他任务", other_time))
-        else:
-            main_tasks = sorted_tasks
-        
-        # 生成饼状图数据
-        colors = [
-            '#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0',
-            '#9966FF', '#FF9F40', '#C9CBCF', '#7CFC00'
-        ]
-        
-        # 确保每个任务都有颜色
-        while len(colors) < len(main_tasks):
-            colors.extend(colors)  # 循环使用颜色
-        
-        pie_data = {
-            'labels': [name for name, _ in main_tasks],
-            'datasets': [{
-                'data': [time for _, time in main_tasks],
-                'backgroundColor': colors[:len(main_tasks)],
-                'borderColor': '#fff',
-                'borderWidth': 2
-            }]
-        }
-        
-        # 总统计
-        total_study = sum(task_stats.values())
-        
-        # 本周统计
-        seven_days_ago = datetime.utcnow() - timedelta(days=7)
-        week_sessions = [s for s in sessions if s.start_time >= seven_days_ago]
-        week_study = sum(s.duration_minutes or 0 for s in week_sessions)
-        
-        # 今日统计
-        today = datetime.utcnow().date()
-        today_sessions = [s for s in sessions if s.start_time.date() == today]
-        today_study = sum(s.duration_minutes or 0 for s in today_sessions)
-        
-        # 平均专注度
-        focus_scores = [s.focus_score for s in sessions if s.focus_score and s.focus_score > 0]
-        avg_focus = round(sum(focus_scores) / len(focus_scores), 1) if focus_scores else 0
-        
-        # 学习趋势（最近7天每日学习时长）
-        trend_data = []
-        for i in range(7):
-            day = datetime.utcnow().date() - timedelta(days=6-i)
-            day_sessions = [s for s in sessions if s.start_time.date() == day]
-            day_study = sum(s.duration_minutes or 0 for s in day_sessions)
-            trend_data.append({
-                'date': day.strftime('%m-%d'),
-                'duration': day_study
-            })
-        
-        return jsonify({
-            'success': True,
-            'stats': {
-                'total_study': total_study,
-                'week_study': week_study,
-                'today_study': today_study,
-                'avg_focus': avg_focus,
-                'session_count': len(sessions),
-                'task_count': len(task_stats)
-            },
-            'pie_chart': pie_data,
-            'trend_data': trend_data,
-            'task_details': [
-                {
-                    'task': name, 
-                    'duration': time, 
-                    'percentage': round(time/total_study*100, 1) if total_study > 0 else 0
-                }
-                for name, time in sorted_tasks[:10]
-            ]
-        })
-        
+        # 分组聚合在数据库端完成，不再逐条加载会话
+        return jsonify(study_statistics(current_user.id))
     except Exception as e:
         print(f"❌ 获取学习统计错误: {e}")
         import traceback
@@ -662,28 +685,69 @@ def get_study_statistics():
             'trend_data': []
         })
 
+@app.route('/api/study/analytics')
+@login_required
+@conditional_get(window=86400)
+def get_study_analytics():
+    """学习分析：按日/周/月分桶的学习时长与专注度（热力图、周/月趋势）
+
+    参数：range=week|month|year（截止今天），granularity=day|week|month
+    """
+    if study_analytics is None:
+        return jsonify({'success': False, 'message': '学习分析功能不可用（需要 numpy）'})
+    
+    range_name = request.args.get('range', 'year')
+    granularity = request.args.get('granularity', 'day')
+    if range_name not in RANGES or granularity not in GRANULARITIES:
+        return jsonify({
+            'success': False,
+            'message': f"参数错误：range 可选 {'/'.join(RANGES)}，granularity 可选 {'/'.join(GRANULARITIES)}"
+        }), 400
+    
+    try:
+        result = study_analytics.analyze(current_user.id, range_name, granularity)
+        return jsonify(dict(result, success=True))
+    except Exception as e:
+        print(f"❌ 学习分析错误: {e}")
+        return jsonify({'success': False, 'message': str(e)})
+
 @app.route('/api/study/sessions')
 @login_required
+@conditional_get()
 def get_study_sessions():
-    """获取学习会话历史"""
+    """获取学习会话历史（游标分页）
+
+    参数：cursor 为上一页返回的 next_cursor；count=1 时返回总数
+    （默认只在第一页统计，翻页时不再执行 COUNT）。
+    """
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
+        cursor = request.args.get('cursor')
+        per_page = min(max(request.args.get('per_page', 10, type=int), 1), 100)
+        with_total = request.args.get('count', '0' if cursor else '1') == '1'
         
-        sessions = StudySession.query.filter(
+        query = StudySession.query.filter(
             StudySession.user_id == current_user.id,
             StudySession.end_time.isnot(None)
-        ).order_by(
-            StudySession.start_time.desc()
-        ).paginate(page=page, per_page=per_page, error_out=False)
+        )
+        try:
+            sessions, next_cursor = keyset_page(
+                query, (StudySession.start_time, StudySession.id), cursor, per_page
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        # 本页关联的任务名一次查出
+        task_ids = {s.task_id for s in sessions if s.task_id}
+        task_titles = dict(
+            db.session.query(Task.id, Task.title).filter(Task.id.in_(task_ids)).all()
+        ) if task_ids else {}
         
         session_list = []
-        for session in sessions.items:
+        for session in sessions:
             # 获取任务名
             task_name = "自由学习"
             if session.task_id:
-                task = Task.query.get(session.task_id)
-                task_name = task.title if task else "已删除的任务"
+                task_name = task_titles.get(session.task_id, "已删除的任务")
             elif session.notes:
                 task_name = session.notes
             
@@ -703,13 +767,15 @@ def get_study_sessions():
                 'date': session.start_time.strftime('%Y-%m-%d')
             })
         
-        return jsonify({
+        result = {
             'success': True,
             'sessions': session_list,
-            'total': sessions.total,
-            'pages': sessions.pages,
-            'current_page': sessions.page
-        })
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }
+        if with_total:
+            result['total'] = query.count()
+        return jsonify(result)
         
     except Exception as e:
         print(f"获取学习会话历史错误: {e}")
@@ -728,6 +794,8 @@ def delete_study_session(session_id):
         db.session.delete(session)
         db.session.commit()
         
+        publish_study_event(current_user.id, 'session_deleted', {'session_id': session_id}, with_stats=True)
+        
         return jsonify({
             'success': True,
             'message': '学习记录已删除'
@@ -737,13 +805,50 @@ def delete_study_session(session_id):
         print(f"删除学习会话错误: {e}")
         return jsonify({'success': False, 'message': str(e)})
 
+@app.route('/api/study/events')
+@login_required
+def study_event_stream():
+    """学习计时器事件推送（Server-Sent Events）
+
+    连接建立时先推送一次当前状态（活跃会话与统计），之后只在本用户开始、结束、
+    删除学习会话时推送；等待期间不访问数据库。
+    """
+    active = StudySession.query.filter_by(user_id=current_user.id, end_time=None).first()
+    initial = {
+        'active': active_session_payload(active) if active else None,
+        'stats': study_statistics(current_user.id)
+    }
+    
+    # 生成器不依赖请求上下文，数据库连接在返回响应时即归还
+    response = Response(study_events.stream(current_user.id, initial), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 # ========== 启动时自动加载资源 ==========
 def init_database():
     """初始化数据库和资源"""
     with app.app_context():
-        # 创建所有表
-        db.create_all()
-        print("✅ 数据库表已创建")
+        # 创建新表并执行未执行过的结构迁移
+        applied = upgrade_schema()
+        print(f"✅ 数据库表已就绪（结构版本 {current_schema_version()}，本次执行 {len(applied)} 个迁移）")
+        
+        # 为旧数据补写资源分词表
+        backfilled = backfill_resource_tokens()
+        if backfilled:
+            print(f"📇 已为 {backfilled} 个资源生成分词记录")
+        
+        # 旧的学习会话数据补写每日汇总
+        rolled_up = ensure_study_rollup()
+        if rolled_up:
+            print(f"📅 已根据历史学习会话生成 {rolled_up} 条每日汇总")
+        
+        # 加载热门资源排行榜
+        resource_popularity.seed()
+        
+        # 加载（并补算）相似资源签名
+        if resource_similarity is not None:
+            resource_similarity.ensure_loaded()
         
         # 检查是否有资源
         resource_count = LearningResource.query.count()
@@ -779,9 +884,9 @@ def force_load_resources():
                 
                 if resources and len(resources) > 0:
                     # 保存到数据库
-                    existing_urls = set([r.url for r in LearningResource.query.all()])
                     added_count = 0
                     updated_count = 0
+                    touched_resources = []
                     
                     for resource_data in resources:
                         # 检查是否已存在
@@ -793,6 +898,7 @@ def force_load_resources():
                             existing.description = resource_data['description'][:500]
                             existing.resource_type = resource_data.get('resource_type', '其他')
                             existing.keywords = resource_data.get('keywords', '')
+                            touched_resources.append(existing)
                             updated_count += 1
                         else:
                             # 添加新资源
@@ -805,9 +911,15 @@ def force_load_resources():
                                 created_at=resource_data.get('created_at', datetime.utcnow())
                             )
                             db.session.add(new_resource)
+                            touched_resources.append(new_resource)
                             added_count += 1
                     
+                    # 倒排索引在提交后由 resource_index 的事件增量更新
                     db.session.commit()
+                    resource_popularity.add_resources(touched_resources)
+                    if resource_similarity is not None:
+                        resource_similarity.add_resources(touched_resources)
+                        resource_similarity.save()
                     
                     print(f"✅ 资源加载完成：新增 {added_count} 个，更新 {updated_count} 个")
                     
@@ -850,8 +962,9 @@ def start_auto_load_resources():
                     
                     if resources and len(resources) > 0:
                         # 保存到数据库
-                        existing_urls = set([r.url for r in LearningResource.query.all()])
+                        existing_urls = set(url for (url,) in db.session.query(LearningResource.url))
                         added_count = 0
+                        new_resources = []
                         
                         for resource_data in resources:
                             if resource_data['url'] not in existing_urls:
@@ -864,10 +977,16 @@ def start_auto_load_resources():
                                     created_at=datetime.utcnow()
                                 )
                                 db.session.add(new_resource)
+                                new_resources.append(new_resource)
                                 existing_urls.add(resource_data['url'])
                                 added_count += 1
                         
+                        # 倒排索引在提交后由 resource_index 的事件增量更新
                         db.session.commit()
+                        resource_popularity.add_resources(new_resources)
+                        if resource_similarity is not None:
+                            resource_similarity.add_resources(new_resources)
+                            resource_similarity.save()
                         
                         if added_count > 0:
                             print(f"✅ 资源加载完成，新增 {added_count} 个资源")
@@ -966,42 +1085,43 @@ def register():
 @login_required
 def dashboard():
     """仪表盘"""
+    progressive = request.args.get('progressive')
+    progressive = app.config['DASHBOARD_PROGRESSIVE'] if progressive is None else progressive == '1'
+    
+    if progressive:
+        # 只渲染页面骨架，统计与推荐由前端并行请求 /api/dashboard/* 填充
+        return render_template('dashboard.html',
+                             progressive=True,
+                             total_tasks=0,
+                             completed_tasks=0,
+                             pending_tasks=0,
+                             completion_rate=0,
+                             learning_resources=[],
+                             urgent_tasks=[],
+                             recent_mood=None,
+                             health_tips=[],
+                             username=current_user.username,
+                             now=datetime.utcnow(),
+                             ai_enabled=your_ai_client is not None)
+    
     try:
-        # 统计数据
-        total_tasks = Task.query.filter_by(user_id=current_user.id).count()
-        completed_tasks = Task.query.filter_by(user_id=current_user.id, status='completed').count()
-        pending_tasks = total_tasks - completed_tasks
-        
-        # 计算完成率
-        completion_rate = round((completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 1)
+        summary = dashboard_summary(current_user.id)
         
         # 获取推荐
         learning_resources = ai_enhanced_recommendations(current_user.id)
-        urgent_tasks = recommend_task_priority(current_user.id)
-        
-        # 最近心情
-        recent_mood = MoodLog.query.filter_by(user_id=current_user.id)\
-                                   .order_by(MoodLog.created_at.desc())\
-                                   .first()
-        
-        health_tips = recommend_health_tips(recent_mood.mood_score if recent_mood else 3)
         
         return render_template('dashboard.html',
-                             total_tasks=total_tasks,
-                             completed_tasks=completed_tasks,
-                             pending_tasks=pending_tasks,
-                             completion_rate=completion_rate,
+                             progressive=False,
                              learning_resources=learning_resources,
-                             urgent_tasks=urgent_tasks,
-                             recent_mood=recent_mood,
-                             health_tips=health_tips,
                              username=current_user.username,
                              now=datetime.utcnow(),
-                             ai_enabled=your_ai_client is not None)
+                             ai_enabled=your_ai_client is not None,
+                             **summary)
     except Exception as e:
         print(f"仪表盘错误: {e}")
         flash('加载仪表盘时出现错误，请刷新重试。', 'warning')
         return render_template('dashboard.html',
+                             progressive=False,
                              total_tasks=0,
                              completed_tasks=0,
                              pending_tasks=0,
@@ -1014,20 +1134,181 @@ def dashboard():
                              now=datetime.utcnow(),
                              ai_enabled=your_ai_client is not None)
 
+def parse_estimated_minutes(value):
+    """表单中的预计用时（分钟），为空或无效时返回 None"""
+    try:
+        minutes = int(value)
+    except (TypeError, ValueError):
+        return None
+    return minutes if 0 < minutes <= 10000 else None
+
 @app.route('/tasks')
 @login_required
 def tasks():
-    """任务管理页面"""
+    """任务管理页面（首页任务由服务器渲染，其余通过 /api/tasks 按需加载）"""
+    fields = list(TASK_FIELDS)
+    counts = {'total': 0, 'completed': 0, 'pending': 0, 'high': 0}
     try:
-        tasks_list = Task.query.filter_by(user_id=current_user.id)\
-                               .order_by(Task.created_at.desc())\
-                               .all()
+        tasks_list, next_cursor = task_page(task_filters(current_user.id), fields, limit=TASK_PAGE_SIZE)
+        selector_tasks, _ = task_page(
+            task_filters(current_user.id, status='pending'),
+            ['id', 'title', 'priority'], sort='priority_asc', limit=TASK_SELECTOR_LIMIT
+        )
+        counts = task_counts(current_user.id)
     except Exception as e:
         print(f"任务页面错误: {e}")
-        tasks_list = []
+        tasks_list, next_cursor, selector_tasks = [], None, []
         flash('加载任务列表时出现错误。', 'warning')
     
-    return render_template('tasks.html', tasks=tasks_list, now=datetime.utcnow())
+    return render_template('tasks.html',
+                          tasks=tasks_list,
+                          next_cursor=next_cursor,
+                          selector_tasks=selector_tasks,
+                          task_totals=counts,
+                          page_size=TASK_PAGE_SIZE,
+                          now=datetime.utcnow())
+
+@app.route('/api/tasks')
+@login_required
+# 按UTC日期分段，与 task_filters 中“今天”“已过期”的切换时刻（UTC零点）一致
+@conditional_get(window=86400)
+def list_tasks_api():
+    """任务列表（筛选 + 游标分页 + 字段投影）
+
+    参数：status=pending|completed，priority=1|2|3，due=overdue|today|week|none，
+    sort=created_desc|created_asc|priority_asc|priority_desc，fields=id,title,...（默认全部），
+    cursor 为上一页返回的 next_cursor，per_page 为 1-100；count=1 时返回筛选后的总数
+    （默认只在第一页统计）。
+    """
+    try:
+        cursor = request.args.get('cursor')
+        per_page = min(max(request.args.get('per_page', TASK_PAGE_SIZE, type=int), 1), 100)
+        with_total = request.args.get('count', '0' if cursor else '1') == '1'
+        
+        try:
+            fields = parse_fields(request.args.get('fields'))
+            criteria = task_filters(
+                current_user.id,
+                status=request.args.get('status'),
+                priority=request.args.get('priority'),
+                due=request.args.get('due')
+            )
+            rows, next_cursor = task_page(
+                criteria, fields, request.args.get('sort', 'created_desc'), cursor, per_page
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        result = {
+            'success': True,
+            'tasks': [task_json(row, fields) for row in rows],
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }
+        if with_total:
+            result['total'] = db.session.query(db.func.count(Task.id)).filter(*criteria).scalar()
+        return jsonify(result)
+        
+    except Exception as e:
+        print(f"获取任务列表错误: {e}")
+        return jsonify({'success': False, 'message': str(e)})
+
+@app.route('/api/tasks/search')
+@login_required
+@conditional_get()
+def search_tasks_api():
+    """搜索当前用户的任务（标题和描述），按相关度排序并返回高亮片段
+
+    参数：q 为搜索词（空格分隔多个词，需全部匹配），limit 为 1-50。
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'success': False, 'message': '请输入搜索内容'}), 400
+        if len(query) > 100:
+            return jsonify({'success': False, 'message': '搜索内容不能超过100个字符'}), 400
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 50)
+        
+        results, mode = search_tasks(current_user.id, query, limit)
+        return jsonify({
+            'success': True,
+            'query': query,
+            'mode': mode,
+            'results': results
+        })
+        
+    except Exception as e:
+        print(f"搜索任务错误: {e}")
+        return jsonify({'success': False, 'message': str(e)})
+
+@app.route('/api/tasks/import', methods=['POST'])
+@login_required
+def import_tasks_api():
+    """从上传的 CSV / JSON lines / iCalendar 文件批量导入任务
+
+    文件放在表单字段 file 中（或直接作为请求体，此时需要 format 参数）；format 为
+    csv、jsonl、ics，为空时按文件扩展名判断。每行可用 user 列（用户名或邮箱）指定
+    导入给谁，只有 TASK_IMPORT_COORDINATORS 中的用户可以为其他用户导入。
+    """
+    try:
+        upload = request.files.get('file')
+        fmt = request.values.get('format') or (detect_format(upload.filename) if upload else None)
+        if fmt not in IMPORT_FORMATS:
+            return jsonify({'success': False, 'message': f"format 必须是 {' / '.join(IMPORT_FORMATS)}"}), 400
+        
+        allowed_user_ids = None
+        if current_user.username not in app.config['TASK_IMPORT_COORDINATORS']:
+            allowed_user_ids = {current_user.id}
+        
+        errors = []
+        def report(line, message):
+            if len(errors) < TASK_IMPORT_MAX_ERRORS:
+                errors.append({'line': line, 'message': message})
+        
+        # 上传文件由 werkzeug 缓存到临时文件，解析和写入都是流式的
+        summary = import_tasks(upload.stream if upload else request.stream, fmt,
+                               default_user_id=current_user.id,
+                               allowed_user_ids=allowed_user_ids, on_error=report)
+        
+        return jsonify({
+            'success': True,
+            'message': f"已导入 {summary['imported']} 个任务，{summary['failed']} 行无效",
+            'imported': summary['imported'],
+            'failed': summary['failed'],
+            'users': summary['users'],
+            'errors': errors,
+            'errors_truncated': summary['failed'] > len(errors)
+        })
+        
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"导入任务错误: {e}")
+        return jsonify({'success': False, 'message': str(e)})
+
+@app.route('/api/tasks/urgent')
+@login_required
+@conditional_get(window=3600)
+def urgent_tasks_api():
+    """按紧急度（截止日期、优先级、预计用时）排序的待完成任务，limit 为 1-20"""
+    try:
+        limit = min(max(request.args.get('limit', 3, type=int), 1), 20)
+        return jsonify({
+            'success': True,
+            'tasks': [{
+                'id': task.id,
+                'title': task.title,
+                'priority': task.priority,
+                'due_date': task.due_date.isoformat() if task.due_date else None,
+                'estimated_minutes': task.estimated_minutes,
+                'urgency': round(score, 3)
+            } for score, task in task_scheduler.ranked(current_user.id, limit)]
+        })
+    except Exception as e:
+        print(f"获取紧急任务错误: {e}")
+        return jsonify({'success': False, 'message': str(e)})
 
 @app.route('/add_task', methods=['POST'])
 @login_required
@@ -1056,6 +1337,7 @@ def add_task():
             description=description,
             priority=int(priority),
             due_date=due_date,
+            estimated_minutes=parse_estimated_minutes(request.form.get('estimated_minutes')),
             user_id=current_user.id
         )
         
@@ -1090,6 +1372,8 @@ def update_task(task_id):
         task.title = title
         task.description = request.form.get('description', '').strip()
         task.priority = int(request.form.get('priority', '2'))
+        if 'estimated_minutes' in request.form:
+            task.estimated_minutes = parse_estimated_minutes(request.form.get('estimated_minutes'))
         
         # 处理截止日期
         due_date_str = request.form.get('due_date', '')
@@ -1121,20 +1405,13 @@ def batch_complete_api():
         if not task_ids:
             return jsonify({'success': False, 'message': '未选择任务'})
         
-        tasks = Task.query.filter(
-            Task.id.in_(task_ids),
-            Task.user_id == current_user.id,
-            Task.status != 'completed'
-        ).all()
-        
-        completed_count = 0
-        for task in tasks:
-            task.status = 'completed'
-            task.completed_at = datetime.utcnow()
-            completed_count += 1
-        
+        completed_count = complete_tasks(current_user.id, task_ids)
         db.session.commit()
         
+        if completed_count:
+            # 批量更新不触发ORM事件，手动使推荐缓存失效（数据版本已在事务内递增）
+            recommend_cache.invalidate(current_user.id)
+        
         return jsonify({
             'success': True, 
             'message': f'已批量完成 {completed_count} 个任务',
@@ -1157,18 +1434,16 @@ def batch_delete_api():
         if not task_ids:
             return jsonify({'success': False, 'message': '未选择任务'})
         
-        tasks = Task.query.filter(
-            Task.id.in_(task_ids),
-            Task.user_id == current_user.id
-        ).all()
-        
-        deleted_count = 0
-        for task in tasks:
-            db.session.delete(task)
-            deleted_count += 1
-        
+        deleted_count, deleted_sessions = delete_tasks(current_user.id, task_ids)
         db.session.commit()
         
+        if deleted_count:
+            # 批量删除不触发ORM事件，手动使推荐缓存失效并通知打开的页面（数据版本已在事务内递增）
+            recommend_cache.invalidate(current_user.id)
+            if deleted_sessions:
+                publish_study_event(current_user.id, 'session_deleted',
+                                    {'deleted_sessions': deleted_sessions}, with_stats=True)
+        
         return jsonify({
             'success': True, 
             'message': f'已批量删除 {deleted_count} 个任务',
@@ -1263,9 +1538,7 @@ def resources():
         except Exception as ai_error:
             print(f"⚠️  AI推荐失败: {ai_error}")
             # 使用简单的推荐
-            recommended = LearningResource.query.order_by(
-                LearningResource.views.desc()
-            ).limit(6).all()
+            recommended = hot_resources(6)
         
         # 获取分类统计 - 简化版
         categories = []
@@ -1335,16 +1608,49 @@ def resources():
 @login_required
 def chat():
     """AI聊天页面"""
-    # 获取聊天历史
-    chat_history = ChatMessage.query.filter_by(user_id=current_user.id)\
-                                   .order_by(ChatMessage.created_at.asc())\
-                                   .limit(50)\
-                                   .all()
+    # 获取最近的聊天记录（更早的消息由页面通过 /api/chat/history 按需加载）
+    recent, history_cursor = keyset_page(
+        ChatMessage.query.filter_by(user_id=current_user.id),
+        (ChatMessage.created_at, ChatMessage.id),
+        limit=CHAT_HISTORY_PAGE_SIZE
+    )
     
     return render_template('chat.html', 
-                          chat_history=chat_history,
+                          chat_history=list(reversed(recent)),
+                          history_cursor=history_cursor,
                           ai_enabled=your_ai_client is not None)
 
+@app.route('/api/chat/history')
+@login_required
+def get_chat_history():
+    """加载更早的聊天记录（游标分页，按时间正序返回本页消息）"""
+    try:
+        limit = min(max(request.args.get('limit', CHAT_HISTORY_PAGE_SIZE, type=int), 1), 200)
+        try:
+            messages, next_cursor = keyset_page(
+                ChatMessage.query.filter_by(user_id=current_user.id),
+                (ChatMessage.created_at, ChatMessage.id),
+                request.args.get('cursor'),
+                limit
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'messages': [{
+                'id': msg.id,
+                'sender': 'ai' if msg.is_ai else 'user',
+                'content': (msg.response or msg.message) if msg.is_ai else msg.message,
+                'time': msg.created_at.strftime('%H:%M')
+            } for msg in reversed(messages)],
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        })
+    except Exception as e:
+        print(f"❌ 获取聊天记录错误: {e}")
+        return jsonify({'success': False, 'message': str(e)})
+
 @app.route('/api/chat/send', methods=['POST'])
 @login_required
 def send_chat_message():
@@ -1439,7 +1745,12 @@ def suggest_resource():
         )
         
         db.session.add(new_resource)
+        # 倒排索引在提交后由 resource_index 的事件增量更新
         db.session.commit()
+        resource_popularity.add_resources([new_resource])
+        if resource_similarity is not None:
+            # 只更新内存，签名文件在下次批量加载或启动补算时写入
+            resource_similarity.add_resources([new_resource])
         
         return jsonify({
             'success': True,
@@ -1457,6 +1768,7 @@ def suggest_resource():
 
 @app.route('/api/resources/stats')
 @login_required
+@conditional_get(user=False, catalog=True, views=True, window=86400)
 def get_resource_stats():
     """获取资源统计信息"""
     try:
@@ -1491,6 +1803,52 @@ def get_resource_stats():
     except Exception as e:
         print(f"获取资源统计错误: {e}")
         return jsonify({'success': False})
+
+@app.route('/api/resources/<int:resource_id>/related')
+@login_required
+def get_related_resources(resource_id):
+    """获取相似资源（更多类似内容）"""
+    if resource_similarity is None:
+        return jsonify({'success': False, 'message': '相似资源功能未启用'})
+    
+    try:
+        limit = min(request.args.get('limit', 6, type=int), 20)
+        scored = resource_similarity.related(resource_id, limit=limit)
+        
+        ids = [other_id for _, other_id in scored]
+        resources = {
+            r.id: r for r in LearningResource.query.filter(LearningResource.id.in_(ids)).all()
+        } if ids else {}
+        
+        return jsonify({
+            'success': True,
+            'resource_id': resource_id,
+            'related': [
+                {
+                    'id': other_id,
+                    'title': resources[other_id].title,
+                    'description': resources[other_id].description,
+                    'url': resources[other_id].url,
+                    'type': resources[other_id].resource_type,
+                    'views': resources[other_id].views or 0,
+                    'similarity': round(similarity, 3)
+                }
+                for similarity, other_id in scored if other_id in resources
+            ]
+        })
+        
+    except Exception as e:
+        print(f"获取相似资源错误: {e}")
+        return jsonify({'success': False, 'message': str(e)})
+
+@app.route('/api/recommend/cache/stats')
+@login_required
+def get_recommend_cache_stats():
+    """获取推荐缓存命中统计"""
+    return jsonify({
+        'success': True,
+        'stats': recommend_cache.stats()
+    })
 # ========== AI助手路由 ==========
 @app.route('/ai_assistant')
 @login_required
@@ -1550,13 +1908,18 @@ def increment_resource_view(resource_id):
         resource = LearningResource.query.get_or_404(resource_id)
         resource.views = (resource.views or 0) + 1
         db.session.commit()
-        return jsonify({'success': True, 'views': resource.views})
+        
+        # 更新热门排行榜
+        views = resource.views
+        resource_popularity.record_view(resource.id, views)
+        return jsonify({'success': True, 'views': views})
     except:
         return jsonify({'success': False})
 
 # ========== AI API 路由 ==========
 @app.route('/api/ai/analyze')
 @login_required
+@conditional_get()
 def ai_analyze():
     """AI学习分析"""
     if not your_ai_client:
@@ -1575,15 +1938,18 @@ def ai_analyze():
     try:
         # 调用智谱AI分析
         analysis = ai_analyze_learning(current_user.id)
+        counters = user_counters(current_user.id)
         
         return jsonify({
             'success': True,
             'analysis': analysis,
             'stats': {
-                'total_tasks': Task.query.filter_by(user_id=current_user.id).count(),
-                'completed': Task.query.filter_by(user_id=current_user.id, status='completed').count(),
-                'completion_rate': round((Task.query.filter_by(user_id=current_user.id, status='completed').count() / 
-                                        max(Task.query.filter_by(user_id=current_user.id).count(), 1) * 100), 1)
+                'total_tasks': counters['total_tasks'],
+                'completed': counters['completed_tasks'],
+                'completion_rate': round(counters['completed_tasks'] / max(counters['total_tasks'], 1) * 100, 1),
+                'total_study_minutes': counters['total_study_minutes'],
+                'session_count': counters['session_count'],
+                'mood_entries': counters['mood_entries']
             }
         })
         
@@ -1624,6 +1990,7 @@ def ai_chat_api():
 
 @app.route('/api/ai/recommend', methods=['GET'])
 @login_required
+@conditional_get(catalog=True)
 def ai_recommend():
     """AI资源推荐（独立API）"""
     try:
@@ -1631,26 +1998,7 @@ def ai_recommend():
             recommendations = ai_enhanced_recommendations(current_user.id)
             
             # 格式化响应
-            formatted_recs = []
-            for rec in recommendations:
-                if isinstance(rec, dict) and rec.get('is_virtual'):
-                    formatted_recs.append({
-                        'title': rec['title'],
-                        'description': rec['description'],
-                        'url': rec['url'],
-                        'type': rec['resource_type'],
-                        'ai_recommended': True,
-                        'reason': rec.get('reason', '智谱AI智能推荐')
-                    })
-                else:
-                    formatted_recs.append({
-                        'title': rec.title,
-                        'description': rec.description,
-                        'url': rec.url,
-                        'type': rec.resource_type,
-                        'ai_recommended': False,
-                        'views': rec.views or 0
-                    })
+            formatted_recs = [format_recommendation(rec) for rec in recommendations]
             
             return jsonify({
                 'success': True,
@@ -1668,6 +2016,107 @@ def ai_recommend():
         print(f"❌ AI推荐API错误: {e}")
         return jsonify({'success': False, 'message': str(e)})
 
+# ========== 数据导出 ==========
+@app.route('/api/export/<kind>')
+@login_required
+def export_data(kind):
+    """流式导出当前用户的数据
+
+    kind: sessions（学习会话）/ tasks（任务）/ moods（心情记录）
+    参数：format=csv|ndjson；客户端接受gzip时边生成边压缩（gzip=0 可关闭）。
+    数据分批读取、逐块发送，内存占用与历史数据量无关。
+    """
+    if kind not in EXPORT_COLUMNS:
+        return jsonify({'success': False, 'message': f'不支持的导出类型: {kind}'}), 404
+    
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'message': f'不支持的导出格式: {fmt}'}), 400
+    
+    compress = request.args.get('gzip', '1') == '1' and 'gzip' in request.accept_encodings
+    filename = f"{kind}_{datetime.utcnow().strftime('%Y%m%d')}.{fmt}"
+    
+    response = Response(
+        stream_with_context(export_rows(kind, current_user.id, fmt, compress)),
+        content_type=EXPORT_FORMATS[fmt]
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['Vary'] = 'Accept-Encoding'
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+# ========== 仪表盘面板 API ==========
+@app.route('/api/dashboard/summary')
+@login_required
+# 紧急任务排序随时间变化，与 /api/tasks/urgent 一样每小时重新计算
+@conditional_get(window=3600)
+def dashboard_summary_api():
+    """仪表盘统计、紧急任务与健康建议（含渲染好的HTML片段）"""
+    try:
+        summary = dashboard_summary(current_user.id)
+        recent_mood = summary['recent_mood']
+        
+        return jsonify({
+            'success': True,
+            'summary': {
+                'total_tasks': summary['total_tasks'],
+                'completed_tasks': summary['completed_tasks'],
+                'pending_tasks': summary['pending_tasks'],
+                'completion_rate': summary['completion_rate'],
+                'recent_mood': {
+                    'score': recent_mood.mood_score,
+                    'created_at': recent_mood.created_at.isoformat()
+                } if recent_mood else None,
+                'urgent_tasks': [{
+                    'id': t.id,
+                    'title': t.title,
+                    'due_date': t.due_date.isoformat() if t.due_date else None
+                } for t in summary['urgent_tasks']],
+                'health_tips': summary['health_tips']
+            },
+            'html': {
+                'stats': render_template('partials/dashboard_stats.html', **summary),
+                'health_tips': render_template('partials/dashboard_health_tips.html', **summary),
+                'urgent_tasks': render_template('partials/dashboard_urgent_tasks.html', **summary)
+            }
+        })
+    except Exception as e:
+        print(f"❌ 仪表盘统计API错误: {e}")
+        return jsonify({'success': False, 'message': str(e)})
+
+@app.route('/api/dashboard/recommendations')
+@login_required
+def dashboard_recommendations_api():
+    """仪表盘资源推荐（含渲染好的HTML片段）
+
+    ETag由用户数据和资源库的版本号决定（保存在数据库中，多个工作进程之间一致），
+    并按缓存有效期分段，因此客户端缓存仍然有效时无需计算推荐即可返回304。
+    """
+    try:
+        # 与推荐缓存一致，只修改访问量不影响推荐结果
+        user_version, catalog_version, _ = data_versions.token(current_user.id)
+        window = int(time.time() // recommend_cache.ttl)
+        etag = f"rec-{current_user.id}-{user_version}-{catalog_version}-{window}"
+        
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+        
+        learning_resources = ai_enhanced_recommendations(current_user.id)
+        
+        return etag_json_response({
+            'success': True,
+            'recommendations': [format_recommendation(rec) for rec in learning_resources],
+            'ai_enabled': your_ai_client is not None,
+            'html': render_template('partials/dashboard_recommendations.html',
+                                    learning_resources=learning_resources)
+        }, etag=etag)
+    except Exception as e:
+        print(f"❌ 仪表盘推荐API错误: {e}")
+        return jsonify({'success': False, 'message': str(e)})
+
 # ========== 错误处理 ==========
 @app.errorhandler(404)
 def page_not_found(e):
@@ -1677,6 +2126,93 @@ def page_not_found(e):
 def internal_server_error(e):
     return render_template('500.html'), 500
 
+# ========== 命令行 ==========
+recommend_cli = AppGroup('recommend', help='推荐相关命令')
+
+@recommend_cli.command('precompute')
+@click.option('--user-id', type=int, multiple=True, help='只计算指定用户（可重复）')
+@click.option('--batch-size', type=int, default=500, show_default=True, help='每批处理的用户数')
+def precompute_command(user_id, batch_size):
+    """为所有活跃用户预计算推荐结果"""
+    started = time.time()
+    count = precompute_recommendations(list(user_id) or None, batch_size=batch_size)
+    print(f"✅ 推荐预计算完成：{count} 个用户，耗时 {time.time() - started:.1f} 秒")
+
+app.cli.add_command(recommend_cli)
+
+study_cli = AppGroup('study', help='学习统计相关命令')
+
+@study_cli.command('backfill-rollup')
+@click.option('--user-id', type=int, multiple=True, help='只重建指定用户（可重复）')
+def backfill_rollup_command(user_id):
+    """根据学习会话重建每日汇总表 study_daily_rollup"""
+    started = time.time()
+    count = backfill_study_rollup(list(user_id) or None)
+    print(f"✅ 学习每日汇总重建完成：{count} 行，耗时 {time.time() - started:.1f} 秒")
+
+app.cli.add_command(study_cli)
+
+db_cli = AppGroup('db', help='数据库结构迁移命令')
+
+@db_cli.command('upgrade')
+@click.option('--target', type=int, default=None, help='升级到指定版本（默认最新）')
+def db_upgrade_command(target):
+    """创建新表并执行未执行过的迁移"""
+    applied = upgrade_schema(target)
+    print(f"✅ 数据库结构已是版本 {current_schema_version()}（本次执行 {len(applied)} 个迁移）")
+
+@db_cli.command('current')
+def db_current_command():
+    """显示当前结构版本和未执行的迁移"""
+    version = current_schema_version()
+    print(f"当前结构版本: {version}")
+    for number, name, _ in MIGRATIONS:
+        if number > version:
+            print(f"  待执行: {number:03d} {name}")
+
+app.cli.add_command(db_cli)
+
+tasks_cli = AppGroup('tasks', help='任务相关命令')
+
+@tasks_cli.command('import')
+@click.argument('file', type=click.File('rb'))
+@click.option('--format', 'fmt', type=click.Choice(IMPORT_FORMATS), default=None, help='文件格式（默认按扩展名判断）')
+@click.option('--user', default=None, help='没有 user 列的行导入给该用户（用户名或邮箱）')
+@click.option('--chunk-size', type=int, default=500, show_default=True, help='每个事务写入的行数')
+@click.option('--errors', 'errors_file', type=click.File('w'), default=None, help='把无效行写入该CSV文件')
+def import_tasks_command(file, fmt, user, chunk_size, errors_file):
+    """从 CSV / JSON lines / iCalendar 文件批量导入任务（可导入给多个用户）"""
+    fmt = fmt or detect_format(file.name)
+    if fmt is None:
+        raise click.UsageError('无法根据扩展名判断文件格式，请使用 --format')
+    default_user_id = None
+    if user:
+        default_user = User.query.filter(db.or_(User.username == user, User.email == user)).first()
+        if default_user is None:
+            raise click.UsageError(f'用户不存在: {user}')
+        default_user_id = default_user.id
+    
+    writer = csv.writer(errors_file) if errors_file else None
+    if writer:
+        writer.writerow(['line', 'message'])
+    def report(line, message):
+        if writer:
+            writer.writerow([line, message])
+        else:
+            print(f"  第 {line} 行: {message}")
+    
+    started = time.time()
+    try:
+        summary = import_tasks(file, fmt, default_user_id=default_user_id,
+                               on_error=report, chunk_size=chunk_size)
+    except ValueError as e:
+        db.session.rollback()
+        raise click.ClickException(str(e))
+    print(f"✅ 任务导入完成：{summary['imported']} 个任务（{summary['users']} 个用户），"
+          f"{summary['failed']} 行无效，耗时 {time.time() - started:.1f} 秒")
+
+app.cli.add_command(tasks_cli)
+
 # ========== 启动应用 ==========
 if __name__ == '__main__':
     print("=" * 50)
@@ -1686,6 +2222,11 @@ if __name__ == '__main__':
     with app.app_context():
         init_database()
     
+    # 可选：后台定期预计算推荐
+    if app.config['RECOMMEND_PRECOMPUTE_INTERVAL'] > 0:
+        start_precompute_worker(app, app.config['RECOMMEND_PRECOMPUTE_INTERVAL'])
+        print(f"🔁 推荐预计算后台任务已启动，间隔 {app.config['RECOMMEND_PRECOMPUTE_INTERVAL']} 秒")
+    
     print("🌐 访问地址: http://127.0.0.1:5000")
     print("📱 可在同一WiFi下的手机访问本机IP地址")
     app.run(debug=True, port=5000, host='0.0.0.0')
\ No newline at end of file
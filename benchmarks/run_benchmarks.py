@@ -0,0 +1,205 @@
+# benchmarks/run_benchmarks.py - 推荐与分析热点路径的基准测试
+"""
+用法（在项目根目录执行）：
+
+    python benchmarks/run_benchmarks.py --resources 100000 --users 10000 \\
+        --tasks 1000000 --sessions 5000000 --output benchmarks/results/baseline.json
+
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/baseline.json
+
+数据库不存在（或指定 --reseed）时按给定规模生成数据；结果按函数输出
+p50/p95/p99 延迟（毫秒）与每次调用的SQL查询数，并保存为JSON便于对比。
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def percentile(sorted_values, pct):
+    """最近秩法百分位数"""
+    if not sorted_values:
+        return 0
+    index = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+class QueryCounter:
+    """统计引擎执行的SQL语句数"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+
+def build_benchmarks(A):
+    """待测函数：名称 -> 以用户ID为参数的可调用对象"""
+    from flask_login import login_user
+    from models import User
+
+    def as_user(view):
+        def call(user_id):
+            with A.app.test_request_context():
+                login_user(A.db.session.get(User, user_id))
+                return view()
+        return call
+
+    return {
+        'recommend_learning_resources': A.recommend_learning_resources,
+        'ai_enhanced_recommendations': A.ai_enhanced_recommendations,
+        'get_study_statistics': as_user(A.get_study_statistics),
+        'ai_analyze_learning': A.ai_analyze_learning,
+    }
+
+
+def reset_caches():
+    """清空进程内缓存，测量冷路径"""
+    from recommend_cache import recommend_cache
+    recommend_cache.clear()
+
+
+def run(args):
+    db_path = os.path.abspath(args.db)
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+    if args.reseed and os.path.exists(db_path):
+        os.remove(db_path)
+    need_seed = not os.path.exists(db_path)
+
+    import app as A
+    from models import db, User, Task, LearningResource, StudySession
+    from benchmarks.seed_data import seed_database
+
+    with A.app.app_context():
+        if need_seed:
+            seed_database(args.resources, args.users, args.tasks, args.sessions, seed=args.seed)
+
+        scale = {
+            'resources': LearningResource.query.count(),
+            'users': User.query.count(),
+            'tasks': Task.query.count(),
+            'sessions': StudySession.query.count(),
+        }
+        print(f"📊 数据规模: {scale}")
+
+        rng = random.Random(args.seed)
+        user_ids = rng.sample(range(1, scale['users'] + 1), min(args.sample_users, scale['users']))
+
+        counter = QueryCounter(db.engine)
+        benchmarks = build_benchmarks(A)
+        selected = args.only or list(benchmarks)
+
+        results = {}
+        for name in selected:
+            func = benchmarks[name]
+
+            # 预热（构建索引、矩阵等一次性开销不计入）
+            func(user_ids[0])
+
+            timings, queries = [], []
+            for _ in range(args.iterations):
+                for user_id in user_ids:
+                    if not args.warm:
+                        reset_caches()
+                    db.session.expire_all()
+                    before = counter.count
+                    started = time.perf_counter()
+                    func(user_id)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    queries.append(counter.count - before)
+                    db.session.rollback()
+
+            timings.sort()
+            results[name] = {
+                'calls': len(timings),
+                'p50_ms': round(percentile(timings, 50), 3),
+                'p95_ms': round(percentile(timings, 95), 3),
+                'p99_ms': round(percentile(timings, 99), 3),
+                'mean_ms': round(sum(timings) / len(timings), 3),
+                'max_ms': round(timings[-1], 3),
+                'queries_per_call': round(sum(queries) / len(queries), 2),
+            }
+            r = results[name]
+            print(f"  {name:32s} p50 {r['p50_ms']:9.2f}ms  p95 {r['p95_ms']:9.2f}ms  "
+                  f"p99 {r['p99_ms']:9.2f}ms  SQL {r['queries_per_call']}")
+
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                         cwd=ROOT, text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        commit = None
+
+    return {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'commit': commit,
+            'python': platform.python_version(),
+            'scale': scale,
+            'sample_users': len(user_ids),
+            'iterations': args.iterations,
+            'warm_cache': args.warm,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline_path):
+    """与历史结果对比，打印p50/p95变化"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    print(f"\n📈 与 {baseline_path}（{baseline['meta'].get('commit')}）对比:")
+    for name, r in current['results'].items():
+        old = baseline['results'].get(name)
+        if not old:
+            continue
+        for key in ('p50_ms', 'p95_ms'):
+            change = (r[key] - old[key]) / old[key] * 100 if old[key] else 0
+            print(f"  {name:32s} {key}: {old[key]:9.2f} -> {r[key]:9.2f} ({change:+.1f}%)")
+        print(f"  {name:32s} SQL: {old['queries_per_call']} -> {r['queries_per_call']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CampusPulse 热点路径基准测试')
+    parser.add_argument('--db', default=os.path.join(ROOT, 'benchmarks', 'bench.db'), help='基准数据库路径')
+    parser.add_argument('--reseed', action='store_true', help='删除并重新生成数据库')
+    parser.add_argument('--resources', type=int, default=10000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--tasks', type=int, default=50000)
+    parser.add_argument('--sessions', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--sample-users', type=int, default=20, help='参与测试的随机用户数')
+    parser.add_argument('--iterations', type=int, default=5, help='每个用户重复次数')
+    parser.add_argument('--warm', action='store_true', help='保留推荐缓存（默认每次调用前清空）')
+    parser.add_argument('--only', action='append', help='只运行指定函数（可重复）')
+    parser.add_argument('--output', help='结果JSON路径（默认 benchmarks/results/<时间>.json）')
+    parser.add_argument('--compare', help='与之前的结果JSON对比')
+    args = parser.parse_args()
+
+    result = run(args)
+
+    output = args.output or os.path.join(
+        ROOT, 'benchmarks', 'results', datetime.utcnow().strftime('%Y%m%d-%H%M%S') + '.json'
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 结果已保存: {output}")
+
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == '__main__':
+    main()
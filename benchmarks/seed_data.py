@@ -0,0 +1,121 @@
+# benchmarks/seed_data.py - 生成基准测试用的大规模SQLite数据
+import random
+import time
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from models import db, User, Task, LearningResource, StudySession, MoodLog
+from migrations import upgrade
+from resource_index import backfill_resource_tokens
+from study_rollup import backfill_study_rollup
+from user_counters import backfill_user_counters
+from task_search import backfill_task_bigrams
+
+# 用于生成资源标题和任务文本的词表（中英文混合，贴近真实数据）
+SUBJECTS = [
+    'Python', 'Java', 'JavaScript', 'React', 'Vue.js', 'Node.js', 'Go', 'Rust', 'SQL',
+    '数据结构', '算法', '机器学习', '深度学习', '高等数学', '线性代数', '概率论',
+    '大学英语', '日语', '经济学', '会计', '设计', '摄影', '健身', '心理学', 'Web开发',
+]
+ACTIONS = ['入门', '教程', '实战', '复习', '作业', '考试', '项目', '笔记', '练习', '文档']
+TYPES = ['编程开发', '前端开发', '数据科学', '人工智能', '学术学习', '语言学习', '生活技能', '健康养生']
+
+CHUNK = 20000   # 每批插入行数
+
+
+def _text(rng):
+    return f"{rng.choice(SUBJECTS)}{rng.choice(ACTIONS)}"
+
+
+def _insert(table, rows):
+    if rows:
+        db.session.execute(table.insert(), rows)
+
+
+def seed_database(resources=10000, users=1000, tasks=50000, sessions=200000, moods=None, seed=42):
+    """按给定规模批量写入数据（需要应用上下文，数据库应为空）
+
+    任务按用户顺序连续分配ID，学习会话只关联所属用户自己的任务。
+    数据用批量语句写入，不触发ORM事件；最后回填分词表、每日汇总、用户计数和任务二元分词索引，
+    使基准测试走与正式数据库相同的路径。
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    moods = users * 30 if moods is None else moods
+    started = time.time()
+
+    # 与正式数据库一样执行迁移（含任务全文索引及触发器）
+    upgrade()
+    password_hash = generate_password_hash('bench')
+
+    # 用户
+    _insert(User.__table__, [
+        {'id': i, 'username': f'bench{i}', 'email': f'bench{i}@example.com',
+         'password_hash': password_hash, 'created_at': now}
+        for i in range(1, users + 1)
+    ])
+
+    # 学习资源
+    for start in range(1, resources + 1, CHUNK):
+        _insert(LearningResource.__table__, [
+            {'id': i, 'title': f'{_text(rng)} {i}', 'description': f'{_text(rng)}，{_text(rng)}',
+             'url': f'https://example.com/resource/{i}', 'resource_type': rng.choice(TYPES),
+             'keywords': ','.join(rng.sample(SUBJECTS, 3)), 'views': rng.randint(0, 5000),
+             'created_at': now - timedelta(days=rng.randint(0, 365))}
+            for i in range(start, min(start + CHUNK, resources + 1))
+        ])
+        db.session.commit()
+
+    # 任务：均匀分配给用户
+    tasks_per_user = max(tasks // users, 1)
+    for start in range(1, tasks + 1, CHUNK):
+        _insert(Task.__table__, [
+            {'id': i, 'title': _text(rng), 'description': _text(rng) if rng.random() < 0.5 else '',
+             'priority': rng.randint(1, 3), 'status': 'completed' if rng.random() < 0.4 else 'pending',
+             'due_date': now + timedelta(days=rng.randint(-30, 60)) if rng.random() < 0.7 else None,
+             'created_at': now - timedelta(days=rng.randint(0, 365)),
+             'user_id': min((i - 1) // tasks_per_user + 1, users)}
+            for i in range(start, min(start + CHUNK, tasks + 1))
+        ])
+        db.session.commit()
+
+    # 学习会话：过去一年内，关联用户自己的任务或自定义备注
+    for start in range(1, sessions + 1, CHUNK):
+        rows = []
+        for i in range(start, min(start + CHUNK, sessions + 1)):
+            user_id = rng.randint(1, users)
+            begin = now - timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+            duration = rng.randint(5, 120)
+            first_task = (user_id - 1) * tasks_per_user + 1
+            task_id = rng.randint(first_task, first_task + tasks_per_user - 1) \
+                if rng.random() < 0.8 and first_task <= tasks else None
+            rows.append({
+                'id': i, 'user_id': user_id, 'task_id': task_id,
+                'start_time': begin, 'end_time': begin + timedelta(minutes=duration),
+                'duration_minutes': duration, 'focus_score': rng.randint(1, 5),
+                'notes': None if task_id else _text(rng), 'session_type': 'focus',
+                'created_at': begin
+            })
+        _insert(StudySession.__table__, rows)
+        db.session.commit()
+
+    # 心情记录
+    for start in range(1, moods + 1, CHUNK):
+        _insert(MoodLog.__table__, [
+            {'id': i, 'mood_score': rng.randint(1, 5), 'note': '',
+             'created_at': now - timedelta(days=rng.randint(0, 365)),
+             'user_id': rng.randint(1, users)}
+            for i in range(start, min(start + CHUNK, moods + 1))
+        ])
+        db.session.commit()
+
+    # 派生表
+    backfill_resource_tokens()
+    backfill_study_rollup()
+    with db.engine.begin() as connection:
+        backfill_user_counters(connection)
+        backfill_task_bigrams(connection)
+
+    print(f"✅ 基准数据生成完成：{resources} 资源，{users} 用户，{tasks} 任务，"
+          f"{sessions} 学习会话，{moods} 心情记录，耗时 {time.time() - started:.1f} 秒")
@@ -0,0 +1,108 @@
+# data_export.py - 用户数据流式导出（CSV / NDJSON，可选gzip）
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+
+from models import db, Task, MoodLog, StudySession
+
+CHUNK = 1000            # 每批从数据库读取并输出的行数
+
+# 导出类型 -> (字段名, 查询列)；查询按ID顺序
+EXPORT_COLUMNS = {
+    'sessions': [
+        ('id', StudySession.id),
+        ('task_id', StudySession.task_id),
+        ('task_title', Task.title),
+        ('start_time', StudySession.start_time),
+        ('end_time', StudySession.end_time),
+        ('duration_minutes', StudySession.duration_minutes),
+        ('focus_score', StudySession.focus_score),
+        ('session_type', StudySession.session_type),
+        ('notes', StudySession.notes),
+    ],
+    'tasks': [
+        ('id', Task.id),
+        ('title', Task.title),
+        ('description', Task.description),
+        ('priority', Task.priority),
+        ('status', Task.status),
+        ('due_date', Task.due_date),
+        ('created_at', Task.created_at),
+        ('completed_at', Task.completed_at),
+    ],
+    'moods': [
+        ('id', MoodLog.id),
+        ('mood_score', MoodLog.mood_score),
+        ('note', MoodLog.note),
+        ('created_at', MoodLog.created_at),
+    ],
+}
+# 格式 -> 完整的 Content-Type（作为 content_type 传给 Response，不会再追加 charset）
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def _export_query(kind, user_id):
+    columns = [column for _, column in EXPORT_COLUMNS[kind]]
+    query = db.select(*columns)
+    if kind == 'sessions':
+        query = query.outerjoin(Task, Task.id == StudySession.task_id)\
+                     .where(StudySession.user_id == user_id)\
+                     .order_by(StudySession.id)
+    elif kind == 'tasks':
+        query = query.where(Task.user_id == user_id).order_by(Task.id)
+    else:
+        query = query.where(MoodLog.user_id == user_id).order_by(MoodLog.id)
+    # 服务端分批读取，内存中最多保留 CHUNK 行
+    return query.execution_options(yield_per=CHUNK)
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+
+def _csv_chunks(names, partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # 带BOM，Excel打开中文不乱码
+    buffer.write('\ufeff')
+    writer.writerow(names)
+    for rows in partitions:
+        writer.writerows([_value(v) for v in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(names, partitions):
+    for rows in partitions:
+        yield ''.join(
+            json.dumps(dict(zip(names, map(_value, row))), ensure_ascii=False) + '\n'
+            for row in rows
+        )
+
+
+def _gzip_chunks(chunks):
+    """边生成边压缩（gzip格式），只在压缩器产生输出时才向客户端发送"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_rows(kind, user_id, fmt='csv', compress=False):
+    """生成导出内容的字节块（需要应用上下文，应在流式响应中迭代）"""
+    names = [name for name, _ in EXPORT_COLUMNS[kind]]
+    partitions = db.session.execute(_export_query(kind, user_id)).partitions()
+    chunks = _csv_chunks(names, partitions) if fmt == 'csv' else _ndjson_chunks(names, partitions)
+    if compress:
+        return _gzip_chunks(chunks)
+    return (chunk.encode('utf-8') for chunk in chunks)
@@ -0,0 +1,125 @@
+# data_versions.py - 用户数据与资源库的版本号（用于ETag条件请求）
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from models import db, Task, MoodLog, LearningResource, ChatMessage, StudySession, DataVersion
+
+# 写入后使该用户版本号递增的模型
+USER_MODELS = (Task, StudySession, MoodLog, ChatMessage)
+
+CATALOG_SCOPE = 'catalog'
+# 资源访问量单独计数：每次点击都会修改 views，不应让资源库相关的ETag全部失效
+VIEWS_SCOPE = 'catalog_views'
+
+
+def _user_scope(user_id):
+    return f'user:{user_id}'
+
+
+class DataVersions:
+    """保存在数据库 data_versions 表中的版本计数器
+
+    每个用户一个计数器，该用户的任务、学习会话、心情记录、聊天记录写入时在同一事务内递增；
+    资源库另有一个全局计数器（只修改访问量时递增单独的访问量计数器）。
+    版本号没变说明数据没变，读接口据此直接返回304。
+    计数器在数据库中，多个工作进程和重启后都一致；读取是一次主键查询。
+    """
+
+    def _versions(self, scopes):
+        table = DataVersion.__table__
+        return dict(db.session.execute(
+            db.select(table.c.scope, table.c.version).where(table.c.scope.in_(scopes))
+        ).all())
+
+    def user_version(self, user_id):
+        """用户数据版本号（需要应用上下文）"""
+        return self._versions([_user_scope(user_id)]).get(_user_scope(user_id), 0)
+
+    def token(self, user_id):
+        """(用户版本号, 资源库版本号, 资源访问量版本号)"""
+        scopes = [_user_scope(user_id), CATALOG_SCOPE, VIEWS_SCOPE]
+        versions = self._versions(scopes)
+        return tuple(versions.get(scope, 0) for scope in scopes)
+
+    def _bump(self, connection, scopes):
+        table = DataVersion.__table__
+        for scope in sorted(scopes):
+            result = connection.execute(
+                table.update().where(table.c.scope == scope).values(version=table.c.version + 1)
+            )
+            if not result.rowcount:
+                connection.execute(table.insert(), {'scope': scope, 'version': 1})
+
+    def bump_users(self, user_ids):
+        """批量写入（不经过ORM，不触发下面的事件）后调用，在当前事务内递增这些用户的版本号"""
+        self._bump(db.session.connection(), {_user_scope(user_id) for user_id in user_ids})
+
+    def bump_catalog(self):
+        self._bump(db.session.connection(), {CATALOG_SCOPE})
+
+
+# 全局实例
+data_versions = DataVersions()
+
+
+# ========== 写入时在同一事务内递增版本号 ==========
+def _pending(target):
+    session = object_session(target)
+    if session is None:
+        return None
+    return session.info.setdefault('data_versions_pending', {'users': set(), 'catalog': False, 'views': False})
+
+
+def _user_data_changed(mapper, connection, target):
+    pending = _pending(target)
+    if pending is not None:
+        pending['users'].add(target.user_id)
+
+
+def _catalog_changed(mapper, connection, target):
+    pending = _pending(target)
+    if pending is not None:
+        pending['catalog'] = True
+
+
+def _resource_updated(mapper, connection, target):
+    state = inspect(target)
+    changed = {prop.key for prop in mapper.column_attrs if state.attrs[prop.key].history.has_changes()}
+    if not changed:
+        return
+    pending = _pending(target)
+    if pending is None:
+        return
+    if changed == {'views'}:
+        pending['views'] = True
+    else:
+        pending['catalog'] = True
+
+
+for _model in USER_MODELS:
+    for _name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _name, _user_data_changed)
+
+event.listen(LearningResource, 'after_insert', _catalog_changed)
+event.listen(LearningResource, 'after_delete', _catalog_changed)
+event.listen(LearningResource, 'after_update', _resource_updated)
+
+
+@event.listens_for(Session, 'after_flush')
+def _apply_versions(session, flush_context):
+    """与写入在同一事务内递增，回滚的写入不影响版本号"""
+    pending = session.info.pop('data_versions_pending', None)
+    if not pending:
+        return
+    scopes = {_user_scope(user_id) for user_id in pending['users'] if user_id is not None}
+    if pending['catalog']:
+        scopes.add(CATALOG_SCOPE)
+    if pending['views']:
+        scopes.add(VIEWS_SCOPE)
+    if scopes:
+        data_versions._bump(session.connection(), scopes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_versions(session):
+    session.info.pop('data_versions_pending', None)
@@ -0,0 +1,174 @@
+# migrations.py - 数据库结构版本迁移（create_all 只建新表，已有表的变更在这里按版本执行）
+from datetime import datetime
+
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateTable
+
+from models import db, SchemaVersion
+from user_counters import backfill_user_counters
+from task_search import create_task_search
+
+# 每个迁移只做“缺什么补什么”（列、索引已存在或外键已是最新时跳过），
+# 因此对 create_all 新建的数据库或中途失败后重跑都是安全的。
+
+
+# ========== 迁移操作 ==========
+def add_column(connection, table, column_name):
+    """给已有表补一列（只支持可为空的列）"""
+    existing = {c['name'] for c in inspect(connection).get_columns(table.name)}
+    if column_name in existing:
+        return False
+    column = table.columns[column_name]
+    column_type = column.type.compile(dialect=connection.dialect)
+    connection.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}')
+    return True
+
+
+def create_index(connection, table, index_name):
+    """按模型中的定义创建索引"""
+    existing = {index['name'] for index in inspect(connection).get_indexes(table.name)}
+    if index_name in existing:
+        return False
+    index = next(index for index in table.indexes if index.name == index_name)
+    index.create(connection)
+    return True
+
+
+def _foreign_key_actions(connection, table_name):
+    """数据库中该表各外键的 (本表列, ON DELETE)"""
+    return {
+        (tuple(fk['constrained_columns']), (fk.get('options') or {}).get('ondelete'))
+        for fk in inspect(connection).get_foreign_keys(table_name)
+    }
+
+
+def _model_foreign_key_actions(table):
+    return {
+        (tuple(fk.column_keys), fk.ondelete)
+        for fk in table.foreign_key_constraints
+    }
+
+
+def rebuild_foreign_keys(connection, table):
+    """SQLite 不能修改已有外键：按模型建新表、复制数据、替换旧表（外键检查已由 upgrade 关闭）
+
+    其他数据库的外键在建表时已与模型一致，不需要处理。
+    """
+    if connection.dialect.name != 'sqlite':
+        return False
+    if _foreign_key_actions(connection, table.name) == _model_foreign_key_actions(table):
+        return False
+
+    existing = {c['name'] for c in inspect(connection).get_columns(table.name)}
+    temp_name = f'{table.name}__rebuilt'
+    ddl = str(CreateTable(table).compile(dialect=connection.dialect)).strip()
+    connection.exec_driver_sql(ddl.replace(f'CREATE TABLE {table.name} (', f'CREATE TABLE {temp_name} (', 1))
+
+    columns = ', '.join(c.name for c in table.columns if c.name in existing)
+    connection.exec_driver_sql(f'INSERT INTO {temp_name} ({columns}) SELECT {columns} FROM {table.name}')
+    connection.exec_driver_sql(f'DROP TABLE {table.name}')
+    connection.exec_driver_sql(f'ALTER TABLE {temp_name} RENAME TO {table.name}')
+    for index in table.indexes:
+        index.create(connection)
+    return True
+
+
+# ========== 迁移列表（只能在末尾追加，已发布的迁移不要修改） ==========
+def _table(name):
+    return db.metadata.tables[name]
+
+
+def _001_task_completed_at_and_cascades(connection):
+    add_column(connection, _table('tasks'), 'completed_at')
+    for name in ('study_sessions', 'study_session_sync', 'resource_tokens', 'user_recommendations'):
+        rebuild_foreign_keys(connection, _table(name))
+
+
+def _002_keyset_pagination_indexes(connection):
+    create_index(connection, _table('study_sessions'), 'ix_study_sessions_user_start')
+    create_index(connection, _table('chat_messages'), 'ix_chat_messages_user_created')
+    create_index(connection, _table('tasks'), 'ix_tasks_user_created')
+
+
+def _003_task_urgency(connection):
+    add_column(connection, _table('tasks'), 'estimated_minutes')
+    create_index(connection, _table('tasks'), 'ix_tasks_user_status_due')
+
+
+def _004_per_user_hot_path_indexes(connection):
+    create_index(connection, _table('mood_logs'), 'ix_mood_logs_user_created')
+    create_index(connection, _table('study_sessions'), 'ix_study_sessions_user_end')
+
+
+def _005_user_counters(connection):
+    # 表由 create_all 创建，这里为已有用户生成计数行
+    backfill_user_counters(connection)
+
+
+def _006_task_search_index(connection):
+    # 全文索引和触发器原来在应用启动时创建，只执行 flask db upgrade 的数据库没有索引
+    create_task_search(connection)
+
+
+def _007_task_urgency_candidates(connection):
+    create_index(connection, _table('tasks'), 'ix_tasks_user_status_priority_due')
+    create_index(connection, _table('tasks'), 'ix_tasks_user_status_priority_effort')
+
+
+def _008_task_bigrams_without_triggers(connection):
+    # 二元分词索引改由应用同步：删除调用应用函数的触发器，无内容表改为普通表并重建
+    create_task_search(connection)
+
+
+MIGRATIONS = [
+    (1, 'task_completed_at_and_cascades', _001_task_completed_at_and_cascades),
+    (2, 'keyset_pagination_indexes', _002_keyset_pagination_indexes),
+    (3, 'task_urgency', _003_task_urgency),
+    (4, 'per_user_hot_path_indexes', _004_per_user_hot_path_indexes),
+    (5, 'user_counters', _005_user_counters),
+    (6, 'task_search_index', _006_task_search_index),
+    (7, 'task_urgency_candidates', _007_task_urgency_candidates),
+    (8, 'task_bigrams_without_triggers', _008_task_bigrams_without_triggers),
+]
+HEAD = MIGRATIONS[-1][0]
+
+
+# ========== 执行 ==========
+def current_version():
+    """数据库当前的结构版本（还没有版本表时为0，需要应用上下文）"""
+    if not inspect(db.engine).has_table(SchemaVersion.__tablename__):
+        return 0
+    return db.session.query(db.func.max(SchemaVersion.version)).scalar() or 0
+
+
+def upgrade(target=None):
+    """建新表并执行未执行过的迁移，直到 target 版本（默认最新），返回执行的迁移名
+
+    需要应用上下文。每个迁移执行完成后立即记录版本号。
+    """
+    target = HEAD if target is None else target
+    db.create_all()
+    applied = {version for (version,) in db.session.query(SchemaVersion.version)}
+    db.session.commit()
+    pending = [m for m in MIGRATIONS if m[0] not in applied and m[0] <= target]
+    if not pending:
+        return []
+
+    done = []
+    with db.engine.connect() as connection:
+        is_sqlite = connection.dialect.name == 'sqlite'
+        if is_sqlite:
+            # 必须在事务外切换；重建表期间暂时不检查外键
+            connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+        try:
+            for version, name, migrate in pending:
+                migrate(connection)
+                connection.execute(SchemaVersion.__table__.insert(),
+                                   {'version': version, 'name': name, 'applied_at': datetime.utcnow()})
+                connection.commit()
+                done.append(name)
+                print(f"🛠️ 已执行数据库迁移 {version:03d} {name}")
+        finally:
+            if is_sqlite:
+                connection.exec_driver_sql('PRAGMA foreign_keys=ON')
+    return done
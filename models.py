@@ -1,10 +1,21 @@
 # models.py - 修正版（解决循环引用）
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from datetime import datetime
+import sqlite3
 
 # 创建数据库实例
 db = SQLAlchemy()
 
+@event.listens_for(Engine, 'connect')
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite 默认不检查外键，开启后 ON DELETE 级联才会生效"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -50,10 +61,22 @@ class Task(db.Model):
     status = db.Column(db.String(20), default='pending')
     due_date = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
+    estimated_minutes = db.Column(db.Integer)     # 预计用时（分钟），用于紧急度排序
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
-    # 学习计时器关联
-    study_sessions = db.relationship('StudySession', backref='task', lazy=True, cascade='all, delete-orphan')
+    # 学习计时器关联：删除任务时由数据库级联删除学习会话（ON DELETE CASCADE），不逐个加载
+    study_sessions = db.relationship('StudySession', backref='task', lazy=True,
+                                     cascade='all, delete-orphan', passive_deletes=True)
+    
+    # 任务列表按创建时间游标分页、按状态和截止日期筛选；紧急任务按优先级分别
+    # 取截止最早的和预计用时最长的候选
+    __table_args__ = (
+        db.Index('ix_tasks_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_tasks_user_status_due', 'user_id', 'status', 'due_date', 'priority'),
+        db.Index('ix_tasks_user_status_priority_due', 'user_id', 'status', 'priority', 'due_date'),
+        db.Index('ix_tasks_user_status_priority_effort', 'user_id', 'status', 'priority', 'estimated_minutes'),
+    )
     
     def __repr__(self):
         return f'<Task {self.title}>'
@@ -67,6 +90,11 @@ class MoodLog(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
+    # 最近心情、心情历史按时间倒序读取
+    __table_args__ = (
+        db.Index('ix_mood_logs_user_created', 'user_id', 'created_at'),
+    )
+    
     def __repr__(self):
         return f'<MoodLog {self.mood_score}/5>'
 
@@ -85,6 +113,30 @@ class LearningResource(db.Model):
     def __repr__(self):
         return f'<Resource {self.title}>'
 
+class ResourceToken(db.Model):
+    """资源分词表（预先计算，用于推荐匹配）"""
+    __tablename__ = 'resource_tokens'
+    
+    resource_id = db.Column(db.Integer, db.ForeignKey('learning_resources.id', ondelete='CASCADE'), primary_key=True)
+    token = db.Column(db.String(100), primary_key=True, index=True)
+    weight = db.Column(db.Integer, nullable=False, default=1)
+    
+    def __repr__(self):
+        return f'<ResourceToken {self.resource_id}:{self.token}>'
+
+class UserRecommendation(db.Model):
+    """离线预计算的用户推荐结果"""
+    __tablename__ = 'user_recommendations'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    resource_id = db.Column(db.Integer, db.ForeignKey('learning_resources.id', ondelete='CASCADE'), nullable=False)
+    score = db.Column(db.Float, default=0)
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<UserRecommendation {self.user_id}#{self.rank} -> {self.resource_id}>'
+
 class ChatMessage(db.Model):
     __tablename__ = 'chat_messages'
     
@@ -95,6 +147,11 @@ class ChatMessage(db.Model):
     is_ai = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # 聊天记录按时间游标分页
+    __table_args__ = (
+        db.Index('ix_chat_messages_user_created', 'user_id', 'created_at', 'id'),
+    )
+    
     def __repr__(self):
         return f'<ChatMessage {self.id}>'
 
@@ -104,7 +161,7 @@ class StudySession(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=True)
+    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id', ondelete='CASCADE'), nullable=True)
     start_time = db.Column(db.DateTime, nullable=False)
     end_time = db.Column(db.DateTime)
     duration_minutes = db.Column(db.Integer, default=0)
@@ -113,9 +170,79 @@ class StudySession(db.Model):
     session_type = db.Column(db.String(20), default='focus')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # 学习历史按开始时间游标分页；活跃会话按 end_time 为空查找
+    __table_args__ = (
+        db.Index('ix_study_sessions_user_start', 'user_id', 'start_time', 'id'),
+        db.Index('ix_study_sessions_user_end', 'user_id', 'end_time'),
+    )
+    
     def __repr__(self):
         return f'<StudySession {self.id} - {self.duration_minutes}分钟>'
     
     @property
     def is_active(self):
-        return self.end_time is None
\ No newline at end of file
+        return self.end_time is None
+
+class StudySessionSync(db.Model):
+    """离线同步的学习会话：客户端生成的ID -> 会话ID（重复提交时直接返回已有会话）"""
+    __tablename__ = 'study_session_sync'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    client_id = db.Column(db.String(64), primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('study_sessions.id', ondelete='CASCADE'), nullable=False)
+    synced_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<StudySessionSync {self.user_id}:{self.client_id} -> {self.session_id}>'
+
+class StudyDailyRollup(db.Model):
+    """已结束学习会话按 用户/日期/任务 的每日汇总（统计接口只读这张表）"""
+    __tablename__ = 'study_daily_rollup'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    # 't:<任务ID>' 表示关联任务，'n:<显示名>' 表示自由学习（按备注区分）
+    task_key = db.Column(db.String(64), primary_key=True)
+    minutes = db.Column(db.Integer, nullable=False, default=0)
+    sessions = db.Column(db.Integer, nullable=False, default=0)
+    focus_sum = db.Column(db.Integer, nullable=False, default=0)
+    focus_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<StudyDailyRollup {self.user_id} {self.day} {self.task_key}>'
+
+class UserCounter(db.Model):
+    """每个用户的汇总计数（任务、学习会话、心情记录写入时在同一事务内按增量更新）"""
+    __tablename__ = 'user_counters'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    total_tasks = db.Column(db.Integer, nullable=False, default=0)
+    completed_tasks = db.Column(db.Integer, nullable=False, default=0)
+    # 已结束的学习会话
+    total_study_minutes = db.Column(db.Integer, nullable=False, default=0)
+    session_count = db.Column(db.Integer, nullable=False, default=0)
+    mood_entries = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<UserCounter {self.user_id}>'
+
+class DataVersion(db.Model):
+    """数据版本号（ETag 条件请求用）：scope 为 user:<用户ID> 或 catalog，写入时在同一事务内递增"""
+    __tablename__ = 'data_versions'
+    
+    scope = db.Column(db.String(40), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<DataVersion {self.scope}={self.version}>'
+
+class SchemaVersion(db.Model):
+    """已执行的数据库迁移（见 migrations.py）"""
+    __tablename__ = 'schema_version'
+    
+    version = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SchemaVersion {self.version} {self.name}>'
@@ -0,0 +1,61 @@
+# pagination.py - 基于游标（keyset）的分页
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(values):
+    """排序键的值 -> 不透明的游标字符串"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """游标字符串 -> 排序键的值（按列类型还原日期时间），格式错误时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw.decode('utf-8'))
+    except Exception:
+        raise ValueError('无效的分页游标')
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError('无效的分页游标')
+
+    decoded = []
+    for column, value in zip(columns, values):
+        try:
+            if column.type.python_type is datetime:
+                value = datetime.fromisoformat(value)
+        except (NotImplementedError, TypeError):
+            raise ValueError('无效的分页游标')
+        decoded.append(value)
+    return decoded
+
+
+def _beyond(columns, values, ascending=False):
+    """(c1, c2, ...) < (v1, v2, ...)（升序时为 >）的展开形式，便于数据库使用索引做范围扫描"""
+    clauses = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        equal = [c == v for c, v in zip(columns[:i], values[:i])]
+        clauses.append(and_(*equal, column > value if ascending else column < value))
+    return or_(*clauses)
+
+
+def keyset_page(query, columns, cursor=None, limit=20, ascending=False):
+    """按 columns 降序（ascending=True 时升序）取一页，返回 (结果列表, 下一页游标或None)
+
+    columns 的组合必须唯一（最后一列一般是主键）。与 OFFSET 分页不同，
+    无论翻到多深，每页都只是一次索引范围扫描，也不需要 COUNT(*)。
+    """
+    if cursor:
+        query = query.filter(_beyond(columns, decode_cursor(cursor, columns), ascending))
+    order = [column.asc() if ascending else column.desc() for column in columns]
+    items = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor([getattr(items[-1], column.key) for column in columns])
+    return items, next_cursor
@@ -0,0 +1,221 @@
+# recommend_cache.py - 用户推荐结果缓存（LRU + TTL，事件驱动失效）
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from models import Task, LearningResource
+
+# 影响推荐结果的资源字段（浏览量变化不会使缓存失效）
+CATALOG_FIELDS = ('title', 'keywords', 'resource_type', 'description', 'url')
+
+
+class RecommendationCache:
+    """按用户ID缓存推荐结果
+
+    - 容量有限，超出后按最近最少使用淘汰
+    - 每个条目有过期时间（TTL）
+    - 用户的任务增删改后失效该用户的条目
+    - 资源库内容变化时递增资源库版本号，旧版本的条目全部视为过期
+    """
+
+    def __init__(self, maxsize=1024, ttl=600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.catalog_version = 0
+
+        self._entries = OrderedDict()   # 用户ID -> {'expires_at', 'catalog_version', 'values'}
+        self._generations = {}          # 用户ID -> 失效次数，防止并发计算写回旧结果
+        self._lock = threading.Lock()
+
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id, kind):
+        """读取缓存，未命中返回 None"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and (
+                entry['expires_at'] <= time.time()
+                or entry['catalog_version'] != self.catalog_version
+            ):
+                # 已过期或资源库已变化
+                del self._entries[user_id]
+                self.evictions += 1
+                entry = None
+
+            if entry is None or kind not in entry['values']:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry['values'][kind]
+
+    def token(self, user_id):
+        """开始计算前获取的版本标记 (资源库版本, 用户失效次数)"""
+        with self._lock:
+            return self.catalog_version, self._generations.get(user_id, 0)
+
+    def set(self, user_id, kind, value, token=None):
+        """写入缓存；token 为开始计算时通过 token() 获取的版本标记"""
+        with self._lock:
+            current = (self.catalog_version, self._generations.get(user_id, 0))
+            if token is not None and token != current:
+                # 计算期间资源库或用户任务已变化，结果不再可靠
+                return
+            catalog_version = current[0]
+
+            entry = self._entries.get(user_id)
+            if entry is None:
+                entry = {
+                    'expires_at': time.time() + self.ttl,
+                    'catalog_version': catalog_version,
+                    'values': {}
+                }
+                self._entries[user_id] = entry
+            entry['values'][kind] = value
+            self._entries.move_to_end(user_id)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id):
+        """失效某个用户的缓存"""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def bump_catalog_version(self):
+        """资源库变化：所有条目随之失效"""
+        with self._lock:
+            self.catalog_version += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """缓存统计信息"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'catalog_version': self.catalog_version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0
+            }
+
+
+# 全局缓存实例
+recommend_cache = RecommendationCache()
+
+
+def _freeze(results):
+    """推荐结果 -> 可跨请求保存的形式（ORM对象只保存ID）"""
+    frozen = []
+    for item in results:
+        if isinstance(item, LearningResource):
+            frozen.append(('resource', item.id))
+        else:
+            frozen.append(('virtual', dict(item)))
+    return frozen
+
+
+def _thaw(frozen):
+    """按保存的顺序还原推荐结果，ORM对象通过一次主键查询重新加载"""
+    ids = [value for kind, value in frozen if kind == 'resource']
+    resources = {
+        r.id: r for r in LearningResource.query.filter(LearningResource.id.in_(ids)).all()
+    } if ids else {}
+
+    results = []
+    for kind, value in frozen:
+        if kind == 'resource':
+            if value in resources:
+                results.append(resources[value])
+        else:
+            results.append(dict(value))
+    return results
+
+
+def cached_recommendations(kind):
+    """推荐函数装饰器：按 (用户ID, 推荐类型) 缓存结果"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(user_id):
+            frozen = recommend_cache.get(user_id, kind)
+            if frozen is not None:
+                return _thaw(frozen)
+
+            token = recommend_cache.token(user_id)
+            results = func(user_id)
+            recommend_cache.set(user_id, kind, _freeze(results), token)
+            return results
+        return wrapper
+    return decorator
+
+
+# ========== 事件驱动失效 ==========
+def _pending(target):
+    """当前会话中待提交的失效信息"""
+    session = object_session(target)
+    if session is None:
+        return None
+    return session.info.setdefault('recommend_cache_pending', {'users': set(), 'catalog': False})
+
+
+@event.listens_for(Task, 'after_insert')
+@event.listens_for(Task, 'after_update')
+@event.listens_for(Task, 'after_delete')
+def _task_changed(mapper, connection, target):
+    pending = _pending(target)
+    if pending is not None:
+        pending['users'].add(target.user_id)
+
+
+@event.listens_for(LearningResource, 'after_insert')
+@event.listens_for(LearningResource, 'after_delete')
+def _resource_added_or_deleted(mapper, connection, target):
+    pending = _pending(target)
+    if pending is not None:
+        pending['catalog'] = True
+
+
+@event.listens_for(LearningResource, 'after_update')
+def _resource_updated(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in CATALOG_FIELDS):
+        pending = _pending(target)
+        if pending is not None:
+            pending['catalog'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_invalidations(session):
+    """事务提交后才真正失效，避免回滚造成误失效或并发读到旧数据后重新写入"""
+    pending = session.info.pop('recommend_cache_pending', None)
+    if not pending:
+        return
+    for user_id in pending['users']:
+        recommend_cache.invalidate(user_id)
+    if pending['catalog']:
+        recommend_cache.bump_catalog_version()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_invalidations(session):
+    session.info.pop('recommend_cache_pending', None)
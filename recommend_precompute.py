@@ -0,0 +1,134 @@
+# recommend_precompute.py - 离线批量预计算用户推荐
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, inspect
+
+from models import db, Task, LearningResource, UserRecommendation
+from resource_index import resource_index, match_resources
+from resource_scoring import resource_scorer
+from resource_popularity import resource_popularity
+
+TOP_N = 6           # 每个用户保存的推荐数量
+MIN_MATCHED = 3     # 匹配结果少于该数量时用热门资源补足（与实时推荐一致）
+
+
+def _task_texts(user_ids):
+    """一次查询取出一批用户的任务文本"""
+    texts = {user_id: [] for user_id in user_ids}
+    rows = db.session.query(Task.user_id, Task.title, Task.description)\
+                     .filter(Task.user_id.in_(user_ids))\
+                     .all()
+    for user_id, title, description in rows:
+        texts[user_id].append(title + ' ' + (description or ''))
+    return {user_id: ' '.join(parts).lower() for user_id, parts in texts.items()}
+
+
+def _score_profiles(task_texts):
+    """批量评分，返回与输入顺序对应的 [[(分数, 资源ID), ...], ...]"""
+    if resource_scorer is not None:
+        return resource_scorer.score_batch(task_texts, limit=TOP_N)
+    return [match_resources(text, limit=TOP_N) for text in task_texts]
+
+
+def precompute_recommendations(user_ids=None, batch_size=500):
+    """为活跃用户（有任务记录的用户）计算前N个推荐并写入 user_recommendations
+
+    需要应用上下文；返回处理的用户数量
+    """
+    if user_ids is None:
+        user_ids = [user_id for (user_id,) in
+                    db.session.query(Task.user_id).distinct().order_by(Task.user_id)]
+    if not user_ids:
+        return 0
+
+    resource_index.ensure_loaded()
+
+    # 热门资源，用于补足匹配不足的用户
+    hot_ids = resource_popularity.top(TOP_N * 2)
+
+    table = UserRecommendation.__table__
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        texts = _task_texts(batch)
+        computed_at = datetime.utcnow()
+
+        rows = []
+        for user_id, scored in zip(batch, _score_profiles([texts[u] for u in batch])):
+            ranked = [(float(score), resource_id) for score, resource_id in scored]
+            if len(ranked) < MIN_MATCHED:
+                matched = {resource_id for _, resource_id in ranked}
+                padding = [resource_id for resource_id in hot_ids if resource_id not in matched]
+                ranked.extend((0.0, resource_id) for resource_id in padding[:TOP_N - len(ranked)])
+
+            for rank, (score, resource_id) in enumerate(ranked[:TOP_N]):
+                rows.append({
+                    'user_id': user_id,
+                    'rank': rank,
+                    'resource_id': resource_id,
+                    'score': score,
+                    'computed_at': computed_at
+                })
+
+        # 每批一个事务：先删旧结果再批量插入
+        db.session.execute(table.delete().where(table.c.user_id.in_(batch)))
+        if rows:
+            db.session.execute(table.insert(), rows)
+        db.session.commit()
+
+    return len(user_ids)
+
+
+def load_precomputed_recommendations(user_id, max_age):
+    """读取预计算结果；不存在或已超过 max_age 秒时返回 None"""
+    rows = db.session.query(UserRecommendation.computed_at, LearningResource)\
+                     .join(LearningResource, LearningResource.id == UserRecommendation.resource_id)\
+                     .filter(UserRecommendation.user_id == user_id)\
+                     .order_by(UserRecommendation.rank)\
+                     .all()
+    if not rows:
+        return None
+
+    oldest = min(computed_at for computed_at, _ in rows)
+    if datetime.utcnow() - oldest > timedelta(seconds=max_age):
+        return None
+
+    return [resource for _, resource in rows]
+
+
+def start_precompute_worker(app, interval):
+    """后台线程：每隔 interval 秒重新预计算一次"""
+    def worker():
+        while True:
+            with app.app_context():
+                try:
+                    started = time.time()
+                    count = precompute_recommendations()
+                    print(f"✅ 推荐预计算完成：{count} 个用户，耗时 {time.time() - started:.1f} 秒")
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"❌ 推荐预计算失败: {e}")
+                finally:
+                    db.session.remove()
+            time.sleep(interval)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    return thread
+
+
+# ========== 任务变化时删除该用户的预计算结果（同一事务内） ==========
+@event.listens_for(Task, 'after_insert')
+@event.listens_for(Task, 'after_delete')
+def _task_added_or_deleted(mapper, connection, target):
+    table = UserRecommendation.__table__
+    connection.execute(table.delete().where(table.c.user_id == target.user_id))
+
+
+@event.listens_for(Task, 'after_update')
+def _task_updated(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.title.history.has_changes() or state.attrs.description.history.has_changes():
+        table = UserRecommendation.__table__
+        connection.execute(table.delete().where(table.c.user_id == target.user_id))
@@ -0,0 +1,37 @@
+# request_loader.py - 请求内共享的用户数据加载器
+from flask import g, has_request_context
+
+from models import Task, MoodLog
+
+
+def _memoized(key, loader):
+    """在当前请求内缓存加载结果；没有请求上下文（命令行、后台线程）时直接加载"""
+    if not has_request_context():
+        return loader()
+    cache = g.setdefault('user_data', {})
+    if key not in cache:
+        cache[key] = loader()
+    return cache[key]
+
+
+def load_user_tasks(user_id):
+    """用户的全部任务（按ID顺序），同一请求内只查询一次"""
+    return _memoized(
+        ('tasks', user_id),
+        lambda: Task.query.filter_by(user_id=user_id).order_by(Task.id).all()
+    )
+
+
+def load_pending_tasks(user_id):
+    """用户未完成的任务，由全部任务过滤得到"""
+    return [t for t in load_user_tasks(user_id) if t.status == 'pending']
+
+
+def load_latest_mood(user_id):
+    """用户最近一次心情记录，同一请求内只查询一次"""
+    return _memoized(
+        ('latest_mood', user_id),
+        lambda: MoodLog.query.filter_by(user_id=user_id)
+                             .order_by(MoodLog.created_at.desc())
+                             .first()
+    )
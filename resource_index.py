@@ -0,0 +1,233 @@
+# resource_index.py - 学习资源倒排索引与分词表
+import heapq
+import threading
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from models import db, LearningResource, ResourceToken
+from text_tokenizer import tokenize
+
+# 字段权重：同一词元在不同字段出现时累加
+TITLE_WEIGHT = 2      # 标题
+KEYWORD_WEIGHT = 3    # 关键词
+TYPE_WEIGHT = 4       # 资源类型
+
+# 参与分词的资源字段
+TOKEN_FIELDS = ('title', 'keywords', 'resource_type')
+
+
+def resource_terms(title, keywords, resource_type):
+    """从资源的标题、关键词、类型中提取 {词元: 权重}"""
+    terms = {}
+    for text, weight in ((title, TITLE_WEIGHT),
+                         (keywords, KEYWORD_WEIGHT),
+                         (resource_type, TYPE_WEIGHT)):
+        for token in tokenize(text):
+            token = token[:100]
+            terms[token] = terms.get(token, 0) + weight
+    return terms
+
+
+def _token_rows(resource_id, terms):
+    return [
+        {'resource_id': resource_id, 'token': token, 'weight': weight}
+        for token, weight in terms.items()
+    ]
+
+
+def backfill_resource_tokens():
+    """为还没有分词记录的资源补写 resource_tokens（需要应用上下文）"""
+    missing = db.session.query(
+        LearningResource.id,
+        LearningResource.title,
+        LearningResource.keywords,
+        LearningResource.resource_type
+    ).outerjoin(
+        ResourceToken, ResourceToken.resource_id == LearningResource.id
+    ).filter(ResourceToken.resource_id.is_(None)).all()
+
+    rows = []
+    for resource_id, title, keywords, resource_type in missing:
+        rows.extend(_token_rows(resource_id, resource_terms(title, keywords, resource_type)))
+
+    if rows:
+        db.session.execute(ResourceToken.__table__.insert(), rows)
+        db.session.commit()
+    return len(missing)
+
+
+class ResourceIndex:
+    """内存倒排索引：词元 -> {资源ID: 权重}
+
+    从预先计算好的 resource_tokens 表加载，推荐时对任务文本分词后
+    直接按词元查表，只有共享词元的资源才会参与打分。
+    """
+
+    def __init__(self):
+        self._postings = {}     # 词项 -> {资源ID: 权重}
+        self._doc_terms = {}    # 资源ID -> {词项: 权重}，用于更新时撤销旧词项
+        self._loaded = False
+        self._version = 0       # 每次索引内容变化时递增
+        self._lock = threading.RLock()
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    @property
+    def version(self):
+        return self._version
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def ensure_loaded(self):
+        """首次使用时从数据库构建索引（需要应用上下文）"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            docs = {}
+            rows = db.session.query(
+                ResourceToken.resource_id,
+                ResourceToken.token,
+                ResourceToken.weight
+            ).all()
+            for resource_id, token, weight in rows:
+                docs.setdefault(resource_id, {})[token] = weight
+
+            # 尚未写入分词表的资源（旧数据库）在内存中临时分词
+            missing = db.session.query(
+                LearningResource.id,
+                LearningResource.title,
+                LearningResource.keywords,
+                LearningResource.resource_type
+            ).filter(~LearningResource.id.in_(
+                db.session.query(ResourceToken.resource_id)
+            )).all()
+            for resource_id, title, keywords, resource_type in missing:
+                docs[resource_id] = resource_terms(title, keywords, resource_type)
+
+            for resource_id, terms in docs.items():
+                self._add(resource_id, terms)
+            self._loaded = True
+            print(f"📇 资源倒排索引已构建：{len(self._doc_terms)} 个资源，{len(self._postings)} 个词项")
+
+    def apply(self, changes):
+        """应用已提交的变化：{资源ID: {词项: 权重}}，值为 None 表示资源已删除
+
+        只由下面的提交事件调用，资源写入处不需要单独更新索引。
+        """
+        with self._lock:
+            # 索引尚未构建时无需增量更新，首次构建会读到已提交的数据
+            if not self._loaded:
+                return
+            for resource_id, terms in changes.items():
+                self._remove(resource_id)
+                if terms is not None:
+                    self._add(resource_id, terms)
+
+    def snapshot(self):
+        """返回 (版本号, {资源ID: {词项: 权重}}) 的副本，供评分引擎构建矩阵"""
+        with self._lock:
+            return self._version, {rid: dict(doc) for rid, doc in self._doc_terms.items()}
+
+    def match(self, task_text, limit=6):
+        """按共享词元的权重之和匹配资源，返回 [(分数, 资源ID), ...]（缺少 numpy/scipy 时的推荐路径）
+
+        只累加任务文本中各词元倒排表里的资源，分数相同时资源ID小的在前。
+        """
+        self.ensure_loaded()
+        scores = {}
+        with self._lock:
+            for token in set(tokenize(task_text)):
+                for resource_id, weight in self._postings.get(token, {}).items():
+                    scores[resource_id] = scores.get(resource_id, 0) + weight
+        best = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(score, resource_id) for resource_id, score in best]
+
+    def matching_terms(self, task_text):
+        """返回任务文本中出现在索引里的词元"""
+        with self._lock:
+            return [token for token in set(tokenize(task_text)) if token in self._postings]
+
+    def _add(self, resource_id, terms):
+        doc = dict(terms)
+        for term, weight in doc.items():
+            self._postings.setdefault(term, {})[resource_id] = weight
+        self._doc_terms[resource_id] = doc
+        self._version += 1
+
+    def _remove(self, resource_id):
+        doc = self._doc_terms.pop(resource_id, None)
+        if not doc:
+            return
+        for term in doc:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(resource_id, None)
+            if not postings:
+                del self._postings[term]
+        self._version += 1
+
+
+# 全局索引实例
+resource_index = ResourceIndex()
+
+
+def match_resources(task_text, limit=6):
+    """按内存倒排索引匹配资源，返回 [(分数, 资源ID), ...]（需要应用上下文）"""
+    return resource_index.match(task_text, limit)
+
+
+# ========== 分词表维护：随资源写入在同一事务内更新；内存索引在提交后更新 ==========
+def _pending(target, terms):
+    """记录待提交的索引变化（回滚的写入不会进入内存索引）"""
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('resource_index_pending', {})[target.id] = terms
+
+
+@event.listens_for(LearningResource, 'after_insert')
+def _insert_resource_tokens(mapper, connection, target):
+    terms = resource_terms(target.title, target.keywords, target.resource_type)
+    rows = _token_rows(target.id, terms)
+    if rows:
+        connection.execute(ResourceToken.__table__.insert(), rows)
+    _pending(target, terms)
+
+
+@event.listens_for(LearningResource, 'after_update')
+def _update_resource_tokens(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[field].history.has_changes() for field in TOKEN_FIELDS):
+        return
+    table = ResourceToken.__table__
+    connection.execute(table.delete().where(table.c.resource_id == target.id))
+    terms = resource_terms(target.title, target.keywords, target.resource_type)
+    rows = _token_rows(target.id, terms)
+    if rows:
+        connection.execute(table.insert(), rows)
+    _pending(target, terms)
+
+
+@event.listens_for(LearningResource, 'after_delete')
+def _delete_resource_tokens(mapper, connection, target):
+    table = ResourceToken.__table__
+    connection.execute(table.delete().where(table.c.resource_id == target.id))
+    _pending(target, None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_index_changes(session):
+    changes = session.info.pop('resource_index_pending', None)
+    if changes:
+        resource_index.apply(changes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_index_changes(session):
+    session.info.pop('resource_index_pending', None)
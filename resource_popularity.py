@@ -0,0 +1,99 @@
+# resource_popularity.py - 热门资源排行榜（进程内Top-K）
+import bisect
+import threading
+
+from models import db, LearningResource
+
+
+class PopularityLeaderboard:
+    """按浏览量维护前K个资源
+
+    浏览量只增不减，因此某个资源浏览量增加后，新的Top-K只可能是
+    原Top-K加上这个资源，再去掉最后一名，维护代价为 O(K)。
+    启动时从数据库取一次前K名作为初始数据，此后不再排序整张表。
+    """
+
+    def __init__(self, k=20):
+        self.k = k
+        self._ranking = []      # [(-浏览量, 资源ID)]，升序即热门程度降序
+        self._views = {}        # 榜单内资源ID -> 浏览量
+        self._seeded = False
+        self._lock = threading.Lock()
+
+    def ensure_seeded(self):
+        """首次使用时从数据库加载前K名（需要应用上下文）"""
+        if self._seeded:
+            return
+        with self._lock:
+            if self._seeded:
+                return
+            rows = db.session.query(LearningResource.id, LearningResource.views)\
+                             .order_by(LearningResource.views.desc(), LearningResource.id)\
+                             .limit(self.k)\
+                             .all()
+            self._ranking = sorted((-(views or 0), resource_id) for resource_id, views in rows)
+            self._views = {resource_id: views or 0 for resource_id, views in rows}
+            self._seeded = True
+
+    def seed(self):
+        """重新加载榜单"""
+        with self._lock:
+            self._seeded = False
+        self.ensure_seeded()
+
+    def record_view(self, resource_id, views):
+        """资源浏览量更新为 views 后调用"""
+        with self._lock:
+            if not self._seeded:
+                return
+            old_views = self._views.get(resource_id)
+            if old_views is not None:
+                self._ranking.remove((-old_views, resource_id))
+            self._insert(resource_id, views)
+
+    def add_resources(self, resources):
+        """新资源入库后调用（榜单未满时加入）"""
+        with self._lock:
+            if not self._seeded:
+                return
+            for resource in resources:
+                if resource.id is not None and resource.id not in self._views:
+                    self._insert(resource.id, resource.views or 0)
+
+    def remove_resource(self, resource_id):
+        """资源被删除时移出榜单，下次查询时重新加载补足"""
+        with self._lock:
+            views = self._views.pop(resource_id, None)
+            if views is not None:
+                self._ranking.remove((-views, resource_id))
+                self._seeded = False
+
+    def top(self, n):
+        """前n个热门资源ID（n 不超过 K）"""
+        self.ensure_seeded()
+        with self._lock:
+            return [resource_id for _, resource_id in self._ranking[:n]]
+
+    def _insert(self, resource_id, views):
+        entry = (-views, resource_id)
+        if len(self._ranking) >= self.k and entry > self._ranking[-1]:
+            return
+        bisect.insort(self._ranking, entry)
+        self._views[resource_id] = views
+        if len(self._ranking) > self.k:
+            _, dropped = self._ranking.pop()
+            del self._views[dropped]
+
+
+# 全局排行榜实例
+resource_popularity = PopularityLeaderboard()
+
+
+def hot_resources(limit=6, exclude=()):
+    """取热门资源对象（按浏览量降序），exclude 为需要跳过的资源ID"""
+    exclude = set(exclude)
+    ids = [i for i in resource_popularity.top(limit + len(exclude)) if i not in exclude][:limit]
+    if not ids:
+        return []
+    resources = {r.id: r for r in LearningResource.query.filter(LearningResource.id.in_(ids)).all()}
+    return [resources[i] for i in ids if i in resources]
@@ -0,0 +1,178 @@
+# resource_scoring.py - 基于BM25的向量化资源评分引擎
+import threading
+
+try:
+    import numpy as np
+    from scipy import sparse
+    SCORING_AVAILABLE = True
+except ImportError as e:
+    print(f"⚠️  BM25评分引擎不可用（需要 numpy/scipy）: {e}")
+    np = None
+    sparse = None
+    SCORING_AVAILABLE = False
+
+from resource_index import resource_index
+
+
+class BM25Scorer:
+    """稀疏词项-文档矩阵上的BM25评分
+
+    文档向量来自倒排索引中每个资源的加权词项（标题/关键词/类型的字段权重作为词频），
+    用户的任务画像转换成词项向量后，与整个资源库做一次稀疏矩阵-向量乘法即可得到全部分数。
+    索引内容变化后在后台线程重建矩阵，重建完成前评分继续使用旧矩阵。
+    """
+
+    def __init__(self, index, k1=1.2, b=0.75, batch_size=256, rebuild_delay=5.0):
+        self.index = index
+        self.k1 = k1
+        self.b = b
+        self.batch_size = batch_size    # 批量评分时每批用户数，限制中间结果内存
+        self.rebuild_delay = rebuild_delay  # 索引变化后等待多少秒再重建，连续写入只重建一次
+
+        self._version = None
+        self._matrix = None             # CSR矩阵，形状 (资源数, 词项数)
+        self._doc_ids = None            # 行号 -> 资源ID
+        self._term_ids = {}             # 词项 -> 列号
+        self._lock = threading.Lock()
+        self._rebuild_timer = None      # 已安排的后台重建
+
+    def _ensure_matrix(self):
+        """返回 (矩阵, 行号->资源ID, 词项->列号) 快照
+
+        只有第一次评分时在请求中构建矩阵；之后索引版本变化时安排后台重建，请求路径
+        不承担 O(资源数) 的重建开销。三者在锁内一起读取；重建只替换对象、不修改旧对象，
+        评分使用快照不会与并发重建错配。
+        """
+        self.index.ensure_loaded()
+        with self._lock:
+            if self._matrix is None:
+                self._install(self._build())
+            elif self._version != self.index.version:
+                self._schedule_rebuild()
+            return self._matrix, self._doc_ids, self._term_ids
+
+    def _schedule_rebuild(self):
+        # 调用方持有 self._lock；同一时间最多一个后台重建
+        if self._rebuild_timer is not None:
+            return
+        self._rebuild_timer = threading.Timer(self.rebuild_delay, self._background_rebuild)
+        self._rebuild_timer.daemon = True
+        self._rebuild_timer.start()
+
+    def _background_rebuild(self):
+        # 在锁外构建，构建期间评分不被阻塞
+        try:
+            built = self._build()
+        except Exception as e:
+            print(f"⚠️  BM25矩阵后台重建失败: {e}")
+            built = None
+        with self._lock:
+            self._rebuild_timer = None
+            if built is not None and (self._version is None or built[3] > self._version):
+                self._install(built)
+
+    def _install(self, built):
+        # 调用方持有 self._lock
+        self._matrix, self._doc_ids, self._term_ids, self._version = built
+
+    def _build(self):
+        """按倒排索引当前内容构建，返回 (矩阵, 行号->资源ID, 词项->列号, 索引版本)"""
+        version, doc_terms = self.index.snapshot()
+
+        term_ids = {}
+        doc_ids = []
+        rows, cols, tfs = [], [], []
+        for row, (resource_id, terms) in enumerate(sorted(doc_terms.items())):
+            doc_ids.append(resource_id)
+            for term, weight in terms.items():
+                rows.append(row)
+                cols.append(term_ids.setdefault(term, len(term_ids)))
+                tfs.append(weight)
+
+        n_docs, n_terms = len(doc_ids), len(term_ids)
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        tfs = np.asarray(tfs, dtype=np.float64)
+
+        if n_docs and n_terms:
+            # 文档长度、平均长度与逆文档频率
+            doc_len = np.bincount(rows, weights=tfs, minlength=n_docs)
+            avg_len = doc_len.mean() or 1.0
+            df = np.bincount(cols, minlength=n_terms)
+            idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+
+            norm = self.k1 * (1.0 - self.b + self.b * doc_len[rows] / avg_len)
+            data = idf[cols] * tfs * (self.k1 + 1.0) / (tfs + norm)
+        else:
+            data = tfs
+
+        matrix = sparse.csr_matrix((data, (rows, cols)), shape=(n_docs, n_terms))
+        return matrix, np.asarray(doc_ids, dtype=np.int64), term_ids, version
+
+    def _query_columns(self, term_ids, task_text):
+        """任务文本 -> 命中词项的列号"""
+        return [term_ids[t] for t in self.index.matching_terms(task_text) if t in term_ids]
+
+    def _top_n(self, doc_ids, row_indices, values, limit):
+        """从候选行中取分数最高的前N个，同分按资源ID升序"""
+        positive = values > 0
+        row_indices, values = row_indices[positive], values[positive]
+        if not len(values):
+            return []
+        doc_ids = doc_ids[row_indices]
+        order = np.lexsort((doc_ids, -values))[:limit]
+        return [(float(values[i]), int(doc_ids[i])) for i in order]
+
+    def score(self, task_text, limit=6):
+        """对单个用户的任务画像评分，返回 [(分数, 资源ID), ...]"""
+        if not task_text:
+            return []
+        matrix, doc_ids, term_ids = self._ensure_matrix()
+
+        columns = self._query_columns(term_ids, task_text)
+        if not columns:
+            return []
+
+        query = np.zeros(matrix.shape[1])
+        query[columns] = 1.0
+        scores = matrix @ query
+        candidates = np.flatnonzero(scores)
+        return self._top_n(doc_ids, candidates, scores[candidates], limit)
+
+    def score_batch(self, task_texts, limit=6):
+        """批量评分：多个用户的任务画像一次矩阵乘法完成
+
+        task_texts 为任务文本列表，返回与之对应的 [[(分数, 资源ID), ...], ...]
+        """
+        if not task_texts:
+            return []
+        matrix, doc_ids, term_ids = self._ensure_matrix()
+
+        n_terms = matrix.shape[1]
+        results = []
+        for start in range(0, len(task_texts), self.batch_size):
+            chunk = task_texts[start:start + self.batch_size]
+
+            # 构建 (词项数, 用户数) 的稀疏查询矩阵
+            q_rows, q_cols = [], []
+            for col, text in enumerate(chunk):
+                for term_col in self._query_columns(term_ids, text):
+                    q_rows.append(term_col)
+                    q_cols.append(col)
+            queries = sparse.csc_matrix(
+                (np.ones(len(q_rows)), (q_rows, q_cols)),
+                shape=(n_terms, len(chunk))
+            )
+
+            scores = (matrix @ queries).tocsc()
+            for col in range(len(chunk)):
+                begin, end = scores.indptr[col], scores.indptr[col + 1]
+                results.append(self._top_n(
+                    doc_ids, scores.indices[begin:end], scores.data[begin:end], limit
+                ))
+
+        return results
+
+
+# 全局评分引擎实例（缺少 numpy/scipy 时为 None，回退到倒排索引计分）
+resource_scorer = BM25Scorer(resource_index) if SCORING_AVAILABLE else None
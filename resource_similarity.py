@@ -0,0 +1,181 @@
+# resource_similarity.py - 基于MinHash + LSH的相似资源查找
+import os
+import threading
+import zlib
+
+try:
+    import numpy as np
+    SIMILARITY_AVAILABLE = True
+except ImportError as e:
+    print(f"⚠️  相似资源功能不可用（需要 numpy）: {e}")
+    np = None
+    SIMILARITY_AVAILABLE = False
+
+from models import db, LearningResource
+from text_tokenizer import tokenize
+
+NUM_PERM = 64           # MinHash签名长度
+BANDS = 32              # LSH分段数，每段 NUM_PERM // BANDS 行（相似度约0.2以上即可能成为候选）
+MAX_BUCKET_CANDIDATES = 50  # 超过该大小的桶（常见词）不直接作为候选，保证查询耗时与资源总数无关
+_PRIME = (1 << 31) - 1  # 哈希函数取模用的梅森素数
+
+
+def resource_shingles(title, description, keywords):
+    """资源文本 -> 词元哈希集合（crc32，跨进程稳定）"""
+    text = ' '.join(part for part in (title, description, keywords) if part)
+    return {zlib.crc32(token.encode('utf-8')) for token in tokenize(text.replace(',', ' '))}
+
+
+class ResourceSimilarity:
+    """为每个资源计算MinHash签名并分桶（LSH）
+
+    签名在资源入库时计算，与资源ID一起保存为 .npz 文件（批量加载结束后整体保存一次；
+    文件中缺少的签名在下次加载时补算）；查询时只比较与目标资源落在同一个桶里的候选，
+    按估计的Jaccard相似度排序。
+    """
+
+    def __init__(self, storage_path=None, seed=42):
+        self.storage_path = storage_path
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _PRIME, size=NUM_PERM).astype(np.uint64)
+        self._b = rng.randint(0, _PRIME, size=NUM_PERM).astype(np.uint64)
+
+        self._signatures = {}   # 资源ID -> 签名 (uint32数组)
+        self._buckets = {}      # (段号, 段哈希) -> [资源ID]
+        self._loaded = False
+        self._dirty = False     # 内存中有尚未写入文件的签名
+        self._lock = threading.RLock()
+
+    def signature(self, shingles):
+        """计算MinHash签名：对每个哈希函数取所有词元哈希的最小值"""
+        if not shingles:
+            return np.full(NUM_PERM, _PRIME, dtype=np.uint32)
+        x = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        hashed = (self._a[:, None] * x[None, :] + self._b[:, None]) % _PRIME
+        return hashed.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        rows = NUM_PERM // BANDS
+        return [(band, signature[band * rows:(band + 1) * rows].tobytes())
+                for band in range(BANDS)]
+
+    def _add(self, resource_id, signature):
+        self._remove(resource_id)
+        self._signatures[resource_id] = signature
+        if (signature == _PRIME).all():
+            # 没有任何词元的资源不参与分桶，否则它们会彼此完全相似
+            return
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, []).append(resource_id)
+
+    def _remove(self, resource_id):
+        signature = self._signatures.pop(resource_id, None)
+        if signature is None:
+            return
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket and resource_id in bucket:
+                bucket.remove(resource_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def ensure_loaded(self):
+        """从磁盘加载签名，并为尚未计算签名的资源补算（需要应用上下文）"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+
+            if self.storage_path and os.path.exists(self.storage_path):
+                try:
+                    data = np.load(self.storage_path)
+                    for resource_id, signature in zip(data['ids'], data['signatures']):
+                        self._add(int(resource_id), signature)
+                except Exception as e:
+                    print(f"⚠️  相似资源签名文件读取失败，将重新计算: {e}")
+                    self._signatures, self._buckets = {}, {}
+
+            known = set(self._signatures)
+            missing = [row for row in db.session.query(
+                LearningResource.id,
+                LearningResource.title,
+                LearningResource.description,
+                LearningResource.keywords
+            ) if row[0] not in known]
+            for resource_id, title, description, keywords in missing:
+                self._add(resource_id, self.signature(resource_shingles(title, description, keywords)))
+
+            self._loaded = True
+            if missing:
+                self._dirty = True
+                self.save()
+            print(f"🔗 相似资源签名已加载：{len(self._signatures)} 个资源，{len(self._buckets)} 个桶")
+
+    def add_resources(self, resources):
+        """资源入库（新增或更新）后计算签名，只更新内存；批量加载结束后由调用方调用 save()"""
+        with self._lock:
+            if not self._loaded:
+                return
+            for resource in resources:
+                if resource.id is None:
+                    continue
+                self._add(resource.id, self.signature(resource_shingles(
+                    resource.title, resource.description, resource.keywords
+                )))
+                self._dirty = True
+
+    def save(self):
+        """有未保存的签名时整体写入磁盘（先写临时文件再替换）"""
+        if not self.storage_path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            ids = np.fromiter(self._signatures, dtype=np.int64, count=len(self._signatures))
+            signatures = (np.stack([self._signatures[i] for i in ids]) if len(ids)
+                          else np.empty((0, NUM_PERM), dtype=np.uint32))
+            os.makedirs(os.path.dirname(self.storage_path) or '.', exist_ok=True)
+            tmp_path = self.storage_path + '.tmp.npz'
+            np.savez_compressed(tmp_path, ids=ids, signatures=signatures)
+            os.replace(tmp_path, self.storage_path)
+            self._dirty = False
+
+    def related(self, resource_id, limit=6):
+        """与指定资源相似的资源，返回 [(相似度, 资源ID), ...]"""
+        self.ensure_loaded()
+        with self._lock:
+            signature = self._signatures.get(resource_id)
+            if signature is None:
+                return []
+
+            # 大桶由常见词形成，区分度低：先只取小桶中的资源
+            candidates, oversized = set(), []
+            for key in self._band_keys(signature):
+                bucket = self._buckets.get(key, [])
+                if len(bucket) > MAX_BUCKET_CANDIDATES:
+                    oversized.append(bucket)
+                else:
+                    candidates.update(bucket)
+            candidates.discard(resource_id)
+
+            if len(candidates) < limit and oversized:
+                # 候选不足时从大桶中抽样：以资源ID为种子，同一资源每次结果相同，
+                # 也不会像取桶的前几个那样总是偏向ID小的旧资源
+                rng = np.random.default_rng(resource_id)
+                for bucket in oversized:
+                    picks = rng.choice(len(bucket), MAX_BUCKET_CANDIDATES, replace=False)
+                    candidates.update(bucket[i] for i in picks)
+                candidates.discard(resource_id)
+
+            scored = [
+                (float(np.mean(self._signatures[other] == signature)), other)
+                for other in candidates
+            ]
+
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        return scored[:limit]
+
+
+# 全局实例（缺少 numpy 时为 None）；存储路径由应用配置
+resource_similarity = ResourceSimilarity() if SIMILARITY_AVAILABLE else None
@@ -0,0 +1,165 @@
+# study_analytics.py - 学习分析（按日/周/月分桶的学习时长与专注度，向量化计算）
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+try:
+    import numpy as np
+    ANALYTICS_AVAILABLE = True
+except ImportError as e:
+    print(f"⚠️  学习分析功能不可用（需要 numpy）: {e}")
+    np = None
+    ANALYTICS_AVAILABLE = False
+
+from models import db, Task, StudySession
+from data_versions import data_versions
+
+# 时间范围 -> 天数（截止到今天，含今天）
+RANGES = {'week': 7, 'month': 30, 'year': 365}
+GRANULARITIES = ('day', 'week', 'month')
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _epoch(day):
+    """日期当天0点（UTC）的时间戳（秒）"""
+    return int((datetime.combine(day, datetime.min.time()) - _EPOCH).total_seconds())
+
+
+def bucket_starts(first_day, last_day, granularity):
+    """覆盖 [first_day, last_day] 的各个桶的起始日期
+
+    周从周一开始，月从1号开始；第一个桶的起点可能早于 first_day
+    （热力图按整周/整月对齐），统计时仍只计入范围内的会话。
+    """
+    if granularity == 'day':
+        start, step = first_day, None
+    elif granularity == 'week':
+        start, step = first_day - timedelta(days=first_day.weekday()), None
+    else:
+        start, step = first_day.replace(day=1), 'month'
+
+    days = []
+    current = start
+    while current <= last_day:
+        days.append(current)
+        if step == 'month':
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=1 if granularity == 'day' else 7)
+    return days
+
+
+class SessionArrays:
+    """一个用户全部已结束学习会话的列式数据，按开始时间升序"""
+
+    def __init__(self, rows):
+        count = len(rows)
+        self.start = np.fromiter((int((r[0] - _EPOCH).total_seconds()) for r in rows),
+                                 dtype=np.int64, count=count)
+        self.duration = np.fromiter((r[1] or 0 for r in rows), dtype=np.int64, count=count)
+        self.focus = np.fromiter((r[2] or 0 for r in rows), dtype=np.int64, count=count)
+        self.task_id = np.fromiter((r[3] or -1 for r in rows), dtype=np.int64, count=count)
+
+    def __len__(self):
+        return len(self.start)
+
+
+class StudyAnalytics:
+    """按用户缓存会话数组（LRU），数据版本号变化后重新加载"""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()   # 用户ID -> (数据版本号, SessionArrays)
+        self._lock = threading.Lock()
+
+    def arrays(self, user_id):
+        """用户的会话数组（需要应用上下文）"""
+        version = data_versions.user_version(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+
+        rows = db.session.query(
+            StudySession.start_time,
+            StudySession.duration_minutes,
+            StudySession.focus_score,
+            StudySession.task_id
+        ).filter(
+            StudySession.user_id == user_id,
+            StudySession.end_time.isnot(None)
+        ).order_by(StudySession.start_time).all()
+        arrays = SessionArrays(rows)
+
+        with self._lock:
+            self._entries[user_id] = (version, arrays)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return arrays
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def analyze(self, user_id, range_name='year', granularity='day', today=None):
+        """按范围和粒度分桶统计，返回接口数据"""
+        today = today or datetime.utcnow().date()
+        first_day = today - timedelta(days=RANGES[range_name] - 1)
+        starts = bucket_starts(first_day, today, granularity)
+        arrays = self.arrays(user_id)
+
+        # 会话开始时间已排序：二分查找截取范围内的会话，再查找各自所属的桶
+        edges = np.array([_epoch(d) for d in starts], dtype=np.int64)
+        lo, hi = np.searchsorted(arrays.start, [_epoch(first_day), _epoch(today + timedelta(days=1))])
+        start = arrays.start[lo:hi]
+        duration = arrays.duration[lo:hi]
+        focus = arrays.focus[lo:hi]
+        task_id = arrays.task_id[lo:hi]
+
+        bucket = np.searchsorted(edges, start, side='right') - 1
+        n = len(starts)
+        minutes = np.bincount(bucket, weights=duration, minlength=n)[:n]
+        sessions = np.bincount(bucket, minlength=n)[:n]
+        rated = focus > 0
+        focus_sum = np.bincount(bucket[rated], weights=focus[rated], minlength=n)[:n]
+        focus_count = np.bincount(bucket[rated], minlength=n)[:n]
+        avg_focus = np.divide(focus_sum, focus_count, out=np.zeros(n), where=focus_count > 0)
+
+        # 范围内按任务汇总（-1 表示未关联任务的自由学习）
+        task_ids, inverse = np.unique(task_id, return_inverse=True)
+        task_minutes = np.bincount(inverse, weights=duration, minlength=len(task_ids))
+        top = [i for i in np.argsort(-task_minutes, kind='stable')[:10] if task_minutes[i] > 0]
+        linked = [int(task_ids[i]) for i in top if task_ids[i] >= 0]
+        titles = dict(db.session.query(Task.id, Task.title).filter(Task.id.in_(linked)).all()) if linked else {}
+
+        total_rated = int(focus_count.sum())
+        return {
+            'range': range_name,
+            'granularity': granularity,
+            'start': first_day.isoformat(),
+            'end': today.isoformat(),
+            'buckets': [{
+                'start': day.isoformat(),
+                'minutes': int(minutes[i]),
+                'sessions': int(sessions[i]),
+                'avg_focus': round(float(avg_focus[i]), 1)
+            } for i, day in enumerate(starts)],
+            'summary': {
+                'total_minutes': int(duration.sum()),
+                'session_count': int(len(start)),
+                'avg_focus': round(float(focus_sum.sum()) / total_rated, 1) if total_rated else 0,
+                'active_buckets': int(np.count_nonzero(sessions)),
+                'max_minutes': int(minutes.max()) if n else 0
+            },
+            'tasks': [{
+                'task_id': int(task_ids[i]) if task_ids[i] >= 0 else None,
+                'title': titles.get(int(task_ids[i]), '已删除的任务') if task_ids[i] >= 0 else '自由学习',
+                'minutes': int(task_minutes[i])
+            } for i in top]
+        }
+
+
+# 全局实例（缺少 numpy 时为 None）
+study_analytics = StudyAnalytics() if ANALYTICS_AVAILABLE else None
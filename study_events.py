@@ -0,0 +1,76 @@
+# study_events.py - 学习计时器事件的进程内发布/订阅（供SSE推送）
+import json
+import queue
+import threading
+
+KEEPALIVE_SECONDS = 15      # 无事件时发送注释行，防止代理断开空闲连接
+QUEUE_SIZE = 100            # 每个订阅者最多积压的事件数
+
+
+class StudyEventBroker:
+    """按用户分发事件：每个打开的页面（SSE连接）持有一个队列
+
+    发布方只做入队，不访问数据库；订阅者积压过多（连接已卡死）时丢弃新事件，
+    不会阻塞发布请求。多进程部署时每个进程只能收到本进程发布的事件。
+    """
+
+    def __init__(self):
+        self._subscribers = {}      # 用户ID -> {队列}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        q = queue.Queue(maxsize=QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(q)
+        return q
+
+    def unsubscribe(self, user_id, q):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers:
+                subscribers.discard(q)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def has_subscribers(self, user_id):
+        with self._lock:
+            return bool(self._subscribers.get(user_id))
+
+    def publish(self, user_id, event, data):
+        """向该用户所有打开的页面推送事件，返回送达的连接数"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        delivered = 0
+        for q in subscribers:
+            try:
+                q.put_nowait((event, data))
+                delivered += 1
+            except queue.Full:
+                pass
+        return delivered
+
+    def stream(self, user_id, initial=None):
+        """SSE响应体生成器：先发送初始状态，之后等待事件（不需要应用上下文）"""
+        q = self.subscribe(user_id)
+        try:
+            yield 'retry: 5000\n\n'
+            if initial is not None:
+                yield format_sse('state', initial)
+            while True:
+                try:
+                    event, data = q.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield format_sse(event, data)
+        finally:
+            self.unsubscribe(user_id, q)
+
+
+def format_sse(event, data):
+    """一条SSE消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+# 全局实例
+study_events = StudyEventBroker()
@@ -0,0 +1,151 @@
+# study_rollup.py - 学习会话每日汇总表（study_daily_rollup）的维护
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, event, func, inspect
+
+from models import db, StudySession, StudyDailyRollup
+
+# 影响汇总结果的会话字段
+ROLLUP_FIELDS = ('user_id', 'task_id', 'notes', 'start_time', 'end_time',
+                 'duration_minutes', 'focus_score')
+CHUNK = 5000            # 回填时每批写入行数
+
+
+def session_task_name(task_id, task_title, notes):
+    """学习会话在统计中显示的任务名"""
+    if task_id:
+        task_name = task_title if task_title is not None else "已删除的任务"
+    elif notes and notes.strip():
+        # 没有关联任务时使用备注（过长截断）
+        task_name = notes.strip()
+        if len(task_name) > 30:
+            task_name = task_name[:27] + "..."
+    else:
+        task_name = "自由学习"
+
+    # 确保任务名不为空
+    if not task_name or task_name.strip() == "":
+        task_name = "未命名学习"
+    return task_name
+
+
+def task_key(task_id, notes):
+    """汇总表中的任务键：关联任务记任务ID（标题在查询时再取），自由学习记显示名"""
+    if task_id:
+        return f"t:{task_id}"
+    return "n:" + session_task_name(None, None, notes)
+
+
+def _as_date(value):
+    # SQLite 的 date() 返回字符串，其他数据库返回日期对象
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def _aggregate(connection, *criteria):
+    """按 用户/日期/任务 汇总符合条件的已结束会话，返回汇总表行"""
+    table = StudySession.__table__
+    day = func.date(table.c.start_time)
+    notes_key = case((table.c.task_id.is_(None), table.c.notes))
+    positive_focus = table.c.focus_score > 0
+    rows = connection.execute(
+        db.select(
+            table.c.user_id,
+            day,
+            table.c.task_id,
+            notes_key,
+            func.coalesce(func.sum(table.c.duration_minutes), 0),
+            func.count(),
+            func.coalesce(func.sum(case((positive_focus, table.c.focus_score))), 0),
+            func.count(case((positive_focus, 1)))
+        ).where(table.c.end_time.isnot(None), *criteria)
+         .group_by(table.c.user_id, day, table.c.task_id, notes_key)
+    )
+
+    # 不同备注可能得到同一个显示名，在这里合并
+    merged = {}
+    for user_id, day_value, task_id, notes, minutes, sessions, focus_sum, focus_count in rows:
+        key = (user_id, _as_date(day_value), task_key(task_id, notes))
+        totals = merged.get(key, (0, 0, 0, 0))
+        merged[key] = tuple(a + b for a, b in zip(totals, (minutes, sessions, focus_sum, focus_count)))
+
+    return [
+        {'user_id': user_id, 'day': day_value, 'task_key': key,
+         'minutes': minutes, 'sessions': sessions, 'focus_sum': focus_sum, 'focus_count': focus_count}
+        for (user_id, day_value, key), (minutes, sessions, focus_sum, focus_count) in merged.items()
+    ]
+
+
+def _rebuild_day(connection, user_id, day):
+    """重新汇总某用户某一天的会话（只涉及当天的少量会话）"""
+    start = datetime.combine(day, datetime.min.time())
+    sessions = StudySession.__table__
+    rows = _aggregate(connection,
+                      sessions.c.user_id == user_id,
+                      sessions.c.start_time >= start,
+                      sessions.c.start_time < start + timedelta(days=1))
+
+    table = StudyDailyRollup.__table__
+    connection.execute(table.delete().where(table.c.user_id == user_id, table.c.day == day))
+    if rows:
+        connection.execute(table.insert(), rows)
+
+
+def refresh_study_days(user_id, days):
+    """批量写入会话（不经过ORM，不触发下面的事件）后调用，在当前事务内重新汇总这些日期"""
+    connection = db.session.connection()
+    for day in set(days):
+        _rebuild_day(connection, user_id, day)
+
+
+def backfill_study_rollup(user_ids=None):
+    """根据现有学习会话重建汇总表（需要应用上下文），返回写入的行数"""
+    sessions = StudySession.__table__
+    table = StudyDailyRollup.__table__
+    criteria = [sessions.c.user_id.in_(user_ids)] if user_ids else []
+
+    with db.engine.begin() as connection:
+        rows = _aggregate(connection, *criteria)
+        connection.execute(table.delete().where(table.c.user_id.in_(user_ids)) if user_ids else table.delete())
+        for start in range(0, len(rows), CHUNK):
+            connection.execute(table.insert(), rows[start:start + CHUNK])
+    return len(rows)
+
+
+def ensure_study_rollup():
+    """汇总表为空但已有结束的会话时（首次部署或旧数据）自动回填"""
+    if db.session.query(StudyDailyRollup.user_id).first() is not None:
+        return 0
+    if db.session.query(StudySession.id).filter(StudySession.end_time.isnot(None)).first() is None:
+        return 0
+    return backfill_study_rollup()
+
+
+# ========== 会话变化时增量更新 ==========
+# 受影响的 用户+日期 重新汇总，而不是按字段加减：不依赖属性的修改历史是否已加载
+
+def _session_day(user_id, start_time):
+    return (user_id, start_time.date()) if user_id is not None and start_time is not None else None
+
+
+@event.listens_for(StudySession, 'after_insert')
+@event.listens_for(StudySession, 'after_delete')
+def _session_added_or_deleted(mapper, connection, target):
+    if target.end_time is None:
+        return
+    affected = _session_day(target.user_id, target.start_time)
+    if affected:
+        _rebuild_day(connection, *affected)
+
+
+@event.listens_for(StudySession, 'after_update')
+def _session_updated(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[field].history.has_changes() for field in ROLLUP_FIELDS):
+        return
+
+    # 修改前后所在的 用户+日期 都需要重新汇总
+    user_ids = {target.user_id, *state.attrs.user_id.history.deleted}
+    start_times = {target.start_time, *state.attrs.start_time.history.deleted}
+    affected = {_session_day(user_id, start_time) for user_id in user_ids for start_time in start_times}
+    for user_id, day in filter(None, affected):
+        _rebuild_day(connection, user_id, day)
@@ -0,0 +1,188 @@
+# study_stats.py - 学习统计（读取每日汇总表 study_daily_rollup）
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from models import db, Task, StudySession, StudyDailyRollup
+from study_rollup import session_task_name
+
+# 饼状图配色，任务数超过颜色数时循环使用
+PIE_COLORS = [
+    '#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0',
+    '#9966FF', '#FF9F40', '#C9CBCF', '#7CFC00'
+]
+TREND_DAYS = 7          # 学习趋势天数
+
+
+def _empty_pie(label):
+    return {
+        'labels': [label],
+        'datasets': [{
+            'data': [100],
+            'backgroundColor': ['#e2e8f0'],
+            'borderColor': '#fff',
+            'borderWidth': 2
+        }]
+    }
+
+
+def _overview(user_id):
+    """会话数、平均专注度（只计正分）"""
+    session_count, focus_sum, focus_count = db.session.query(
+        func.sum(StudyDailyRollup.sessions),
+        func.sum(StudyDailyRollup.focus_sum),
+        func.sum(StudyDailyRollup.focus_count)
+    ).filter(StudyDailyRollup.user_id == user_id).one()
+    avg_focus = round(focus_sum / focus_count, 1) if focus_count else 0
+    return session_count or 0, avg_focus
+
+
+def _week_study(user_id, week_start):
+    """最近7×24小时学习时长：整天的部分取自汇总表，起始那天不完整，只扫描当天的会话"""
+    next_day = week_start.date() + timedelta(days=1)
+    full_days = db.session.query(func.sum(StudyDailyRollup.minutes))\
+                          .filter(StudyDailyRollup.user_id == user_id,
+                                  StudyDailyRollup.day >= next_day)\
+                          .scalar()
+    partial_day = db.session.query(func.sum(StudySession.duration_minutes))\
+                            .filter(StudySession.user_id == user_id,
+                                    StudySession.end_time.isnot(None),
+                                    StudySession.start_time >= week_start,
+                                    StudySession.start_time < datetime.combine(next_day, datetime.min.time()))\
+                            .scalar()
+    return (full_days or 0) + (partial_day or 0)
+
+
+def _task_totals(user_id):
+    """按任务汇总有效学习时长，返回 [(任务名, 分钟)]，按时长降序
+
+    关联任务的标题在这里批量查询（任务改名后统计随之更新，任务已删除时显示为已删除），
+    同名分组合并，时长相同时按最早学习日期排序。
+    """
+    rows = db.session.query(
+        StudyDailyRollup.task_key,
+        func.sum(StudyDailyRollup.minutes),
+        func.min(StudyDailyRollup.day)
+    ).filter(StudyDailyRollup.user_id == user_id)\
+     .group_by(StudyDailyRollup.task_key)\
+     .having(func.sum(StudyDailyRollup.minutes) > 0)\
+     .all()
+
+    task_ids = [int(key[2:]) for key, _, _ in rows if key.startswith('t:')]
+    titles = dict(db.session.query(Task.id, Task.title).filter(Task.id.in_(task_ids)).all()) if task_ids else {}
+
+    totals = {}
+    for key, minutes, first_day in rows:
+        if key.startswith('t:'):
+            task_id = int(key[2:])
+            name = session_task_name(task_id, titles.get(task_id), None)
+        else:
+            name = key[2:]
+        total, first = totals.get(name, (0, first_day))
+        totals[name] = (total + minutes, min(first, first_day))
+
+    ordered = sorted(totals.items(), key=lambda item: (-item[1][0], item[1][1], item[0]))
+    return [(name, total) for name, (total, _) in ordered]
+
+
+def _daily_totals(user_id, first_day):
+    """first_day 起每天的学习时长 {date: 分钟}"""
+    rows = db.session.query(StudyDailyRollup.day, func.sum(StudyDailyRollup.minutes))\
+                     .filter(StudyDailyRollup.user_id == user_id,
+                             StudyDailyRollup.day >= first_day)\
+                     .group_by(StudyDailyRollup.day)\
+                     .all()
+    return {day: total or 0 for day, total in rows}
+
+
+def study_statistics(user_id, now=None):
+    """/api/study/stats 的完整响应数据（需要应用上下文）"""
+    now = now or datetime.utcnow()
+    session_count, avg_focus = _overview(user_id)
+
+    if not session_count:
+        return {
+            'success': True,
+            'stats': {
+                'total_study': 0,
+                'week_study': 0,
+                'today_study': 0,
+                'avg_focus': 0,
+                'session_count': 0,
+                'task_count': 0
+            },
+            'pie_chart': _empty_pie('暂无学习数据'),
+            'trend_data': [],
+            'task_details': [],
+            'message': '暂无学习数据，开始学习后这里会显示统计信息'
+        }
+
+    sorted_tasks = _task_totals(user_id)
+
+    # 如果没有有效数据
+    if not sorted_tasks:
+        return {
+            'success': True,
+            'stats': {
+                'total_study': 0,
+                'week_study': 0,
+                'today_study': 0,
+                'avg_focus': 0,
+                'session_count': session_count,
+                'task_count': 0
+            },
+            'pie_chart': _empty_pie('暂无有效学习时长'),
+            'trend_data': [],
+            'task_details': []
+        }
+
+    # 只显示前8个任务，其他的归为"其他"
+    if len(sorted_tasks) > 8:
+        main_tasks = sorted_tasks[:7]
+        main_tasks.append(("其他任务", sum(minutes for _, minutes in sorted_tasks[7:])))
+    else:
+        main_tasks = sorted_tasks
+
+    colors = PIE_COLORS * (len(main_tasks) // len(PIE_COLORS) + 1)
+    pie_data = {
+        'labels': [name for name, _ in main_tasks],
+        'datasets': [{
+            'data': [minutes for _, minutes in main_tasks],
+            'backgroundColor': colors[:len(main_tasks)],
+            'borderColor': '#fff',
+            'borderWidth': 2
+        }]
+    }
+
+    total_study = sum(minutes for _, minutes in sorted_tasks)
+
+    # 学习趋势（最近7天每日学习时长），今日时长取自最后一天
+    today = now.date()
+    days = [today - timedelta(days=TREND_DAYS - 1 - i) for i in range(TREND_DAYS)]
+    daily = _daily_totals(user_id, days[0])
+    trend_data = [{
+        'date': day.strftime('%m-%d'),
+        'duration': daily.get(day, 0)
+    } for day in days]
+
+    return {
+        'success': True,
+        'stats': {
+            'total_study': total_study,
+            'week_study': _week_study(user_id, now - timedelta(days=7)),
+            'today_study': daily.get(today, 0),
+            'avg_focus': avg_focus,
+            'session_count': session_count,
+            'task_count': len(sorted_tasks)
+        },
+        'pie_chart': pie_data,
+        'trend_data': trend_data,
+        'task_details': [
+            {
+                'task': name,
+                'duration': minutes,
+                'percentage': round(minutes / total_study * 100, 1) if total_study > 0 else 0
+            }
+            for name, minutes in sorted_tasks[:10]
+        ]
+    }
@@ -0,0 +1,174 @@
+# study_sync.py - 离线学习会话的批量同步
+from datetime import datetime, timedelta, timezone
+
+from models import db, Task, StudySession, StudySessionSync
+from study_rollup import refresh_study_days
+from user_counters import refresh_user_counters
+from data_versions import data_versions
+
+MAX_BATCH = 200                         # 每次同步最多的会话数
+MAX_DURATION = timedelta(hours=24)      # 单次会话最长时长
+CLOCK_SKEW = timedelta(minutes=5)       # 允许客户端时钟比服务器快的范围
+
+
+def _parse_time(value):
+    """ISO 8601 时间 -> UTC naive datetime（与数据库中的时间一致）"""
+    if not isinstance(value, str):
+        raise ValueError
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _validate(item, now):
+    """校验单条会话，返回 (规范化后的数据, 错误信息)"""
+    if not isinstance(item, dict):
+        return None, '格式错误'
+
+    client_id = item.get('client_id')
+    if not isinstance(client_id, str) or not 0 < len(client_id.strip()) <= 64:
+        return None, 'client_id 必须是1-64个字符的字符串'
+
+    try:
+        start_time = _parse_time(item.get('start_time'))
+        end_time = _parse_time(item.get('end_time'))
+    except ValueError:
+        return None, 'start_time / end_time 必须是ISO 8601格式的时间'
+    if end_time <= start_time:
+        return None, '结束时间必须晚于开始时间'
+    if end_time - start_time > MAX_DURATION:
+        return None, '单次学习时长不能超过24小时'
+    if end_time > now + CLOCK_SKEW:
+        return None, '结束时间不能晚于当前时间'
+
+    focus_score = item.get('focus_score', 3)
+    if not isinstance(focus_score, int) or isinstance(focus_score, bool) or not 1 <= focus_score <= 5:
+        return None, 'focus_score 必须是1-5的整数'
+
+    task_id = item.get('task_id')
+    if task_id is not None and (not isinstance(task_id, int) or isinstance(task_id, bool)):
+        return None, 'task_id 必须是整数'
+
+    notes = item.get('notes')
+    if notes is not None and not isinstance(notes, str):
+        return None, 'notes 必须是字符串'
+
+    return {
+        'client_id': client_id.strip(),
+        'task_id': task_id,
+        'start_time': start_time,
+        'end_time': end_time,
+        'duration_minutes': int((end_time - start_time).total_seconds() / 60),
+        'focus_score': focus_score,
+        'notes': notes.strip() if notes and notes.strip() else None,
+    }, None
+
+
+def _existing_intervals(user_id, first_start, last_end, now):
+    """与 [first_start, last_end) 有交集的已有会话区间（进行中的会话截止到当前时间）"""
+    rows = db.session.query(StudySession.start_time, StudySession.end_time).filter(
+        StudySession.user_id == user_id,
+        StudySession.start_time < last_end,
+        db.or_(StudySession.end_time.is_(None), StudySession.end_time > first_start)
+    ).all()
+    return [(start, end or now) for start, end in rows]
+
+
+def sync_sessions(user_id, items):
+    """在一个事务中写入客户端离线记录的会话，返回每条的处理结果
+
+    结果状态：created（已写入）、duplicate（client_id 已同步过）、
+    invalid（校验失败）、overlap（与已有会话或同批次会话时间重叠）。
+    """
+    now = datetime.utcnow()
+    results = [None] * len(items)
+
+    # 校验
+    valid = []
+    for index, item in enumerate(items):
+        data, error = _validate(item, now)
+        if error:
+            results[index] = {'client_id': item.get('client_id') if isinstance(item, dict) else None,
+                              'status': 'invalid', 'message': error}
+        else:
+            valid.append((index, data))
+
+    # 幂等：已同步过的 client_id 直接返回原会话ID；同一批次内重复的只处理第一条
+    client_ids = {data['client_id'] for _, data in valid}
+    synced = dict(db.session.query(StudySessionSync.client_id, StudySessionSync.session_id).filter(
+        StudySessionSync.user_id == user_id,
+        StudySessionSync.client_id.in_(client_ids)
+    ).all()) if client_ids else {}
+
+    pending, seen = [], set()
+    for index, data in valid:
+        client_id = data['client_id']
+        if client_id in synced or client_id in seen:
+            results[index] = {'client_id': client_id, 'status': 'duplicate', 'session_id': synced.get(client_id)}
+        else:
+            seen.add(client_id)
+            pending.append((index, data))
+
+    # 任务必须属于当前用户
+    task_ids = {data['task_id'] for _, data in pending if data['task_id'] is not None}
+    own_tasks = {task_id for (task_id,) in db.session.query(Task.id).filter(
+        Task.user_id == user_id, Task.id.in_(task_ids)
+    )} if task_ids else set()
+
+    # 按开始时间排序后逐条检查重叠（同批次已接受的会话也参与比较）
+    accepted = []
+    if pending:
+        intervals = _existing_intervals(user_id,
+                                        min(d['start_time'] for _, d in pending),
+                                        max(d['end_time'] for _, d in pending), now)
+        for index, data in sorted(pending, key=lambda p: p[1]['start_time']):
+            if data['task_id'] is not None and data['task_id'] not in own_tasks:
+                results[index] = {'client_id': data['client_id'], 'status': 'invalid', 'message': '任务不存在'}
+                continue
+            if any(start < data['end_time'] and data['start_time'] < end for start, end in intervals):
+                results[index] = {'client_id': data['client_id'], 'status': 'overlap',
+                                  'message': '与已有学习记录时间重叠'}
+                continue
+            intervals.append((data['start_time'], data['end_time']))
+            accepted.append((index, data))
+
+    if accepted:
+        # 一次 executemany 批量写入，按参数顺序返回新会话ID
+        table = StudySession.__table__
+        rows = [{
+            'user_id': user_id,
+            'task_id': data['task_id'],
+            'start_time': data['start_time'],
+            'end_time': data['end_time'],
+            'duration_minutes': data['duration_minutes'],
+            'focus_score': data['focus_score'],
+            'notes': data['notes'],
+            'session_type': 'focus',
+            'created_at': now,
+        } for _, data in accepted]
+        session_ids = db.session.execute(
+            table.insert().returning(table.c.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+
+        db.session.execute(StudySessionSync.__table__.insert(), [
+            {'user_id': user_id, 'client_id': data['client_id'], 'session_id': session_id, 'synced_at': now}
+            for (_, data), session_id in zip(accepted, session_ids)
+        ])
+
+        # 批量写入不触发ORM事件，汇总表、用户计数和数据版本需要显式更新
+        refresh_study_days(user_id, [data['start_time'].date() for _, data in accepted])
+        refresh_user_counters([user_id])
+        data_versions.bump_users([user_id])
+
+        created = {}
+        for (index, data), session_id in zip(accepted, session_ids):
+            results[index] = {'client_id': data['client_id'], 'status': 'created', 'session_id': session_id}
+            created[data['client_id']] = session_id
+
+        # 同一批次内的重复项指向刚写入的会话
+        for result in results:
+            if result['status'] == 'duplicate' and result['session_id'] is None:
+                result['session_id'] = created.get(result['client_id'])
+
+    return results
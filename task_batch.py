@@ -0,0 +1,58 @@
+# task_batch.py - 任务批量操作（每个操作一条 UPDATE / DELETE 语句）
+from datetime import datetime
+
+from models import db, Task, StudySession, UserRecommendation
+from study_rollup import refresh_study_days
+from user_counters import refresh_user_counters
+from data_versions import data_versions
+from task_search import refresh_task_bigrams
+
+
+def _owned(user_id, task_ids):
+    return (Task.user_id == user_id, Task.id.in_(task_ids))
+
+
+def complete_tasks(user_id, task_ids, now=None):
+    """把用户选中的未完成任务标记为已完成，返回更新的任务数
+
+    批量语句不触发ORM事件：用户计数和数据版本在这里更新，提交后由调用方使推荐缓存失效。
+    """
+    result = db.session.execute(
+        db.update(Task)
+          .where(*_owned(user_id, task_ids), Task.status != 'completed')
+          .values(status='completed', completed_at=now or datetime.utcnow()),
+        execution_options={'synchronize_session': False}
+    )
+    if result.rowcount:
+        refresh_user_counters([user_id])
+        data_versions.bump_users([user_id])
+    return result.rowcount
+
+
+def delete_tasks(user_id, task_ids):
+    """删除用户选中的任务，返回 (删除的任务数, 被级联删除的学习会话数)
+
+    学习会话由数据库外键 ON DELETE CASCADE 删除，不逐个加载；受影响日期的汇总、
+    用户计数、数据版本、二元分词索引和该用户的预计算推荐在同一事务内更新。
+    """
+    sessions = StudySession.__table__
+    task_query = db.select(Task.id).where(*_owned(user_id, task_ids))
+    session_rows = db.session.execute(
+        db.select(sessions.c.start_time, sessions.c.end_time)
+          .where(sessions.c.user_id == user_id, sessions.c.task_id.in_(task_query))
+    ).all()
+
+    deleted = db.session.execute(
+        db.delete(Task).where(*_owned(user_id, task_ids)).returning(Task.id),
+        execution_options={'synchronize_session': False}
+    ).scalars().all()
+    if not deleted:
+        return 0, 0
+
+    recommendations = UserRecommendation.__table__
+    db.session.execute(recommendations.delete().where(recommendations.c.user_id == user_id))
+    refresh_study_days(user_id, [start.date() for start, end in session_rows if end is not None])
+    refresh_user_counters([user_id])
+    data_versions.bump_users([user_id])
+    refresh_task_bigrams(deleted)
+    return len(deleted), len(session_rows)
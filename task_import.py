@@ -0,0 +1,362 @@
+# task_import.py - 从 CSV / JSON lines / iCalendar 文件批量导入任务（流式解析，分批写入）
+import csv
+import io
+import json
+import re
+from datetime import datetime, timedelta, timezone
+
+from models import db, User, Task, UserRecommendation
+from user_counters import refresh_user_counters
+from data_versions import data_versions
+from recommend_cache import recommend_cache
+from task_search import refresh_task_bigrams
+
+IMPORT_FORMATS = ('csv', 'jsonl', 'ics')
+# 文件扩展名 -> 格式
+FORMAT_EXTENSIONS = {'csv': 'csv', 'jsonl': 'jsonl', 'ndjson': 'jsonl', 'ics': 'ics', 'ical': 'ics'}
+
+CHUNK_SIZE = 500            # 每个事务写入的行数
+MAX_TITLE = 200             # 与 Task.title 的长度一致
+MAX_ESTIMATED_MINUTES = 10000
+
+PRIORITY_NAMES = {'high': 1, 'medium': 2, 'low': 3, '高': 1, '中': 2, '低': 3}
+TASK_STATUSES = ('pending', 'completed')
+
+
+def detect_format(filename):
+    """根据文件扩展名判断格式，无法判断时返回 None"""
+    if not filename or '.' not in filename:
+        return None
+    return FORMAT_EXTENSIONS.get(filename.rsplit('.', 1)[1].lower())
+
+
+# ========== 流式解析：逐条产生 (行号, 记录字典) ==========
+def _read_csv(text):
+    reader = csv.DictReader(text)
+    if reader.fieldnames is None:
+        return
+    reader.fieldnames = [(name or '').strip().lower() for name in reader.fieldnames]
+    for record in reader:
+        record.pop(None, None)      # 多出来的列
+        yield reader.line_num, {key: value for key, value in record.items() if value not in (None, '')}
+
+
+def _read_jsonl(text):
+    for line_number, line in enumerate(text, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, 'JSON 格式错误'
+            continue
+        yield line_number, record if isinstance(record, dict) else '每行必须是一个 JSON 对象'
+
+
+def _unfolded(text):
+    """iCalendar 折行（以空格或制表符开头的行接在上一行后面），产生 (起始行号, 完整内容行)"""
+    current, start = None, 0
+    for line_number, line in enumerate(text, 1):
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current:
+            yield start, current
+        current, start = line, line_number
+    if current:
+        yield start, current
+
+
+def _ics_property(line):
+    """'DUE;TZID=Asia/Shanghai:20261020T235900' -> ('DUE', {'TZID': 'Asia/Shanghai'}, '20261020T235900')"""
+    head, _, value = line.partition(':')
+    name, *params = head.split(';')
+    return name.upper(), dict(p.split('=', 1) for p in params if '=' in p), value
+
+
+def _ics_text(value):
+    return re.sub(r'\\([\\;,nN])', lambda m: '\n' if m.group(1) in 'nN' else m.group(1), value)
+
+
+def _ics_time(value, params):
+    # 全天日期或日期时间；UTC（以Z结尾）与数据库一致，带 TZID 的按本地时间原样保存
+    value = value.strip()
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        return datetime.strptime(value, '%Y%m%d').isoformat()
+    return datetime.strptime(value.rstrip('Z'), '%Y%m%dT%H%M%S').isoformat()
+
+
+def _ics_duration_minutes(value):
+    """'PT1H30M' / 'P1D' -> 分钟数"""
+    match = re.fullmatch(r'P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?', value.strip())
+    if not match or not any(match.groups()):
+        raise ValueError
+    weeks, days, hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return int(timedelta(weeks=weeks, days=days, hours=hours, minutes=minutes, seconds=seconds).total_seconds() // 60)
+
+
+def _ics_priority(value):
+    # RFC 5545：1-4 高，5 中，6-9 低，0 未定义
+    level = int(value)
+    if level == 0:
+        return None
+    return 1 if level <= 4 else 2 if level == 5 else 3
+
+
+def _ics_record(properties):
+    """VTODO / VEVENT 的属性 -> 导入记录列表（每个参与者一条）
+
+    截止时间取 DUE，没有时取 DTSTART；预计用时取 DURATION，日程没有时按 DTEND - DTSTART。
+    参与者的邮箱对应用户，没有参与者时由默认用户导入。
+    """
+    record, attendees, values = {}, [], {}
+    for name, params, value in properties:
+        if name == 'ATTENDEE':
+            email = value.split(':', 1)[1] if value.lower().startswith('mailto:') else value
+            attendees.append(email.strip())
+        elif name not in values:
+            values[name] = (params, value)
+
+    if 'SUMMARY' in values:
+        record['title'] = _ics_text(values['SUMMARY'][1])
+    if 'DESCRIPTION' in values:
+        record['description'] = _ics_text(values['DESCRIPTION'][1])
+    if 'PRIORITY' in values:
+        priority = _ics_priority(values['PRIORITY'][1])
+        if priority is not None:
+            record['priority'] = priority
+    if 'STATUS' in values:
+        status = values['STATUS'][1].strip().upper()
+        record['status'] = {'COMPLETED': 'completed', 'NEEDS-ACTION': 'pending',
+                            'IN-PROCESS': 'pending'}.get(status, status.lower())
+
+    due = values.get('DUE') or values.get('DTSTART')
+    if due:
+        record['due_date'] = _ics_time(due[1], due[0])
+    if 'DURATION' in values:
+        record['estimated_minutes'] = _ics_duration_minutes(values['DURATION'][1])
+    elif 'DTSTART' in values and 'DTEND' in values:
+        start = datetime.fromisoformat(_ics_time(values['DTSTART'][1], values['DTSTART'][0]))
+        end = datetime.fromisoformat(_ics_time(values['DTEND'][1], values['DTEND'][0]))
+        if len(values['DTSTART'][1].strip()) > 8 and end > start:
+            record['estimated_minutes'] = int((end - start).total_seconds() // 60)
+
+    if not attendees:
+        return [record]
+    return [dict(record, user=email) for email in attendees]
+
+
+def _read_ics(text):
+    component, nested, start, properties = None, 0, 0, []
+    for line_number, line in _unfolded(text):
+        name, params, value = _ics_property(line)
+        if component is None:
+            if name == 'BEGIN' and value.upper() in ('VTODO', 'VEVENT'):
+                component, nested, start, properties = value.upper(), 0, line_number, []
+            continue
+        # 嵌套组件（如 VALARM）的属性不属于任务本身
+        if name == 'BEGIN':
+            nested += 1
+        elif name == 'END' and nested:
+            nested -= 1
+        elif name == 'END':
+            try:
+                records = _ics_record(properties)
+            except ValueError:
+                yield start, f'{component} 中的时间、时长或优先级格式错误'
+            else:
+                for record in records:
+                    yield start, record
+            component = None
+        elif not nested:
+            properties.append((name, params, value))
+
+
+PARSERS = {'csv': _read_csv, 'jsonl': _read_jsonl, 'ics': _read_ics}
+
+
+# ========== 校验 ==========
+def _text(value):
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError
+    return value.strip() or None
+
+
+def _parse_due(value):
+    """ISO 8601 日期或时间 -> UTC naive datetime（与数据库中的时间一致）"""
+    if not isinstance(value, str):
+        raise ValueError
+    parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _validate(record):
+    """校验单条记录，返回 (规范化后的数据, 错误信息)"""
+    try:
+        title = _text(record.get('title'))
+    except ValueError:
+        return None, 'title 必须是字符串'
+    if not title:
+        return None, '任务标题不能为空'
+    if len(title) > MAX_TITLE:
+        return None, f'任务标题不能超过{MAX_TITLE}个字符'
+
+    try:
+        description = _text(record.get('description'))
+    except ValueError:
+        return None, 'description 必须是字符串'
+
+    priority = record.get('priority', 2)
+    if isinstance(priority, str):
+        priority = priority.strip().lower()
+        priority = PRIORITY_NAMES.get(priority, int(priority) if priority.isdigit() else None)
+    if isinstance(priority, bool) or priority not in (1, 2, 3):
+        return None, 'priority 必须是1-3或 high / medium / low'
+
+    status = record.get('status', 'pending')
+    status = status.strip().lower() if isinstance(status, str) else status
+    if status not in TASK_STATUSES:
+        return None, 'status 必须是 pending 或 completed'
+
+    due_date = None
+    if record.get('due_date') is not None:
+        try:
+            due_date = _parse_due(record['due_date'])
+        except ValueError:
+            return None, 'due_date 必须是ISO 8601格式的日期或时间'
+
+    estimated_minutes = record.get('estimated_minutes')
+    if estimated_minutes is not None:
+        if isinstance(estimated_minutes, str) and estimated_minutes.strip().isdigit():
+            estimated_minutes = int(estimated_minutes)
+        if (not isinstance(estimated_minutes, int) or isinstance(estimated_minutes, bool)
+                or not 0 < estimated_minutes <= MAX_ESTIMATED_MINUTES):
+            return None, f'estimated_minutes 必须是1-{MAX_ESTIMATED_MINUTES}的整数'
+
+    try:
+        user = _text(record.get('user'))
+    except ValueError:
+        return None, 'user 必须是用户名或邮箱'
+
+    return {
+        'title': title,
+        'description': description,
+        'priority': priority,
+        'status': status,
+        'due_date': due_date,
+        'estimated_minutes': estimated_minutes,
+        'user': user,
+    }, None
+
+
+# ========== 写入 ==========
+class _UserResolver:
+    """用户名或邮箱 -> 用户ID（每批一次查询，结果缓存到导入结束）"""
+
+    def __init__(self):
+        self._ids = {}
+
+    def resolve(self, names):
+        missing = {name for name in names if name not in self._ids}
+        if missing:
+            found = db.session.query(User.id, User.username, User.email).filter(
+                db.or_(User.username.in_(missing), User.email.in_(missing))
+            ).all()
+            for user_id, username, email in found:
+                self._ids[username] = user_id
+                self._ids[email] = user_id
+            for name in missing:
+                self._ids.setdefault(name, None)
+        return self._ids
+
+
+def _write_chunk(rows, now):
+    """一个事务写入一批任务（一次 executemany），并更新受影响用户的计数和缓存"""
+    user_ids = sorted({row['user_id'] for row in rows})
+    task_ids = db.session.execute(Task.__table__.insert().returning(Task.__table__.c.id), [dict(
+        row,
+        completed_at=now if row['status'] == 'completed' else None,
+        created_at=now
+    ) for row in rows]).scalars().all()
+
+    # 批量写入不触发ORM事件：在同一事务内重算用户计数、递增数据版本、删除预计算推荐、
+    # 写入二元分词索引（trigram 全文索引由触发器同步）
+    recommendations = UserRecommendation.__table__
+    db.session.execute(recommendations.delete().where(recommendations.c.user_id.in_(user_ids)))
+    refresh_user_counters(user_ids)
+    data_versions.bump_users(user_ids)
+    refresh_task_bigrams(task_ids)
+    db.session.commit()
+
+    for user_id in user_ids:
+        recommend_cache.invalidate(user_id)
+    return user_ids
+
+
+def import_tasks(stream, fmt, default_user_id=None, allowed_user_ids=None,
+                 on_error=None, chunk_size=CHUNK_SIZE):
+    """从二进制文件流导入任务（需要应用上下文），返回 {'imported', 'failed', 'users'}
+
+    文件逐行解析，每 chunk_size 条记录一个事务写入，内存占用与文件大小无关；
+    已提交的批次不会因为后面的错误回滚。每条无效记录调用 on_error(行号, 错误信息)。
+    记录中的 user（用户名或邮箱）指定导入给谁，为空时导入给 default_user_id；
+    allowed_user_ids 不为 None 时只能导入给其中的用户。
+    格式无效或文件不是 UTF-8 编码时抛出 ValueError。
+    """
+    if fmt not in PARSERS:
+        raise ValueError('无效的导入格式')
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    resolver = _UserResolver()
+    summary = {'imported': 0, 'failed': 0, 'users': set()}
+
+    def fail(line_number, message):
+        summary['failed'] += 1
+        if on_error:
+            on_error(line_number, message)
+
+    def flush(batch):
+        # 按行号顺序报告错误：校验错误和用户错误都在这里统一处理
+        ids = resolver.resolve({data['user'] for _, data, _ in batch if data and data['user']})
+        rows = []
+        for line_number, data, error in batch:
+            if error:
+                fail(line_number, error)
+                continue
+            user_id = ids.get(data['user']) if data['user'] else default_user_id
+            if user_id is None:
+                fail(line_number, f"用户不存在: {data['user']}" if data['user'] else '缺少 user')
+            elif allowed_user_ids is not None and user_id not in allowed_user_ids:
+                fail(line_number, f"无权为该用户导入任务: {data['user']}")
+            else:
+                data = dict(data, user_id=user_id)
+                del data['user']
+                rows.append(data)
+        if rows:
+            summary['users'].update(_write_chunk(rows, datetime.utcnow()))
+            summary['imported'] += len(rows)
+
+    batch = []
+    try:
+        for line_number, record in PARSERS[fmt](text):
+            data, error = _validate(record) if isinstance(record, dict) else (None, record)
+            batch.append((line_number, data, error))
+            if len(batch) >= chunk_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    except UnicodeDecodeError:
+        raise ValueError('文件必须是 UTF-8 编码')
+    except csv.Error as e:
+        raise ValueError(f'CSV 格式错误: {e}')
+    finally:
+        text.detach()
+
+    summary['users'] = len(summary['users'])
+    return summary
@@ -0,0 +1,110 @@
+# task_list.py - 任务列表查询（筛选、排序、字段投影、游标分页）
+from datetime import datetime, date, timedelta
+
+from models import db, Task
+from pagination import keyset_page
+
+# 可返回的字段 -> 查询列（id 总是返回）
+TASK_FIELDS = {
+    'id': Task.id,
+    'title': Task.title,
+    'description': Task.description,
+    'priority': Task.priority,
+    'status': Task.status,
+    'due_date': Task.due_date,
+    'created_at': Task.created_at,
+    'completed_at': Task.completed_at,
+    'estimated_minutes': Task.estimated_minutes,
+}
+
+# 排序方式 -> (游标列, 是否升序)；最后一列为主键保证唯一
+TASK_SORTS = {
+    'created_desc': ((Task.created_at, Task.id), False),
+    'created_asc': ((Task.created_at, Task.id), True),
+    'priority_asc': ((Task.priority, Task.id), True),      # 优先级数字小的（高优先级）在前
+    'priority_desc': ((Task.priority, Task.id), False),
+}
+
+TASK_STATUSES = ('pending', 'completed')
+TASK_PRIORITIES = (1, 2, 3)
+DUE_FILTERS = ('overdue', 'today', 'week', 'none')
+
+
+def parse_fields(value):
+    """'id,title,status' -> 字段名列表；为空时返回全部字段，含未知字段时抛出 ValueError"""
+    if not value:
+        return list(TASK_FIELDS)
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in TASK_FIELDS]
+    if unknown:
+        raise ValueError(f"未知字段: {', '.join(unknown)}")
+    return ['id'] + [name for name in dict.fromkeys(names) if name != 'id']
+
+
+def task_filters(user_id, status=None, priority=None, due=None, now=None):
+    """筛选参数 -> 查询条件列表（'all' 或空表示不筛选），参数无效时抛出 ValueError"""
+    criteria = [Task.user_id == user_id]
+
+    if status and status != 'all':
+        if status not in TASK_STATUSES:
+            raise ValueError('无效的状态筛选')
+        criteria.append(Task.status == status)
+
+    if priority and priority != 'all':
+        try:
+            priority = int(priority)
+        except (TypeError, ValueError):
+            raise ValueError('无效的优先级筛选')
+        if priority not in TASK_PRIORITIES:
+            raise ValueError('无效的优先级筛选')
+        criteria.append(Task.priority == priority)
+
+    if due and due != 'all':
+        if due not in DUE_FILTERS:
+            raise ValueError('无效的截止日期筛选')
+        today = datetime.combine((now or datetime.utcnow()).date(), datetime.min.time())
+        if due == 'overdue':
+            criteria += [Task.due_date < today, Task.status != 'completed']
+        elif due == 'today':
+            criteria += [Task.due_date >= today, Task.due_date < today + timedelta(days=1)]
+        elif due == 'week':
+            criteria += [Task.due_date >= today, Task.due_date < today + timedelta(days=7)]
+        else:
+            criteria.append(Task.due_date.is_(None))
+    return criteria
+
+
+def task_page(criteria, fields, sort='created_desc', cursor=None, limit=20):
+    """按条件和排序取一页任务（只查询需要的列），返回 (行列表, 下一页游标或None)
+
+    排序方式无效或游标错误时抛出 ValueError。
+    """
+    if sort not in TASK_SORTS:
+        raise ValueError('无效的排序方式')
+    columns, ascending = TASK_SORTS[sort]
+    # 游标列必须一起查出
+    selected = [TASK_FIELDS[name] for name in fields]
+    selected += [column for column in columns if column.key not in fields]
+
+    query = db.session.query(*selected).filter(*criteria)
+    return keyset_page(query, columns, cursor, limit, ascending)
+
+
+def task_json(row, fields):
+    """查询行 -> 接口数据（日期时间转为ISO格式）"""
+    result = {}
+    for name in fields:
+        value = getattr(row, name)
+        result[name] = value.isoformat() if isinstance(value, (datetime, date)) else value
+    return result
+
+
+def task_counts(user_id):
+    """任务总数、已完成、待完成、高优先级数量（一次聚合查询）"""
+    total, completed, pending, high = db.session.query(
+        db.func.count(Task.id),
+        db.func.count(db.case((Task.status == 'completed', 1))),
+        db.func.count(db.case((Task.status == 'pending', 1))),
+        db.func.count(db.case((Task.priority == 1, 1)))
+    ).filter(Task.user_id == user_id).one()
+    return {'total': total, 'completed': completed, 'pending': pending, 'high': high}
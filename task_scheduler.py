@@ -0,0 +1,148 @@
+# task_scheduler.py - 按截止日期、优先级和预计用时排序的任务调度
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+from models import db, Task
+
+# 优先级 -> 分值（1 为高优先级）
+PRIORITY_SCORES = {1: 1.0, 2: 0.5, 3: 0.0}
+
+
+class UrgencyPolicy:
+    """紧急度 = 截止权重 × 截止紧迫度 + 优先级权重 × 优先级分值
+
+    截止紧迫度按“剩余空闲时间”计算：距截止的天数减去完成任务所需的天数
+    （预计用时 / 每天可用的学习时间）。空闲时间为0时紧迫度为1，每多出
+    horizon_days 天减少1，最低为0；已经来不及或已过期的任务大于1，最高为2。
+    没有截止日期的任务只按优先级排序。
+    """
+
+    def __init__(self, due_weight=3.0, priority_weight=1.0, horizon_days=14,
+                 daily_minutes=120, default_effort_minutes=60):
+        self.due_weight = due_weight
+        self.priority_weight = priority_weight
+        self.horizon_days = horizon_days
+        self.daily_minutes = daily_minutes
+        self.default_effort_minutes = default_effort_minutes
+
+    def due_pressure(self, due_date, estimated_minutes, now):
+        if due_date is None:
+            return 0.0
+        days_left = (due_date - now).total_seconds() / 86400
+        effort_days = (estimated_minutes or self.default_effort_minutes) / self.daily_minutes
+        slack = days_left - effort_days
+        return min(max(1 - slack / self.horizon_days, 0.0), 2.0)
+
+    def score(self, task, now):
+        """task 需要有 priority、due_date、estimated_minutes 属性"""
+        return (self.due_weight * self.due_pressure(task.due_date, task.estimated_minutes, now)
+                + self.priority_weight * PRIORITY_SCORES.get(task.priority, 0.0))
+
+
+class TaskScheduler:
+    """从用户待完成任务中选出最紧急的几个
+
+    不加载全部任务。同一优先级内紧急度只由空闲时间（距截止天数 - 所需天数）决定，
+    所以按优先级分别取候选，都走 (user_id, status, priority, ...) 复合索引：
+    1. 无截止日期的按创建先后取前 limit 个；
+    2. 有截止日期的按截止日期分页读取，直到后面的任务按默认用时已不可能超过
+       当前第 limit 名；
+    3. 再取预计用时长到可能因此超过第 limit 名的任务。
+    候选之外的任务紧急度都低于第 limit 名，结果与对全部任务排序相同。
+    """
+
+    # 候选任务的查询列
+    COLUMNS = (Task.id, Task.title, Task.priority, Task.due_date, Task.estimated_minutes)
+    # 按优先级分别取候选；None 表示其他（未设置或不在 PRIORITY_SCORES 中）的优先级
+    LEVELS = (*PRIORITY_SCORES, None)
+
+    def __init__(self, policy=None):
+        self.policy = policy or UrgencyPolicy()
+
+    def configure(self, **options):
+        """按配置替换紧急度函数的参数（见 UrgencyPolicy）"""
+        self.policy = UrgencyPolicy(**options)
+
+    @staticmethod
+    def _sort_key(item):
+        # 紧急度相同时截止早的在前，再按创建先后（等待最久的在前）
+        score, task = item
+        return (-score, task.due_date or datetime.max, task.id)
+
+    def _level(self, user_id, priority):
+        pending = db.session.query(*self.COLUMNS).filter(Task.user_id == user_id, Task.status == 'pending')
+        if priority is None:
+            return pending.filter(or_(Task.priority.is_(None), Task.priority.notin_(PRIORITY_SCORES)))
+        return pending.filter(Task.priority == priority)
+
+    def _max_slack(self, scored, limit, priority):
+        """该优先级的任务要进入前 limit 名，空闲天数最多是多少；不可能进入时返回 None"""
+        if len(scored) < limit:
+            return float('inf')
+        if self.policy.due_weight <= 0:
+            # 紧急度与截止日期无关，同一优先级内截止早的已在候选中
+            return None
+        threshold = sorted(scored.values(), key=self._sort_key)[limit - 1][0]
+        pressure = (threshold - self.policy.priority_weight * PRIORITY_SCORES.get(priority, 0.0)) / self.policy.due_weight
+        if pressure > 2.0:
+            return None
+        return self.policy.horizon_days * (1 - pressure)
+
+    def _candidates(self, user_id, limit, now):
+        """候选任务 {id: (紧急度, 任务行)}"""
+        policy = self.policy
+        scored = {}
+
+        def add(rows):
+            for task in rows:
+                scored.setdefault(task.id, (policy.score(task, now), task))
+
+        # 各优先级：无截止日期的前 limit 个，有截止日期的第一页
+        unfinished = {}
+        for priority in self.LEVELS:
+            level = self._level(user_id, priority)
+            add(level.filter(Task.due_date.is_(None)).order_by(Task.id).limit(limit))
+            dated = level.filter(Task.due_date.isnot(None))
+            page = dated.order_by(Task.due_date, Task.id).limit(limit).all()
+            add(page)
+            if len(page) == limit:
+                unfinished[priority] = (dated, page[-1])
+
+        default_days = policy.default_effort_minutes / policy.daily_minutes
+        for priority, (dated, last) in unfinished.items():
+            while True:
+                max_slack = self._max_slack(scored, limit, priority)
+                if max_slack is None:
+                    break
+                # 后面的任务截止都不早于 last，按默认用时空闲时间已超过 max_slack 时停止分页
+                days_left = (last.due_date - now).total_seconds() / 86400
+                after_last = or_(Task.due_date > last.due_date,
+                                 and_(Task.due_date == last.due_date, Task.id > last.id))
+                if days_left - default_days > max_slack:
+                    # 只有预计用时超过 (days_left - max_slack) 天的任务还可能进入前 limit 名
+                    min_minutes = (days_left - max_slack) * policy.daily_minutes
+                    add(dated.filter(after_last, Task.estimated_minutes >= min_minutes))
+                    break
+                page = dated.filter(after_last).order_by(Task.due_date, Task.id).limit(limit).all()
+                add(page)
+                if len(page) < limit:
+                    break
+                last = page[-1]
+        return scored
+
+    def ranked(self, user_id, limit=3, now=None):
+        """最紧急的 limit 个待完成任务，返回 [(紧急度, 任务行), ...]（需要应用上下文）"""
+        if limit <= 0:
+            return []
+        now = now or datetime.utcnow()
+        scored = sorted(self._candidates(user_id, limit, now).values(), key=self._sort_key)
+        return scored[:limit]
+
+    def urgent_tasks(self, user_id, limit=3, now=None):
+        """最紧急的 limit 个待完成任务行"""
+        return [task for _, task in self.ranked(user_id, limit, now)]
+
+
+# 全局实例
+task_scheduler = TaskScheduler()
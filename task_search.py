@@ -0,0 +1,324 @@
+# task_search.py - 任务全文搜索（SQLite FTS5，trigram 分词支持中文，另有二元分词索引支持两字词）
+import html
+import re
+
+from sqlalchemy import bindparam, event, inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, object_session
+
+from models import db, Task
+
+FTS_TABLE = 'tasks_fts'
+BIGRAM_TABLE = 'tasks_fts_bigram'
+MIN_TERM_LENGTH = 3         # trigram 分词下少于3个字符的词无法走全文索引，两字词改查二元分词索引
+SNIPPET_TOKENS = 16         # 描述摘要的长度（trigram 下约等于字符数）
+
+# 高亮标记先用控制字符占位，转义HTML后再替换为 <mark>
+_MARK_OPEN, _MARK_CLOSE = '\x02', '\x03'
+
+# 外部内容表：索引只保存分词结果，原文仍在 tasks 表；触发器保证与 tasks 同步
+# （ORM 写入和 UPDATE / DELETE 批量语句都会触发）
+_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, content='tasks', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+# 二元分词索引：trigram 无法匹配中文常见的两字词（数学、作业），因此把每个词拆成相邻两字
+# （“数学作业” -> “数学 学作 作业”）写入单独的表，用 unicode61 分词后每个二元组是一个词。
+# 拆分在应用内完成，tasks 表上没有依赖应用函数的触发器，其他连接写 tasks 不受影响：
+# ORM 写入由下面的事件在同一事务内同步，批量语句写入后调用 refresh_task_bigrams。
+_BIGRAM_DDL = f"""CREATE VIRTUAL TABLE IF NOT EXISTS {BIGRAM_TABLE} USING fts5(
+    title, description, tokenize='unicode61'
+)"""
+# 早期版本用触发器调用应用注册的函数同步（无内容表），迁移时删除
+_LEGACY_BIGRAM_TRIGGERS = ('tasks_fts_bigram_insert', 'tasks_fts_bigram_delete', 'tasks_fts_bigram_update')
+
+_WORD = re.compile(r'[^\W_]+')
+CHUNK = 500                 # 同步二元分词索引时每批处理的任务数
+
+_fts_available = None       # None 表示还没检查
+
+
+def cjk_bigrams(value):
+    """文本 -> 空格分隔的相邻两字（按词拆分，标点和空白处断开）"""
+    if not value:
+        return ''
+    return ' '.join(word[i:i + 2] for word in _WORD.findall(value.lower()) for i in range(len(word) - 1))
+
+
+def create_task_search(connection):
+    """在 connection 的当前事务内创建全文索引和同步触发器，新建索引时从 tasks 表重建
+
+    由数据库迁移调用。返回全文搜索是否可用；非 SQLite 数据库或 SQLite 未编译 FTS5 时
+    返回 False，搜索接口退回 LIKE 匹配。
+    """
+    global _fts_available
+    if connection.dialect.name != 'sqlite':
+        _fts_available = False
+        return False
+
+    try:
+        with connection.begin_nested():
+            _drop_legacy_bigram_index(connection)
+            created = _missing_tables(connection)
+            for ddl in _FTS_DDL + [_BIGRAM_DDL]:
+                connection.exec_driver_sql(ddl)
+            if FTS_TABLE in created:
+                connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            if BIGRAM_TABLE in created:
+                _fill_bigrams(connection)
+    except OperationalError as e:
+        print(f"⚠️  任务全文搜索不可用（需要 SQLite FTS5 trigram 分词）: {e}")
+        _fts_available = False
+        return False
+
+    _fts_available = True
+    return True
+
+
+def _drop_legacy_bigram_index(connection):
+    for name in _LEGACY_BIGRAM_TRIGGERS:
+        connection.exec_driver_sql(f'DROP TRIGGER IF EXISTS {name}')
+    ddl = connection.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': BIGRAM_TABLE}
+    ).scalar()
+    if ddl and "content=''" in ddl:
+        # 无内容表删除时需要原来的分词结果，改为普通表后重建
+        connection.exec_driver_sql(f'DROP TABLE {BIGRAM_TABLE}')
+
+
+def _fill_bigrams(connection, task_ids=None):
+    """把 tasks 表中的行（task_ids 为 None 时为全部）拆分后写入二元分词索引"""
+    tasks = Task.__table__
+    query = db.select(tasks.c.id, tasks.c.title, tasks.c.description)
+    if task_ids is not None:
+        query = query.where(tasks.c.id.in_(task_ids))
+    insert = text(f"INSERT INTO {BIGRAM_TABLE}(rowid, title, description) VALUES (:id, :title, :description)")
+    result = connection.execute(query)
+    while True:
+        rows = result.fetchmany(CHUNK)
+        if not rows:
+            break
+        connection.execute(insert, [
+            {'id': task_id, 'title': cjk_bigrams(title), 'description': cjk_bigrams(description)}
+            for task_id, title, description in rows
+        ])
+
+
+def refresh_task_bigrams(task_ids, connection=None):
+    """tasks 表中这些行新增、修改或删除后，在当前事务内更新二元分词索引
+
+    ORM 写入由下面的事件调用；批量语句不触发ORM事件，写入后由调用方调用。
+    """
+    task_ids = sorted({task_id for task_id in task_ids if task_id is not None})
+    connection = connection or db.session.connection()
+    if not task_ids or not _search_available(connection):
+        return
+    delete = text(f"DELETE FROM {BIGRAM_TABLE} WHERE rowid IN :ids").bindparams(bindparam('ids', expanding=True))
+    for start in range(0, len(task_ids), CHUNK):
+        chunk = task_ids[start:start + CHUNK]
+        connection.execute(delete, {'ids': chunk})
+        _fill_bigrams(connection, chunk)
+
+
+def backfill_task_bigrams(connection):
+    """按 tasks 表重建整个二元分词索引（批量生成数据后使用）"""
+    if not _search_available(connection):
+        return
+    connection.exec_driver_sql(f'DELETE FROM {BIGRAM_TABLE}')
+    _fill_bigrams(connection)
+
+
+# ========== ORM 写入时在同一事务内同步二元分词索引 ==========
+def _pending(target):
+    session = object_session(target)
+    if session is None:
+        return None
+    return session.info.setdefault('task_bigrams_pending', set())
+
+
+def _task_added_or_deleted(mapper, connection, target):
+    pending = _pending(target)
+    if pending is not None:
+        pending.add(target.id)
+
+
+def _task_updated(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.title.history.has_changes() or state.attrs.description.history.has_changes():
+        _task_added_or_deleted(mapper, connection, target)
+
+
+event.listen(Task, 'after_insert', _task_added_or_deleted)
+event.listen(Task, 'after_delete', _task_added_or_deleted)
+event.listen(Task, 'after_update', _task_updated)
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_pending(session, flush_context):
+    pending = session.info.pop('task_bigrams_pending', None)
+    if pending:
+        refresh_task_bigrams(pending, session.connection())
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop('task_bigrams_pending', None)
+
+
+def _missing_tables(connection):
+    existing = {name for (name,) in connection.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN (:fts, :bigram)"),
+        {'fts': FTS_TABLE, 'bigram': BIGRAM_TABLE}
+    )}
+    return {FTS_TABLE, BIGRAM_TABLE} - existing
+
+
+def _search_available(connection=None):
+    global _fts_available
+    if _fts_available is None:
+        connection = connection or db.session.connection()
+        _fts_available = connection.dialect.name == 'sqlite' and not _missing_tables(connection)
+    return _fts_available
+
+
+def _marked_html(value):
+    """带占位标记的文本 -> 转义后的HTML（匹配部分包在 <mark> 中）"""
+    escaped = html.escape(value or '')
+    return escaped.replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>')
+
+
+def _mark_terms(value, terms):
+    """在文本中给所有匹配的词加占位标记（LIKE 退回路径使用）"""
+    if not value:
+        return value
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    return pattern.sub(lambda m: f'{_MARK_OPEN}{m.group(0)}{_MARK_CLOSE}', value)
+
+
+def _excerpt(value, terms, width=SNIPPET_TOKENS):
+    """描述中第一个匹配附近的片段（LIKE 退回路径使用）"""
+    if not value:
+        return value
+    lowered = value.lower()
+    positions = [lowered.find(term.lower()) for term in terms]
+    positions = [p for p in positions if p >= 0]
+    if not positions:
+        return value[:width * 2] + ('…' if len(value) > width * 2 else '')
+    start = max(min(positions) - width // 2, 0)
+    end = start + width * 2
+    return ('…' if start else '') + value[start:end] + ('…' if end < len(value) else '')
+
+
+def _match(terms):
+    # 每个词作为短语（双引号转义），多个词之间为 AND
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _is_bigram(term):
+    return len(term) == 2 and _WORD.fullmatch(term) is not None
+
+
+def _fts_search(user_id, terms, limit):
+    # 三字及以上的词查 trigram 索引（标题权重高于描述，数据库生成高亮和摘要）
+    rows = db.session.execute(text(f"""
+        SELECT t.id, t.status, t.priority, t.due_date,
+               highlight({FTS_TABLE}, 0, :open, :close) AS title,
+               snippet({FTS_TABLE}, 1, :open, :close, '…', :tokens) AS description
+        FROM {FTS_TABLE}
+        JOIN tasks t ON t.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH :match AND t.user_id = :user_id
+        ORDER BY bm25({FTS_TABLE}, 10.0, 1.0)
+        LIMIT :limit
+    """).columns(id=db.Integer, status=db.String, priority=db.Integer, due_date=db.DateTime,
+                 title=db.Text, description=db.Text),
+        {'open': _MARK_OPEN, 'close': _MARK_CLOSE, 'tokens': SNIPPET_TOKENS,
+         'match': _match(terms), 'user_id': user_id, 'limit': limit}
+    ).all()
+    return [(row.id, row.status, row.priority, row.due_date, row.title, row.description) for row in rows]
+
+
+def _bigram_search(user_id, terms, limit):
+    # 含两字词时两字词查二元分词索引，其余的词仍查 trigram 索引；
+    # 无内容表不能生成高亮，按原文标记匹配部分
+    long_terms = [term for term in terms if not _is_bigram(term)]
+    bigrams = [term.lower() for term in terms if _is_bigram(term)]
+    # CROSS JOIN 固定连接顺序：由全文索引的匹配结果驱动，而不是逐个检查用户的全部任务
+    joins = f"{BIGRAM_TABLE} CROSS JOIN tasks t ON t.id = {BIGRAM_TABLE}.rowid"
+    where = f"{BIGRAM_TABLE} MATCH :bigrams"
+    rank = f"bm25({BIGRAM_TABLE}, 10.0, 1.0)"
+    if long_terms:
+        joins += f" CROSS JOIN {FTS_TABLE} ON {FTS_TABLE}.rowid = t.id"
+        where += f" AND {FTS_TABLE} MATCH :match"
+        rank += f" + bm25({FTS_TABLE}, 10.0, 1.0)"
+    rows = db.session.execute(text(f"""
+        SELECT t.id, t.status, t.priority, t.due_date, t.title, t.description
+        FROM {joins}
+        WHERE {where} AND t.user_id = :user_id
+        ORDER BY {rank}
+        LIMIT :limit
+    """).columns(id=db.Integer, status=db.String, priority=db.Integer, due_date=db.DateTime,
+                 title=db.Text, description=db.Text),
+        {'bigrams': _match(bigrams), 'match': _match(long_terms), 'user_id': user_id, 'limit': limit}
+    ).all()
+    return [(row.id, row.status, row.priority, row.due_date,
+             _mark_terms(row.title, terms), _mark_terms(_excerpt(row.description, terms), terms))
+            for row in rows]
+
+
+def _like_search(user_id, terms, limit):
+    # 单字（或没有全文索引）时按用户范围 LIKE 匹配，最新的任务在前
+    def escaped(term):
+        return '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+    criteria = [db.or_(Task.title.ilike(escaped(term), escape='\\'),
+                       Task.description.ilike(escaped(term), escape='\\')) for term in terms]
+    rows = db.session.query(
+        Task.id, Task.status, Task.priority, Task.due_date, Task.title, Task.description
+    ).filter(Task.user_id == user_id, *criteria)\
+     .order_by(Task.created_at.desc(), Task.id.desc())\
+     .limit(limit).all()
+    return [(task_id, status, priority, due_date,
+             _mark_terms(title, terms), _mark_terms(_excerpt(description, terms), terms))
+            for task_id, status, priority, due_date, title, description in rows]
+
+
+def search_tasks(user_id, query, limit=20):
+    """搜索用户的任务，返回 (结果列表, 使用的方式 'fts' 或 'like')
+
+    三字及以上的词走 trigram 索引，两字词走二元分词索引，只有单字（或两字中含标点）时退回 LIKE。
+
+    结果中的 title_html / snippet_html 已转义，匹配部分包在 <mark> 中。
+    """
+    terms = query.split()
+    if not terms:
+        return [], 'fts'
+
+    if _search_available() and all(len(term) >= MIN_TERM_LENGTH for term in terms):
+        rows, mode = _fts_search(user_id, terms, limit), 'fts'
+    elif _search_available() and all(len(term) >= MIN_TERM_LENGTH or _is_bigram(term) for term in terms):
+        rows, mode = _bigram_search(user_id, terms, limit), 'fts'
+    else:
+        rows, mode = _like_search(user_id, terms, limit), 'like'
+
+    return [{
+        'id': task_id,
+        'status': status,
+        'priority': priority,
+        'due_date': due_date.isoformat() if due_date else None,
+        'title_html': _marked_html(title),
+        'snippet_html': _marked_html(description)
+    } for task_id, status, priority, due_date, title, description in rows], mode
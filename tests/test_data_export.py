@@ -0,0 +1,37 @@
+# tests/test_data_export.py - 数据导出接口的响应头
+import os
+import tempfile
+
+import pytest
+
+_db_dir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'test.db')
+
+from werkzeug.security import generate_password_hash
+
+from app import app
+from models import db, User
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        if User.query.filter_by(username='exporter').first() is None:
+            db.session.add(User(username='exporter', email='exporter@test',
+                                password_hash=generate_password_hash('pw')))
+            db.session.commit()
+    client = app.test_client()
+    client.post('/login', data={'username': 'exporter', 'password': 'pw'})
+    return client
+
+
+@pytest.mark.parametrize('fmt, content_type', [
+    ('csv', 'text/csv; charset=utf-8'),
+    ('ndjson', 'application/x-ndjson; charset=utf-8'),
+])
+def test_export_content_type(client, fmt, content_type):
+    response = client.get(f'/api/export/tasks?format={fmt}&gzip=0')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == content_type
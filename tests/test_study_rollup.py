@@ -0,0 +1,163 @@
+# tests/test_study_rollup.py - 每日汇总表的增量维护与学习统计接口的结果
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+_db_dir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'test.db')
+
+from werkzeug.security import generate_password_hash
+
+from app import app
+from models import db, User, Task, StudySession, StudyDailyRollup
+from study_rollup import backfill_study_rollup, session_task_name
+from study_stats import study_statistics, PIE_COLORS
+
+NOW = datetime(2026, 10, 18, 15, 0)
+
+
+@pytest.fixture
+def user_id():
+    with app.app_context():
+        db.create_all()
+        name = f'rollup-{User.query.count()}'
+        user = User(username=name, email=f'{name}@test', password_hash=generate_password_hash('pw'))
+        db.session.add(user)
+        db.session.commit()
+        yield user.id
+
+
+def _session(user_id, days_ago, minutes, task=None, notes=None, focus=3, hour=9):
+    start = (NOW - timedelta(days=days_ago)).replace(hour=hour, minute=0)
+    session = StudySession(user_id=user_id, task_id=task.id if task else None, notes=notes,
+                           start_time=start, end_time=start + timedelta(minutes=minutes),
+                           duration_minutes=minutes, focus_score=focus)
+    db.session.add(session)
+    return session
+
+
+def _rollup_rows(user_id):
+    return sorted(
+        (row.day, row.task_key, row.minutes, row.sessions, row.focus_sum, row.focus_count)
+        for row in StudyDailyRollup.query.filter_by(user_id=user_id)
+    )
+
+
+def _baseline_stats(user_id, now):
+    """汇总表之前的实现：逐条读取已结束的会话在内存中统计"""
+    sessions = StudySession.query.filter(StudySession.user_id == user_id,
+                                         StudySession.end_time.isnot(None)).all()
+    task_stats = {}
+    for session in sessions:
+        task = db.session.get(Task, session.task_id) if session.task_id else None
+        name = session_task_name(session.task_id, task.title if task else None, session.notes)
+        if session.duration_minutes:
+            task_stats[name] = task_stats.get(name, 0) + session.duration_minutes
+    sorted_tasks = sorted(task_stats.items(), key=lambda x: x[1], reverse=True)
+    total_study = sum(task_stats.values())
+    focus_scores = [s.focus_score for s in sessions if s.focus_score and s.focus_score > 0]
+
+    def minutes_on(day):
+        return sum(s.duration_minutes or 0 for s in sessions if s.start_time.date() == day)
+
+    return {
+        'success': True,
+        'stats': {
+            'total_study': total_study,
+            'week_study': sum(s.duration_minutes or 0 for s in sessions
+                              if s.start_time >= now - timedelta(days=7)),
+            'today_study': minutes_on(now.date()),
+            'avg_focus': round(sum(focus_scores) / len(focus_scores), 1) if focus_scores else 0,
+            'session_count': len(sessions),
+            'task_count': len(task_stats)
+        },
+        'pie_chart': {
+            'labels': [name for name, _ in sorted_tasks],
+            'datasets': [{
+                'data': [minutes for _, minutes in sorted_tasks],
+                'backgroundColor': PIE_COLORS[:len(sorted_tasks)],
+                'borderColor': '#fff',
+                'borderWidth': 2
+            }]
+        },
+        'trend_data': [{
+            'date': (now.date() - timedelta(days=6 - i)).strftime('%m-%d'),
+            'duration': minutes_on(now.date() - timedelta(days=6 - i))
+        } for i in range(7)],
+        'task_details': [{
+            'task': name,
+            'duration': minutes,
+            'percentage': round(minutes / total_study * 100, 1)
+        } for name, minutes in sorted_tasks[:10]]
+    }
+
+
+def test_rollup_matches_rebuild_after_orm_writes(user_id):
+    task = Task(title='高等数学', user_id=user_id)
+    db.session.add(task)
+    db.session.commit()
+
+    moved = _session(user_id, 1, 40, task=task)
+    edited = _session(user_id, 2, 25, notes='背单词', focus=0)
+    removed = _session(user_id, 3, 15)
+    _session(user_id, 0, 30, task=task, focus=5)
+    db.session.add(StudySession(user_id=user_id, start_time=NOW))      # 未结束，不计入
+    db.session.commit()
+
+    moved.start_time -= timedelta(days=2)
+    moved.end_time -= timedelta(days=2)
+    edited.duration_minutes = 35
+    db.session.delete(removed)
+    db.session.commit()
+
+    incremental = _rollup_rows(user_id)
+    backfill_study_rollup([user_id])
+    assert incremental == _rollup_rows(user_id)
+    assert [(key, minutes) for _, key, minutes, *_ in incremental] == [
+        (f't:{task.id}', 40), ('n:背单词', 35), (f't:{task.id}', 30)
+    ]
+
+
+def test_stats_match_session_scan(user_id):
+    math = Task(title='高等数学', user_id=user_id)
+    english = Task(title='大学英语', user_id=user_id)
+    db.session.add_all([math, english])
+    db.session.commit()
+
+    _session(user_id, 0, 50, task=math, focus=4)
+    _session(user_id, 0, 20, task=english, hour=7)
+    _session(user_id, 2, 45, task=math, focus=0)
+    _session(user_id, 5, 15, notes='  ')
+    _session(user_id, 6, 60, notes='阅读' * 20, focus=5)
+    _session(user_id, 7, 10, task=english, hour=18)   # 7×24小时窗口起始那天
+    _session(user_id, 30, 35, notes='复习笔记')
+    _session(user_id, 1, 0, notes='没有时长')
+    db.session.commit()
+
+    # 任务改名后统计使用新标题
+    english.title = '英语听力'
+    db.session.commit()
+
+    stats = study_statistics(user_id, now=NOW)
+    assert stats == _baseline_stats(user_id, NOW)
+    assert stats['pie_chart']['labels'][0] == '高等数学'
+    assert '英语听力' in stats['pie_chart']['labels']
+
+
+def test_stats_endpoint_shape(user_id):
+    client = app.test_client()
+    client.post('/login', data={'username': db.session.get(User, user_id).username, 'password': 'pw'})
+
+    empty = client.get('/api/study/stats').get_json()
+    assert empty['stats']['session_count'] == 0
+    assert set(empty) == {'success', 'stats', 'pie_chart', 'trend_data', 'task_details', 'message'}
+
+    _session(user_id, 0, 30, notes='刷题')
+    db.session.commit()
+    data = client.get('/api/study/stats').get_json()
+    assert set(data) == {'success', 'stats', 'pie_chart', 'trend_data', 'task_details'}
+    assert set(data['stats']) == {'total_study', 'week_study', 'today_study', 'avg_focus',
+                                  'session_count', 'task_count'}
+    assert data['task_details'] == [{'task': '刷题', 'duration': 30, 'percentage': 100.0}]
@@ -0,0 +1,132 @@
+# tests/test_study_sync.py - 离线学习会话批量同步：校验、幂等与时间重叠
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+_db_dir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'test.db')
+
+from werkzeug.security import generate_password_hash
+
+from app import app
+from models import db, User, Task, StudySession, StudyDailyRollup
+from study_sync import MAX_BATCH
+from user_counters import user_counters
+
+BASE = (datetime.utcnow() - timedelta(days=2)).replace(hour=8, minute=0, second=0, microsecond=0)
+
+
+def _user(name):
+    user = User.query.filter_by(username=name).first()
+    if user is None:
+        user = User(username=name, email=f'{name}@test', password_hash=generate_password_hash('pw'))
+        db.session.add(user)
+        db.session.commit()
+    return user
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        user = _user(f'sync-{User.query.count()}')
+        client = app.test_client()
+        client.post('/login', data={'username': user.username, 'password': 'pw'})
+        client.user_id = user.id
+        yield client
+
+
+def _item(client_id, start_minutes, length=30, **extra):
+    start = BASE + timedelta(minutes=start_minutes)
+    return dict({'client_id': client_id, 'start_time': start.isoformat() + 'Z',
+                 'end_time': (start + timedelta(minutes=length)).isoformat() + 'Z'}, **extra)
+
+
+def _sync(client, *items):
+    return client.post('/api/study/sync', json={'sessions': list(items)})
+
+
+def _statuses(response):
+    return [(r['client_id'], r['status']) for r in response.get_json()['results']]
+
+
+def test_rejects_invalid_sessions(client):
+    other_task = Task(title='别人的任务', user_id=_user('sync-other').id)
+    db.session.add(other_task)
+    db.session.commit()
+
+    response = _sync(
+        client,
+        {'client_id': 'bad-time', 'start_time': 'yesterday', 'end_time': 'today'},
+        _item('reversed', 0, length=-10),
+        _item('too-long', 0, length=25 * 60),
+        _item('future', 60 * 24 * 3),
+        _item('focus', 0, focus_score=6),
+        _item('task-type', 0, task_id='1'),
+        _item('other-task', 0, task_id=other_task.id),
+        _item('', 0),
+        'not an object',
+    )
+    assert response.get_json()['created'] == 0
+    assert [status for _, status in _statuses(response)] == ['invalid'] * 9
+    assert StudySession.query.filter_by(user_id=client.user_id).count() == 0
+
+    assert _sync(client).status_code == 400
+    assert _sync(client, *[_item(f'n{i}', i * 40) for i in range(MAX_BATCH + 1)]).status_code == 400
+
+
+def test_resubmitting_is_idempotent(client):
+    first = _sync(client, _item('a', 0), _item('b', 60), _item('a', 0))
+    results = first.get_json()['results']
+    assert first.get_json()['created'] == 2
+    assert _statuses(first) == [('a', 'created'), ('b', 'created'), ('a', 'duplicate')]
+    assert results[2]['session_id'] == results[0]['session_id']
+
+    again = _sync(client, _item('b', 60), _item('a', 0))
+    assert again.get_json()['created'] == 0
+    assert [(r['status'], r['session_id']) for r in again.get_json()['results']] == [
+        ('duplicate', results[1]['session_id']), ('duplicate', results[0]['session_id'])
+    ]
+    assert StudySession.query.filter_by(user_id=client.user_id).count() == 2
+
+
+def test_rejects_overlapping_sessions(client):
+    db.session.add(StudySession(user_id=client.user_id, start_time=BASE, end_time=BASE + timedelta(minutes=60),
+                                duration_minutes=60))
+    db.session.commit()
+
+    response = _sync(
+        client,
+        _item('inside-existing', 30),
+        _item('adjacent', 60, length=30),           # 与已有会话首尾相接，不算重叠
+        _item('batch-second', 100, length=30),
+        _item('batch-first', 90, length=20),        # 同批次中开始更早的先被接受
+    )
+    assert dict(_statuses(response)) == {
+        'inside-existing': 'overlap', 'adjacent': 'created',
+        'batch-second': 'overlap', 'batch-first': 'created',
+    }
+
+    # 进行中的会话按截止到当前时间计算
+    db.session.add(StudySession(user_id=client.user_id, start_time=BASE + timedelta(days=1)))
+    db.session.commit()
+    assert _statuses(_sync(client, _item('during-active', 60 * 24 + 30))) == [('during-active', 'overlap')]
+
+
+def test_updates_rollup_and_counters(client):
+    task = Task(title='线性代数', user_id=client.user_id)
+    db.session.add(task)
+    db.session.commit()
+
+    response = _sync(client, _item('x', 0, length=45, task_id=task.id, focus_score=5), _item('y', 120, length=15))
+    assert response.get_json()['created'] == 2
+
+    counters = user_counters(client.user_id)
+    assert (counters['session_count'], counters['total_study_minutes']) == (2, 60)
+    rollup = StudyDailyRollup.query.filter_by(user_id=client.user_id, day=BASE.date()).all()
+    assert sorted((row.task_key, row.minutes, row.focus_sum) for row in rollup) == [
+        ('n:自由学习', 15, 3), (f't:{task.id}', 45, 5)
+    ]
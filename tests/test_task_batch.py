@@ -0,0 +1,106 @@
+# tests/test_task_batch.py - 任务批量完成 / 删除：级联删除与派生数据的更新
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+_db_dir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'test.db')
+
+from werkzeug.security import generate_password_hash
+
+from app import app
+from models import db, User, Task, StudySession, StudyDailyRollup, UserRecommendation, LearningResource
+from data_versions import data_versions
+from user_counters import user_counters
+
+DAY = datetime(2026, 10, 16, 9, 0)
+
+
+def _user(name):
+    user = User(username=name, email=f'{name}@test', password_hash=generate_password_hash('pw'))
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        user = _user(f'batch-{User.query.count()}')
+        client = app.test_client()
+        client.post('/login', data={'username': user.username, 'password': 'pw'})
+        client.user_id = user.id
+        yield client
+
+
+def _tasks(user_id, *titles, **values):
+    tasks = [Task(title=title, user_id=user_id, **values) for title in titles]
+    db.session.add_all(tasks)
+    db.session.commit()
+    return tasks
+
+
+def _study(task, minutes, days=0):
+    start = DAY + timedelta(days=days)
+    db.session.add(StudySession(user_id=task.user_id, task_id=task.id, start_time=start,
+                                end_time=start + timedelta(minutes=minutes), duration_minutes=minutes))
+    db.session.commit()
+
+
+def test_batch_complete(client):
+    done, pending, other = _tasks(client.user_id, 'a', 'b', 'c')
+    done.status = 'completed'
+    db.session.commit()
+    foreign, = _tasks(_user(f'batch-other-{client.user_id}').id, 'x')
+    version = data_versions.user_version(client.user_id)
+
+    response = client.post('/batch_complete', json={'task_ids': [done.id, pending.id, foreign.id]})
+    assert response.get_json()['completed_count'] == 1
+
+    db.session.expire_all()
+    assert db.session.get(Task, pending.id).status == 'completed'
+    assert db.session.get(Task, pending.id).completed_at is not None
+    assert db.session.get(Task, other.id).status == 'pending'
+    assert db.session.get(Task, foreign.id).status == 'pending'
+    assert user_counters(client.user_id)['completed_tasks'] == 2
+    assert data_versions.user_version(client.user_id) > version
+
+    # 没有可更新的任务时不递增版本号
+    version = data_versions.user_version(client.user_id)
+    assert client.post('/batch_complete', json={'task_ids': [pending.id]}).get_json()['completed_count'] == 0
+    assert data_versions.user_version(client.user_id) == version
+
+
+def test_batch_delete_cascades_and_refreshes(client):
+    removed, kept = _tasks(client.user_id, '删除的任务', '保留的任务')
+    _study(removed, 30)
+    _study(removed, 20, days=1)
+    _study(kept, 40)
+    resource = LearningResource(title='r', url='http://r', resource_type='t')
+    db.session.add(resource)
+    db.session.commit()
+    db.session.add(UserRecommendation(user_id=client.user_id, resource_id=resource.id, rank=1, score=1.0,
+                                      computed_at=datetime.utcnow()))
+    db.session.commit()
+    foreign, = _tasks(_user(f'batch-owner-{client.user_id}').id, 'x')
+    removed_id, kept_id, foreign_id = removed.id, kept.id, foreign.id
+
+    response = client.post('/batch_delete', json={'task_ids': [removed_id, foreign_id]})
+    assert response.get_json()['deleted_count'] == 1
+
+    db.session.expire_all()
+    assert db.session.get(Task, removed_id) is None
+    assert db.session.get(Task, foreign_id) is not None
+    # 学习会话由数据库 ON DELETE CASCADE 删除
+    assert StudySession.query.filter_by(task_id=removed_id).count() == 0
+    assert StudySession.query.filter_by(user_id=client.user_id).count() == 1
+
+    counters = user_counters(client.user_id)
+    assert (counters['total_tasks'], counters['session_count'], counters['total_study_minutes']) == (1, 1, 40)
+    rollup = StudyDailyRollup.query.filter_by(user_id=client.user_id).all()
+    assert [(row.day, row.task_key, row.minutes) for row in rollup] == [(DAY.date(), f't:{kept_id}', 40)]
+    assert UserRecommendation.query.filter_by(user_id=client.user_id).count() == 0
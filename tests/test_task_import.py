@@ -0,0 +1,156 @@
+# tests/test_task_import.py - 任务导入：逐行错误报告与分批提交
+import io
+import os
+import tempfile
+from datetime import datetime
+
+import pytest
+
+_db_dir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'test.db')
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from werkzeug.security import generate_password_hash
+
+from app import app
+from models import db, User, Task
+from task_import import import_tasks
+from user_counters import user_counters
+
+
+def _user(name):
+    user = User(username=name, email=f'{name}@test', password_hash=generate_password_hash('pw'))
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        user = _user(f'import-{User.query.count()}')
+        client = app.test_client()
+        client.post('/login', data={'username': user.username, 'password': 'pw'})
+        client.user = user
+        yield client
+
+
+def _upload(client, filename, content):
+    return client.post('/api/tasks/import', content_type='multipart/form-data',
+                       data={'file': (io.BytesIO(content.encode('utf-8')), filename)}).get_json()
+
+
+def _titles(user_id):
+    return [t.title for t in Task.query.filter_by(user_id=user_id).order_by(Task.id)]
+
+
+def test_csv_reports_each_invalid_row(client):
+    other = _user(f'import-other-{client.user.id}')
+    data = _upload(client, 'tasks.csv', '\n'.join([
+        'Title,Priority,Due_Date,Status,Estimated_Minutes,User',
+        '写论文,high,2026-10-20T08:00:00+08:00,,90,',
+        ',2,,,,',
+        '复习,urgent,,,,',
+        '"多行',
+        '描述",low,not-a-date,,,',
+        '已完成,3,,completed,,',
+        f'代别人导入,2,,,,{other.username}',
+        '不存在的用户,2,,,,nobody',
+    ]))
+
+    assert (data['imported'], data['failed'], data['users']) == (2, 5, 1)
+    assert data['errors'] == [
+        {'line': 3, 'message': '任务标题不能为空'},
+        {'line': 4, 'message': 'priority 必须是1-3或 high / medium / low'},
+        {'line': 6, 'message': 'due_date 必须是ISO 8601格式的日期或时间'},
+        {'line': 8, 'message': f'无权为该用户导入任务: {other.username}'},
+        {'line': 9, 'message': '用户不存在: nobody'},
+    ]
+
+    paper, done = Task.query.filter_by(user_id=client.user.id).order_by(Task.id).all()
+    assert (paper.title, paper.priority, paper.estimated_minutes) == ('写论文', 1, 90)
+    assert paper.due_date == datetime(2026, 10, 20, 0, 0)      # 转换为UTC
+    assert (done.status, done.completed_at is not None) == ('completed', True)
+    assert user_counters(client.user.id)['total_tasks'] == 2
+    assert _titles(other.id) == []
+
+
+def test_coordinator_imports_for_other_users(client):
+    other = _user(f'import-member-{client.user.id}')
+    app.config['TASK_IMPORT_COORDINATORS'] = {client.user.username}
+    try:
+        data = _upload(client, 'tasks.jsonl', '\n'.join([
+            '{"title": "班会", "user": "%s"}' % other.email,
+            '{"title": "自己的"}',
+            '{broken',
+            '["not", "an", "object"]',
+        ]))
+    finally:
+        app.config['TASK_IMPORT_COORDINATORS'] = set()
+
+    assert (data['imported'], data['failed'], data['users']) == (2, 2, 2)
+    assert [e['line'] for e in data['errors']] == [3, 4]
+    assert _titles(other.id) == ['班会']
+    assert _titles(client.user.id) == ['自己的']
+
+
+def test_ics_components(client):
+    data = _upload(client, 'calendar.ics', '\r\n'.join([
+        'BEGIN:VCALENDAR',
+        'BEGIN:VTODO',
+        'SUMMARY:提交实验报告\\, 第三章',
+        'DUE:20261020T120000Z',
+        'PRIORITY:1',
+        'DURATION:PT1H30M',
+        'BEGIN:VALARM',
+        'SUMMARY:提醒',
+        'END:VALARM',
+        'END:VTODO',
+        'BEGIN:VEVENT',
+        'SUMMARY:期中考试',
+        'DTSTART:20261101T090000Z',
+        'DTEND:20261101T110000Z',
+        'END:VEVENT',
+        'BEGIN:VTODO',
+        'SUMMARY:格式错误',
+        'DUE:tomorrow',
+        'END:VTODO',
+        'END:VCALENDAR',
+    ]))
+
+    assert (data['imported'], data['failed']) == (2, 1)
+    assert data['errors'] == [{'line': 16, 'message': 'VTODO 中的时间、时长或优先级格式错误'}]
+    report, exam = Task.query.filter_by(user_id=client.user.id).order_by(Task.id).all()
+    assert (report.title, report.priority, report.estimated_minutes) == ('提交实验报告, 第三章', 1, 90)
+    assert (exam.due_date, exam.estimated_minutes) == (datetime(2026, 11, 1, 9, 0), 120)
+
+
+def test_commits_each_chunk(client):
+    commits = []
+    listener = lambda session: commits.append(1)
+    event.listen(Session, 'after_commit', listener)
+    try:
+        rows = '\n'.join(['title'] + [f'任务{i}' for i in range(5)] + [''] * 2 + ['任务5'])
+        summary = import_tasks(io.BytesIO(rows.encode('utf-8')), 'csv',
+                               default_user_id=client.user.id, chunk_size=2)
+    finally:
+        event.remove(Session, 'after_commit', listener)
+
+    assert summary == {'imported': 6, 'failed': 0, 'users': 1}
+    assert len(commits) == 3
+    assert user_counters(client.user.id)['total_tasks'] == 6
+
+
+def test_committed_chunks_survive_a_later_failure(client):
+    # 第一批提交之后才读到无法解码的字节
+    content = ('title\n' + ''.join(f'task {i}\n' for i in range(3000))).encode('utf-8') + b'\xff\xfe\n'
+    with pytest.raises(ValueError):
+        import_tasks(io.BytesIO(content), 'csv', default_user_id=client.user.id, chunk_size=500)
+    db.session.rollback()
+
+    imported = Task.query.filter_by(user_id=client.user.id).count()
+    assert imported and imported % 500 == 0
+    assert user_counters(client.user.id)['total_tasks'] == imported
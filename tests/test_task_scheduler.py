@@ -0,0 +1,74 @@
+# tests/test_task_scheduler.py - 紧急任务排序与对全部任务排序的结果一致
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+_db_dir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'test.db')
+
+from app import app
+from models import db, User, Task
+from task_scheduler import task_scheduler
+
+NOW = datetime(2026, 10, 18, 8, 0)
+
+
+@pytest.fixture
+def user_id():
+    with app.app_context():
+        db.create_all()
+        name = f'scheduler-{User.query.count()}'
+        user = User(username=name, email=f'{name}@test', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        yield user.id
+
+
+def _add(user_id, title, priority, due_days=None, minutes=None):
+    due = NOW + timedelta(days=due_days) if due_days is not None else None
+    db.session.add(Task(title=title, priority=priority, status='pending', due_date=due,
+                        estimated_minutes=minutes, user_id=user_id))
+
+
+def _brute_force(user_id, limit):
+    tasks = Task.query.filter_by(user_id=user_id, status='pending').all()
+    scored = [(task_scheduler.policy.score(t, NOW), t) for t in tasks]
+    scored.sort(key=lambda item: (-item[0], item[1].due_date or datetime.max, item[1].id))
+    return [t.id for _, t in scored[:limit]]
+
+
+def test_high_priority_task_after_many_earlier_ones(user_id):
+    for i in range(20):
+        _add(user_id, f'p3-{i}', 3, due_days=1)
+    _add(user_id, 'p1', 1, due_days=2)
+    db.session.commit()
+
+    titles = [t.title for t in task_scheduler.urgent_tasks(user_id, limit=3, now=NOW)]
+    assert titles[0] == 'p1'
+    assert len(titles) == 3
+
+
+def test_long_task_due_later(user_id):
+    for i in range(30):
+        _add(user_id, f'short-{i}', 2, due_days=1 + i * 0.1, minutes=30)
+    _add(user_id, 'long', 2, due_days=20, minutes=120 * 25)
+    db.session.commit()
+
+    titles = [t.title for t in task_scheduler.urgent_tasks(user_id, limit=3, now=NOW)]
+    assert titles[0] == 'long'
+
+
+def test_matches_sorting_all_tasks(user_id):
+    rng = random.Random(7)
+    for i in range(300):
+        _add(user_id, f'task-{i}', rng.choice([1, 2, 3, None, 5]),
+             due_days=rng.choice([None, rng.uniform(-5, 40)]),
+             minutes=rng.choice([None, 15, 60, rng.randint(1, 6000)]))
+    db.session.commit()
+
+    for limit in (1, 3, 10, 50):
+        ranked = [t.id for t in task_scheduler.urgent_tasks(user_id, limit=limit, now=NOW)]
+        assert ranked == _brute_force(user_id, limit)
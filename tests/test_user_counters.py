@@ -0,0 +1,83 @@
+# tests/test_user_counters.py - 用户计数按增量更新后与按源数据表计算的结果一致
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+_db_dir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'test.db')
+
+from app import app
+from models import db, User, Task, StudySession, MoodLog, UserCounter
+from user_counters import user_counters, _compute
+
+
+@pytest.fixture
+def user_id():
+    with app.app_context():
+        db.create_all()
+        name = f'counters-{User.query.count()}'
+        user = User(username=name, email=f'{name}@test', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        yield user.id
+
+
+def _assert_consistent(user_id):
+    assert user_counters(user_id) == _compute(db.session.connection(), [user_id])[user_id]
+
+
+def test_orm_writes_apply_deltas(user_id):
+    start = datetime(2026, 10, 18, 9, 0)
+    tasks = [Task(title=f't{i}', user_id=user_id) for i in range(3)]
+    db.session.add_all(tasks + [MoodLog(mood_score=4, user_id=user_id)])
+    db.session.commit()
+    assert user_counters(user_id)['total_tasks'] == 3
+    _assert_consistent(user_id)
+
+    tasks[0].status = 'completed'
+    session = StudySession(user_id=user_id, task_id=tasks[1].id, start_time=start)
+    db.session.add(session)
+    db.session.commit()
+    assert user_counters(user_id)['completed_tasks'] == 1
+    assert user_counters(user_id)['session_count'] == 0
+
+    # 提交后属性已过期：修改前的值未加载时改为重算
+    session.end_time = start + timedelta(minutes=45)
+    session.duration_minutes = 45
+    db.session.commit()
+    counters = user_counters(user_id)
+    assert (counters['session_count'], counters['total_study_minutes']) == (1, 45)
+    _assert_consistent(user_id)
+
+    loaded = db.session.get(StudySession, session.id)
+    loaded.duration_minutes = 30
+    db.session.commit()
+    assert user_counters(user_id)['total_study_minutes'] == 30
+
+    # 删除任务时学习会话由数据库级联删除
+    db.session.delete(db.session.get(Task, tasks[1].id))
+    db.session.delete(MoodLog.query.filter_by(user_id=user_id).first())
+    db.session.commit()
+    counters = user_counters(user_id)
+    assert (counters['total_tasks'], counters['session_count'], counters['mood_entries']) == (2, 0, 0)
+    _assert_consistent(user_id)
+
+
+def test_rollback_leaves_counters_unchanged(user_id):
+    db.session.add(Task(title='kept', user_id=user_id))
+    db.session.commit()
+    before = user_counters(user_id)
+
+    db.session.add(Task(title='discarded', user_id=user_id, status='completed'))
+    db.session.flush()
+    db.session.rollback()
+    assert user_counters(user_id) == before
+
+
+def test_counter_row_created_on_first_write(user_id):
+    assert db.session.get(UserCounter, user_id) is None
+    db.session.add(MoodLog(mood_score=3, user_id=user_id))
+    db.session.commit()
+    assert db.session.get(UserCounter, user_id).mood_entries == 1
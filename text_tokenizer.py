@@ -0,0 +1,37 @@
+# text_tokenizer.py - 中英文混合分词
+import re
+
+# 英文/数字单词（保留 c++、c#、vue.js 这类写法）或连续的中日韩汉字
+_TOKEN_RE = re.compile(
+    r'[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*'
+    r'|[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+'
+)
+
+
+def _is_cjk(text):
+    return '\u3400' <= text[0] <= '\ufaff'
+
+
+def tokenize(text):
+    """将文本切分为词元列表
+
+    - 英文按单词切分并转小写，忽略单个字母；带点的写法（vue.js）额外拆出各部分
+    - 连续汉字按二元组（bigram）切分，单个汉字保留原样
+      例如 "Python官方文档" -> ["python", "官方", "方文", "文档"]
+    """
+    if not text:
+        return []
+
+    tokens = []
+    for match in _TOKEN_RE.findall(text.lower()):
+        if _is_cjk(match):
+            if len(match) == 1:
+                tokens.append(match)
+            else:
+                tokens.extend(match[i:i + 2] for i in range(len(match) - 1))
+        elif len(match) > 1:
+            tokens.append(match)
+            if '.' in match:
+                tokens.extend(part for part in match.split('.') if len(part) > 1)
+
+    return tokens
@@ -0,0 +1,185 @@
+# user_counters.py - 用户汇总计数表（user_counters）的维护
+from sqlalchemy import case, event, func, inspect
+from sqlalchemy.orm import Session, object_session
+
+from models import db, User, Task, StudySession, MoodLog, UserCounter
+
+COUNTER_FIELDS = ('total_tasks', 'completed_tasks', 'total_study_minutes', 'session_count', 'mood_entries')
+
+# 影响计数的字段
+TRACKED_FIELDS = {
+    Task: ('user_id', 'status'),
+    StudySession: ('user_id', 'end_time', 'duration_minutes'),
+    MoodLog: ('user_id',),
+}
+CHUNK = 500             # 回填时每批处理的用户数
+
+
+def _compute(connection, user_ids):
+    """按任务、学习会话、心情记录表计算这些用户的计数，返回 {用户ID: 计数字典}"""
+    counters = {user_id: dict.fromkeys(COUNTER_FIELDS, 0) for user_id in user_ids}
+
+    tasks = Task.__table__
+    for user_id, total, completed in connection.execute(
+        db.select(tasks.c.user_id, func.count(), func.count(case((tasks.c.status == 'completed', 1))))
+          .where(tasks.c.user_id.in_(user_ids))
+          .group_by(tasks.c.user_id)
+    ):
+        counters[user_id].update(total_tasks=total, completed_tasks=completed)
+
+    sessions = StudySession.__table__
+    for user_id, minutes, count in connection.execute(
+        db.select(sessions.c.user_id, func.coalesce(func.sum(sessions.c.duration_minutes), 0), func.count())
+          .where(sessions.c.user_id.in_(user_ids), sessions.c.end_time.isnot(None))
+          .group_by(sessions.c.user_id)
+    ):
+        counters[user_id].update(total_study_minutes=minutes, session_count=count)
+
+    moods = MoodLog.__table__
+    for user_id, count in connection.execute(
+        db.select(moods.c.user_id, func.count())
+          .where(moods.c.user_id.in_(user_ids))
+          .group_by(moods.c.user_id)
+    ):
+        counters[user_id]['mood_entries'] = count
+    return counters
+
+
+def _rebuild(connection, user_ids):
+    """重算这些用户的计数行（在 connection 的当前事务内）"""
+    user_ids = sorted({user_id for user_id in user_ids if user_id is not None})
+    if not user_ids:
+        return
+    counters = _compute(connection, user_ids)
+    table = UserCounter.__table__
+    connection.execute(table.delete().where(table.c.user_id.in_(user_ids)))
+    connection.execute(table.insert(), [dict(user_id=user_id, **values) for user_id, values in counters.items()])
+
+
+def refresh_user_counters(user_ids):
+    """批量写入（不经过ORM，不触发下面的事件）后调用，在当前事务内重算这些用户的计数"""
+    _rebuild(db.session.connection(), user_ids)
+
+
+def backfill_user_counters(connection):
+    """为所有用户重算计数行，返回处理的用户数"""
+    user_ids = [user_id for (user_id,) in connection.execute(db.select(User.__table__.c.id))]
+    for start in range(0, len(user_ids), CHUNK):
+        _rebuild(connection, user_ids[start:start + CHUNK])
+    return len(user_ids)
+
+
+def user_counters(user_id):
+    """用户的汇总计数（一次主键查询，需要应用上下文）；还没有计数行时按源数据表计算"""
+    table = UserCounter.__table__
+    row = db.session.execute(
+        db.select(*(table.c[field] for field in COUNTER_FIELDS)).where(table.c.user_id == user_id)
+    ).first()
+    if row is not None:
+        return dict(zip(COUNTER_FIELDS, row))
+    return _compute(db.session.connection(), [user_id])[user_id]
+
+
+# ========== 写入时在同一事务内按增量更新 ==========
+# flush 中按修改前后的值累计每个用户各计数的变化量，flush 后每个用户一条 UPDATE，
+# 写入的开销与用户历史数据量无关。以下情况改为重算该用户：修改前的值没有加载
+# （无法得到变化量）、用户还没有计数行、删除任务（学习会话由数据库级联删除，不触发事件）。
+
+def _contribution(model, values):
+    """一行数据对所属用户各计数的贡献"""
+    if model is Task:
+        return {'total_tasks': 1, 'completed_tasks': int(values['status'] == 'completed')}
+    if model is StudySession:
+        if values['end_time'] is None:
+            return {}
+        return {'total_study_minutes': values['duration_minutes'] or 0, 'session_count': 1}
+    return {'mood_entries': 1}
+
+
+def _pending(target):
+    session = object_session(target)
+    if session is None:
+        return None
+    return session.info.setdefault('user_counters_pending', {'deltas': {}, 'rebuild': set()})
+
+
+def _add(pending, user_id, contribution, sign):
+    delta = pending['deltas'].setdefault(user_id, dict.fromkeys(COUNTER_FIELDS, 0))
+    for field, value in contribution.items():
+        delta[field] += sign * value
+
+
+def _current(mapper, target):
+    return {field: getattr(target, field) for field in TRACKED_FIELDS[mapper.class_]}
+
+
+def _row_inserted(mapper, connection, target):
+    pending = _pending(target)
+    if pending is not None:
+        _add(pending, target.user_id, _contribution(mapper.class_, _current(mapper, target)), 1)
+
+
+def _row_deleted(mapper, connection, target):
+    # 删除之前触发，还能读取行的值
+    pending = _pending(target)
+    if pending is None:
+        return
+    if mapper.class_ is Task:
+        pending['rebuild'].add(target.user_id)
+    else:
+        _add(pending, target.user_id, _contribution(mapper.class_, _current(mapper, target)), -1)
+
+
+def _row_updated(mapper, connection, target):
+    state = inspect(target)
+    fields = TRACKED_FIELDS[mapper.class_]
+    changed = [field for field in fields if state.attrs[field].history.has_changes()]
+    if not changed:
+        return
+    pending = _pending(target)
+    if pending is None:
+        return
+
+    new = _current(mapper, target)
+    old = dict(new)
+    for field in changed:
+        deleted = state.attrs[field].history.deleted
+        if not deleted:
+            # 修改前的值没有加载
+            pending['rebuild'].add(target.user_id)
+            return
+        old[field] = deleted[0]
+    _add(pending, old['user_id'], _contribution(mapper.class_, old), -1)
+    _add(pending, new['user_id'], _contribution(mapper.class_, new), 1)
+
+
+for _model in TRACKED_FIELDS:
+    event.listen(_model, 'after_insert', _row_inserted)
+    event.listen(_model, 'before_delete', _row_deleted)
+    event.listen(_model, 'after_update', _row_updated)
+
+
+def _apply(connection, deltas, rebuild):
+    """按变化量更新计数行，没有计数行的用户和 rebuild 中的用户重算"""
+    table = UserCounter.__table__
+    rebuild = set(rebuild)
+    for user_id, delta in deltas.items():
+        changes = {field: table.c[field] + value for field, value in delta.items() if value}
+        if user_id in rebuild or user_id is None or not changes:
+            continue
+        result = connection.execute(table.update().where(table.c.user_id == user_id).values(changes))
+        if not result.rowcount:
+            rebuild.add(user_id)
+    _rebuild(connection, rebuild)
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_pending(session, flush_context):
+    pending = session.info.pop('user_counters_pending', None)
+    if pending:
+        _apply(session.connection(), pending['deltas'], pending['rebuild'])
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop('user_counters_pending', None)